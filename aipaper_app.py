@@ -3,24 +3,18 @@ import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
 import streamlit as st
-from nlm_client import NotebookLMClient
-from audio_handler import AudioHandler
-from podbean_uploader import PodbeanUploader
 from aipaper_agents import NewsroomCrew
-import openai
-import requests
-from aipaper_crew import AIPaperCrew, PapersList, ChosenPaper, PodcastContent
-import json
-from cloud_storage import CloudStorage
+from cloud_storage import get_cloud_storage
+from aipaper_crew import PapersList, ChosenPaper, PodcastContent
+from search_cache import get_search_cache
+from paper_cache import arxiv_cache_key
 import os
-import time
-import threading
 from datetime import datetime
-import re
-import html
-from queue import Queue
-from typing import Optional, Dict, Any
-from podcast_schema import PodcastContent, normalize_content
+from job_store import (
+    JobStore, STAGES, STAGE_PAPER_SELECTED, STAGE_CONTENT_GENERATED, STAGE_AUDIO_REQUESTED,
+    STAGE_AUDIO_READY, STAGE_TRANSCODED, STAGE_UPLOADED, STAGE_PUBLISHED,
+    STATUS_DONE, STATUS_FAILED
+)
 
 
 # 状态映射字典
@@ -34,158 +28,19 @@ status_mapping = {
     80: "即将完成"
 }
 
-def parse_podbean_feed(feed_url: str) -> list:
-    """解析 Podbean Feed 获取播客列表"""
-    try:
-        response = requests.get(feed_url)
-        response.raise_for_status()
-        
-        # 使用正则表达式提个播客条目
-        episodes = []
-        pattern = r'<item>.*?<title>(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?</title>.*?<link>(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?</link>.*?<pubDate>(.*?)</pubDate>.*?<description>(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?</description>.*?<itunes:duration>(.*?)</itunes:duration>.*?</item>'
-        
-        episode_matches = re.finditer(pattern, response.text, re.DOTALL)
-        
-        for match in episode_matches:
-            try:
-                title = html.unescape(match.group(1).strip())
-                link = html.unescape(match.group(2).strip())
-                date = datetime.strptime(match.group(3).strip(), '%a, %d %b %Y %H:%M:%S %z').strftime('%Y-%m-%d')
-                description = html.unescape(match.group(4).strip())
-                duration = match.group(5).strip()
-                
-                episode = {
-                    'title': title,
-                    'link': link,
-                    'date': date,
-                    'description': description,
-                    'duration': duration
-                }
-                episodes.append(episode)
-            except Exception as e:
-                print(f"处理单个播客条目时出错: {str(e)}")
-                continue
-                
-        return episodes
-        
-    except Exception as e:
-        print(f"获取播客列表失: {str(e)}")
-        return []
-
-def normalize_podcast_content(content: dict) -> Optional[Dict[str, Any]]:
-    """规范化播客内容，确保所有必需字段存在且格式正确"""
-    try:
-        # 创建新字典以避免修改原始数据
-        normalized = content.copy()
-        
-        # 处理prompt/prompt_text字段
-        if 'prompt' in normalized and 'prompt_text' not in normalized:
-            normalized['prompt_text'] = normalized.pop('prompt')
-        
-        # 验证必需字段
-        required_fields = ['title', 'description', 'paper_link', 'prompt_text']
-        missing_fields = [field for field in required_fields if not normalized.get(field)]
-        
-        if missing_fields:
-            print(f"缺少必需字段: {', '.join(missing_fields)}")
-            return None
-            
-        return normalized
-    except Exception as e:
-        print(f"规范化内容时出错: {str(e)}")
-        return None
-
-def generate_content_with_chatgpt(paper_link: str) -> Optional[Dict[str, Any]]:
-    """使用ChatGPT直接生成播客内容"""
-    try:
-        system_prompt = """你是一个专业的学术播客内容生成助手。请生成一个包含以下字段的JSON格式内容：
-        {
-            "title": "播客标题",
-            "description": "播客描述",
-            "paper_link": "论文链接",
-            "prompt_text": "用于生成音频的详细内容"
-        }
-        
-        注意：
-        1. 必须使用prompt_text作为字段名（不是prompt）
-        2. prompt_text应包含完整的播客脚本
-        3. 所有字段都必须存在且不能为空
-        4. 内容必须是有效的JSON格式"""
-        
-        user_prompt = f"""请根据以下论文链接生成播客内容：
-        
-        论文链接: {paper_link}
-        
-        要求：
-        1. 生成的内容必须是完整的JSON格式
-        2. 必须包含所有必需字段（title, description, paper_link, prompt_text）
-        3. prompt_text字段应该包含完整的播客脚本，包括论文的背景、主要发现和影响
-        4. 内容应该专业、准确且易于理解"""
-        
-        response = openai.ChatCompletion.create(
-            model=os.getenv("OPENAI_MODEL_NAME", "gpt-3.5-turbo"),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7
-        )
-        
-        # 解析JSON响应
-        content = json.loads(response.choices[0].message.content)
-        
-        # 规范化内容
-        normalized_content = normalize_content(content)
-        return normalized_content.dict()
-        
-    except json.JSONDecodeError as e:
-        print(f"JSON解析错误: {str(e)}")
-        return None
-    except Exception as e:
-        print(f"生成内容时出错: {str(e)}")
-        return None
+# 任务阶段映射字典
+stage_mapping = {
+    STAGE_PAPER_SELECTED: "等待生成播客内容",
+    STAGE_CONTENT_GENERATED: "播客内容已生成",
+    STAGE_AUDIO_REQUESTED: "正在生成音频",
+    STAGE_AUDIO_READY: "音频已生成",
+    STAGE_TRANSCODED: "音频已转换",
+    STAGE_UPLOADED: "已上传到播客平台",
+    STAGE_PUBLISHED: "播客已发布"
+}
 
-def generate_podcast_content(paper_link: str) -> PodcastContent:
-    """生成播客内容"""
-    try:
-        # 初始化 NotebookLM 客户端
-        client = NotebookLMClient(
-            api_key=os.getenv("NotebookLM_API_KEY"),
-            webhook_url="http://localhost:5000/webhook"
-        )
-        
-        # 发送内容生成请求
-        resources = [{"content": paper_link, "type": "website"}]
-        text = "Today, we dive into this fascinating research paper and explore its key findings!"
-        
-        request_id = client.send_content(resources, text)
-        
-        if not request_id:
-            raise ValueError("生成请求失败")
-            
-        # 等待音频生成完成
-        status = None
-        while True:
-            status = client.check_status(request_id)
-            if status and (status.get("audio_url") or status.get("error_message")):
-                break
-            time.sleep(30)
-            
-        if status and status.get("audio_url"):
-            # 创建播客内容
-            return PodcastContent(
-                title=f"AI Paper Review: {paper_link}",
-                description="An AI-generated review of the latest research paper",
-                prompt_text=text,
-                paper_link=paper_link,
-                audio_link=status["audio_url"]
-            )
-        else:
-            error_msg = status.get("error_message") if status else "未知错误"
-            raise ValueError(f"音频生成失败: {error_msg}")
-            
-    except Exception as e:
-        raise Exception(f"生成播客内容时出错: {str(e)}")
+# 任务状态页面的刷新间隔（秒）
+JOB_REFRESH_INTERVAL = 2
 
 # 页面配置
 st.set_page_config(
@@ -232,38 +87,20 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# 初始化 session state
-if 'processing_complete' not in st.session_state:
-    st.session_state.processing_complete = False
-if 'should_stop_check' not in st.session_state:
-    st.session_state.should_stop_check = False
-if 'status_queue' not in st.session_state:
-    st.session_state.status_queue = Queue()
-
-# 初始化 session state 变
-if 'nlm_client' not in st.session_state:
-    api_key = os.getenv("NotebookLM_API_KEY")
-    webhook_url = "http://localhost:5000/webhook"  # 本地webhook服务器地址
-    st.session_state.nlm_client = NotebookLMClient(api_key=api_key, webhook_url=webhook_url)
-
-if 'should_stop_check' not in st.session_state:
-    st.session_state.should_stop_check = False
-
-if 'status_thread' not in st.session_state:
-    st.session_state.status_thread = None
-
-if 'current_request_id' not in st.session_state:
-    st.session_state.current_request_id = None
-
-if 'check_count' not in st.session_state:
-    st.session_state.check_count = 0
-
-if 'last_check_time' not in st.session_state:
-    st.session_state.last_check_time = None
+# 持久化任务表，生成流程由后台 worker（aipaper_worker.py）执行
+if 'job_store' not in st.session_state:
+    st.session_state.job_store = JobStore()
 
-# 初始化 session state 变量
-if 'generate_podcast' not in st.session_state:
-    st.session_state.generate_podcast = False
+# 浏览器刷新或服务重启后，根据 URL 中的任务ID继续查看任务进度
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = st.query_params.get("job")
+    job = st.session_state.job_store.get_job(st.session_state.job_id) if st.session_state.job_id else None
+    if job:
+        if job["data"].get("papers"):
+            st.session_state.papers = job["data"]["papers"]
+            st.session_state.show_papers = True
+    else:
+        st.session_state.job_id = None
 
 # 主界面布局
 st.title("🎙️ AI论文播客生成器")
@@ -295,24 +132,53 @@ with st.sidebar:
         else:
             st.error(f"{api} ✗")
 
+    # Cloudinary 凭据在后台验证，这里只读取缓存的结果
+    cloud_storage = get_cloud_storage()
+    cloud_health = cloud_storage.cached_health() if cloud_storage else None
+    if cloud_health and not cloud_health[0]:
+        st.warning(cloud_health[1])
+
+    # 最近的任务
+    st.subheader("最近任务")
+    for recent_job in st.session_state.job_store.list_jobs(limit=10):
+        title = (recent_job["content"] or {}).get("title") or recent_job["paper_link"] or recent_job["id"][:8]
+        label = f"{title[:30]} · {stage_mapping.get(recent_job['stage'], recent_job['stage'])}"
+        if st.button(label, key=f"job_{recent_job['id']}"):
+            st.session_state.job_id = recent_job["id"]
+            st.query_params["job"] = recent_job["id"]
+            st.rerun()
+
+
 # 主要内容区域
 with st.container():
     topic = st.text_input(
         "输入研究主题:",
-        placeholder="例如：AI music, Quantum Computing...",
-        help="输入你感兴趣的研究主题，我们将为你找到相关的学术论文"
+        placeholder="例如：AI music, Quantum Computing... 或 arXiv 论文链接",
+        help="输入你感兴趣的研究主题，我们将为你找到相关的学术论文；输入 arXiv 链接则直接为该论文生成播客"
     )
     
+    # 直接输入 arXiv 链接时跳过搜索，后台 worker 用论文元数据快速生成内容
+    if arxiv_cache_key(topic or ""):
+        if st.button("🎯 直接生成播客", key="direct_podcast_button", type="primary"):
+            job_id = st.session_state.job_store.create_job(paper_link=topic.strip(), stage=STAGE_PAPER_SELECTED)
+            st.session_state.job_id = job_id
+            st.query_params["job"] = job_id
+            st.success("✅ 任务已提交！")
+            st.rerun()
+
     # 搜索论文
-    if st.button("🔍 查找相关论文", key="search_button", type="primary"):
+    elif st.button("🔍 查找相关论文", key="search_button", type="primary"):
         with st.spinner("正在搜索相关论文..."):
             try:
-                find_papers_crew = AIPaperCrew().find_papers_crew()
-                paper_result = find_papers_crew.kickoff(inputs={"topic": topic})
+                search = get_search_cache().find_papers(topic)
+                paper_result = search["result"]
                 
                 if paper_result:
                     st.session_state.papers = paper_result
                     st.success("找到相关论文！")
+                    if search["cached"]:
+                        minutes = int((datetime.now().timestamp() - search["fetched_at"]) / 60)
+                        st.caption(f"使用 {minutes} 分钟前的搜索结果" + ("，正在后台更新" if search["stale"] else ""))
                     st.session_state.show_papers = True
                 else:
                     st.error("❌ 未找到相关论文。")
@@ -324,271 +190,100 @@ with st.container():
         with st.expander("📄 查看论文列表", expanded=True):
             st.markdown(st.session_state.papers)
         
-        if st.button("🎯 生成播客内容", key="generate_podcast_button"):
-            with st.spinner("🎙️ 正在生成播客内容..."):
-                try:
-                    podcast_inputs = {"papers_list": st.session_state.papers}
-                    generate_podcast_crew = AIPaperCrew().generate_podcast_content_crew()
-                    generate_podcast_content = generate_podcast_crew.kickoff(inputs=podcast_inputs)
-                    
-                    if generate_podcast_content:
-                        # 保存生成的内容到 session_state
-                        st.session_state.podcast_content = generate_podcast_content
-                        st.session_state.content_generated = True
-                        st.success("✨ 播客内容生成成功！")
-                        st.rerun()
-                    else:
-                        st.error("❌ 生成播客内容失败。")
-                except Exception as e:
-                    st.error(f"❌ 生成过程中出错: {str(e)}")
+        if st.button("🎯 生成播客", key="generate_podcast_button"):
+            try:
+                # 提交任务，由后台 worker 生成内容、音频并发布
+                job_id = st.session_state.job_store.create_job(
+                    stage=STAGE_PAPER_SELECTED,
+                    data={"papers": str(st.session_state.papers)}
+                )
+                st.session_state.job_id = job_id
+                st.query_params["job"] = job_id
+                st.success("✅ 任务已提交！")
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ 提交任务时出错: {str(e)}")
+
+def job_finished(job: dict) -> bool:
+    """任务不存在、已完成或已失败时不会再有变化"""
+    return not job or job["status"] in (STATUS_DONE, STATUS_FAILED)
 
-        # 显示生成的内容
-        if st.session_state.get('content_generated', False):
-            with st.expander("查看生成的内容", expanded=True):
-                try:
-                    content_data = None
-                    podcast_content = st.session_state.podcast_content
-                    
-                    if hasattr(podcast_content, 'raw'):
-                        raw_content = podcast_content.raw
-                        if isinstance(raw_content, str):
-                            json_str = re.sub(r'^```json\s*|\s*```$', '', raw_content.strip())
-                            content_data = json.loads(json_str)
-                        else:
-                            content_data = raw_content
-                    else:
-                        content_data = podcast_content
-                    
-                    if content_data:
-                        st.markdown(f"**标题**: {content_data.get('title', 'N/A')}")
-                        st.markdown(f"**描述**: {content_data.get('description', 'N/A')}")
-                        st.markdown(f"**提示文本**: {content_data.get('prompt_text', content_data.get('prompt', 'N/A'))}")
-                        
-                        # 生成音频按钮
-                        if st.button("🎙️ 生成音频", key="generate_audio_button"):
-                            with st.spinner("正在发送音频生成请求..."):
-                                try:
-                                    client = NotebookLMClient(
-                                        os.getenv("NotebookLM_API_KEY"),
-                                        webhook_url="http://localhost:5000/webhook"
-                                    )
-                                    
-                                    resources = [
-                                        {"content": content_data['paper_link'], "type": "website"}
-                                    ]
-                                    text = content_data['prompt_text']
-                                    
-                                    request_id = client.send_content(resources, text)
-                                    
-                                    if request_id:
-                                        st.success("✅ 音频生成请求已发送！")
-                                        st.session_state.current_request_id = request_id
-                                        st.session_state.should_stop_check = False
-                                        
-                                        # 显示请求ID
-                                        st.markdown("### 请求信息")
-                                        st.code(f"Request ID: {request_id}")
-                                        
-                                        # 显示资源信息
-                                        st.markdown("### 资源信息")
-                                        st.code(f"Paper URL: {content_data['paper_link']}")
-                                        
-                                        st.rerun()
-                                    else:
-                                        st.error("❌ 发送音频生成请求失败")
-                                        # 显示错误详情
-                                        with st.expander("查看错误详情"):
-                                            st.code(f"""
-资源信息:
-{json.dumps(resources, indent=2)}
+def show_job_status(job_id: str, refreshing: bool = False):
+    """
+    显示任务进度
 
-提示文本:
-{text}
-                                            """)
-                                except Exception as e:
-                                    st.error(f"❌ 发送请求时出错: {str(e)}")
-                                    # 显示错误堆栈
-                                    with st.expander("查看错误堆栈"):
-                                        import traceback
-                                        st.code(traceback.format_exc())
-                except Exception as e:
-                    st.error(f"❌ 显示内容时出错: {str(e)}")
+    refreshing 为 True 时本函数作为定时刷新的 fragment 运行，任务结束后整页重新运行一次，
+    改为不带定时刷新的 fragment，不再轮询任务表。
+    """
+    job = st.session_state.job_store.get_job(job_id)
+    if refreshing and job_finished(job):
+        st.rerun()
+    if not job:
+        st.error("❌ 任务不存在")
+        return
 
-# 状态显示区域
-if 'current_request_id' in st.session_state and st.session_state.current_request_id:
     st.subheader("📊 处理状态")
-    
-    # 显示检查信息
+    st.text(f"任务ID: {job['id']}")
+
     col1, col2 = st.columns(2)
     with col1:
-        if 'check_count' not in st.session_state:
-            st.session_state.check_count = 0
-        st.text(f"检查次数: {st.session_state.check_count}")
-        check_time = datetime.now().strftime("%H:%M:%S")
-        st.text(f"最后检查: {check_time}")
-    
+        st.text(f"当前阶段: {stage_mapping.get(job['stage'], job['stage'])}")
+        st.text(f"最后更新: {datetime.fromtimestamp(job['updated_at']).strftime('%H:%M:%S')}")
     with col2:
-        if 'start_time' not in st.session_state:
-            st.session_state.start_time = time.time()
-        elapsed_time = int(time.time() - st.session_state.start_time)
-        minutes = elapsed_time // 60
-        seconds = elapsed_time % 60
-        st.text(f"处理时间: {minutes}分{seconds}秒")
-    
-    # 动态状态容器
-    status_container = st.empty()
-    
-    try:
-        # 获取最新状态
-        client = NotebookLMClient(
-            os.getenv("NotebookLM_API_KEY"),
-            webhook_url="http://localhost:5000/webhook"
-        )
-        status_data = client.check_status(st.session_state.current_request_id)
-        
-        if status_data:
-            # 更新检查次数
-            st.session_state.check_count += 1
-            
-            with status_container:
-                # 显示状态文本
-                current_status = status_data.get("status", "unknown")
-                status_text = status_mapping.get(current_status, status_mapping["unknown"])
-                st.markdown(f"### 当前状态: {status_text}")
-                
-                # 显示原始状态数据
-                st.markdown("### 原始状态返回")
-                # 清理 JSON 字符串中的控制字符
-                cleaned_data = {
-                    k: str(v).replace('\n', ' ').replace('\r', '') 
-                    if isinstance(v, str) else v 
-                    for k, v in status_data.items()
-                }
-                st.code(json.dumps(cleaned_data, indent=2, ensure_ascii=False))
-                st.text(f"Request ID: {st.session_state.current_request_id}")
-                
-                # 显示进度条
-                if isinstance(current_status, (int, float)):
-                    progress = min(int(current_status), 100)
-                    st.progress(progress / 100)
-                    st.text(f"进度: {progress}%")
-                
-                # 显示音频（如果已生成）
-                if status_data.get("audio_url"):
-                    st.success("✨ 音频生成完成！")
-                    st.audio(status_data["audio_url"])
-                    st.markdown(f"[📥 下载音频]({status_data['audio_url']})")
-                    
-                    # 自动上传到 Podbean
-                    try:
-                        # 下载音频文件
-                        temp_wav = "temp_audio.wav"
-                        output_mp3 = "podcast_audio.mp3"
-                        
-                        audio_handler = AudioHandler()
-                        if audio_handler.download_audio(status_data["audio_url"], temp_wav):
-                            st.info("✓ 音频文件下载完成，正在转换格式...")
-                            
-                            if audio_handler.convert_wav_to_mp3(temp_wav, output_mp3):
-                                st.info("✓ 音频格式转换完成，正在上传到播客平台...")
-                                
-                                # 上传到 Podbean
-                                podbean_client = PodbeanUploader(
-                                    os.getenv("PODBEAN_CLIENT_ID"),
-                                    os.getenv("PODBEAN_CLIENT_SECRET")
-                                )
-                                
-                                # 获取上传授权
-                                upload_auth = podbean_client.authorize_file_upload(
-                                    "podcast_audio.mp3",
-                                    output_mp3
-                                )
-                                
-                                if upload_auth:
-                                    if podbean_client.upload_file_to_presigned_url(
-                                        upload_auth["presigned_url"],
-                                        output_mp3
-                                    ):
-                                        st.info("✓ 文件上传成功，正在发布播客...")
-                                        
-                                        # 发布播客
-                                        content_data = st.session_state.podcast_content
-                                        if isinstance(content_data, dict):
-                                            title = content_data.get('title')
-                                            description = content_data.get('description')
-                                        else:
-                                            # 如果是 CrewOutput 对象，尝试获取 raw 内容
-                                            if hasattr(content_data, 'raw'):
-                                                raw_content = content_data.raw
-                                                if isinstance(raw_content, str):
-                                                    # 移除可能的 JSON 代码块标记
-                                                    json_str = re.sub(r'^```json\s*|\s*```$', '', raw_content.strip())
-                                                    content_data = json.loads(json_str)
-                                                    title = content_data.get('title')
-                                                    description = content_data.get('description')
-                                                else:
-                                                    content_data = raw_content
-                                                    title = content_data.get('title')
-                                                    description = content_data.get('description')
-                                            else:
-                                                title = getattr(content_data, 'title', None)
-                                                description = getattr(content_data, 'description', None)
-                                        
-                                        if not title or not description:
-                                            raise ValueError("无法获取播客标题或描述")
-                                            
-                                        episode_data = podbean_client.publish_episode(
-                                            title=title,
-                                            content=description,
-                                            file_key=upload_auth["file_key"]
-                                        )
-                                        
-                                        if episode_data:
-                                            st.success("🎉 播客发布成功！")
-                                            st.markdown(f"[🎙️ 收听播客]({episode_data.get('episode_url')})")
-                                        else:
-                                            st.error("❌ 播客发布失败")
-                                    else:
-                                        st.error("❌ 文件上传失败")
-                                else:
-                                    st.error("❌ 获取 Podbean 上传授权失败")
-                            else:
-                                st.error("❌ 音频格式转换失败")
-                        else:
-                            st.error("❌ 音频文件下载失败")
-                            
-                        # 清理临时文件
-                        for temp_file in [temp_wav, output_mp3]:
-                            if os.path.exists(temp_file):
-                                os.remove(temp_file)
-                                
-                    except Exception as e:
-                        st.error(f"❌ 发布过程中出错: {str(e)}")
-                    finally:
-                        st.session_state.should_stop_check = True
-                        # 重置计数器
-                        if 'start_time' in st.session_state:
-                            del st.session_state.start_time
-                
-                # 显示错误信息
-                if status_data.get("error_message"):
-                    st.error(f"错误: {status_data['error_message']}")
-                    st.session_state.should_stop_check = True
-                    if 'start_time' in st.session_state:
-                        del st.session_state.start_time
-                
-                # 自动刷新
-                if not st.session_state.should_stop_check:
-                    time.sleep(30)  # 每30秒检查一次
-                    st.rerun()
-                    
-    except Exception as e:
-        with status_container:
-            st.error(f"状态更新出错: {str(e)}")
-        if not st.session_state.should_stop_check:
-            time.sleep(30)
+        end_time = job['updated_at'] if job['status'] in (STATUS_DONE, STATUS_FAILED) else datetime.now().timestamp()
+        elapsed_time = int(end_time - job['created_at'])
+        st.text(f"处理时间: {elapsed_time // 60}分{elapsed_time % 60}秒")
+
+    st.progress(STAGES.index(job['stage']) / (len(STAGES) - 1))
+
+    # 显示生成的内容
+    content_data = job["content"]
+    if content_data:
+        with st.expander("查看生成的内容", expanded=True):
+            st.markdown(f"**标题**: {content_data.get('title', 'N/A')}")
+            st.markdown(f"**描述**: {content_data.get('description', 'N/A')}")
+            st.markdown(f"**提示文本**: {content_data.get('prompt_text', content_data.get('prompt', 'N/A'))}")
+
+    data = job["data"]
+    if job["request_id"]:
+        st.text(f"Request ID: {job['request_id']}")
+    if job["stage"] == STAGE_AUDIO_REQUESTED and "progress" in data:
+        progress = data["progress"]
+        st.text(f"音频生成: {status_mapping.get(progress, status_mapping['unknown'])}")
+        if isinstance(progress, (int, float)):
+            st.progress(min(int(progress), 100) / 100)
+    if job["stage"] == STAGE_TRANSCODED and data.get("upload_progress"):
+        for name, percent in data["upload_progress"].items():
+            st.text(f"上传到 {name}: {percent}%")
+            st.progress(percent / 100)
+    for name, result in data.get("destinations", {}).items():
+        if name == "cloudinary" and result.get("success"):
+            st.markdown(f"[☁️ Cloudinary 备份]({result['result']['url']})")
+    for name, result in data.get("rendition_destinations", {}).items():
+        if result.get("success"):
+            st.markdown(f"[📱 {name} 版本]({result['result']['url']})")
+
+    if data.get("audio_url"):
+        st.audio(data["audio_url"])
+        st.markdown(f"[📥 下载音频]({data['audio_url']})")
+
+    if job["status"] == STATUS_DONE:
+        st.success("🎉 播客发布成功！")
+        if data.get("episode_url"):
+            st.markdown(f"[🎙️ 收听播客]({data['episode_url']})")
+    elif job["status"] == STATUS_FAILED:
+        st.error(f"❌ 任务失败: {job['error']}")
+        if st.button("🔁 重试", key="retry_job_button"):
+            st.session_state.job_store.retry_job(job_id)
             st.rerun()
 
+# 状态显示区域，任务未结束时定时刷新
+if st.session_state.get('job_id'):
+    refreshing = not job_finished(st.session_state.job_store.get_job(st.session_state.job_id))
+    st.fragment(run_every=JOB_REFRESH_INTERVAL if refreshing else None)(show_job_status)(
+        st.session_state.job_id, refreshing=refreshing
+    )
+
 # 页脚前添加 Podbean 播放器
 st.markdown("""
     <iframe 
@@ -608,49 +303,3 @@ st.markdown("""
 # 页脚
 st.markdown("---")
 st.markdown("Made with ❤️ by [AI Paper+](https://aipaper.plus)")
-
-def check_status_thread():
-    """状态检查线程函数"""
-    try:
-        while not st.session_state.should_stop_check:
-            if st.session_state.current_request_id:
-                check_generation_status(st.session_state.current_request_id)
-            time.sleep(30)  # 每30秒检查一次
-    except Exception as e:
-        print(f"状态检查线程出错: {str(e)}")
-    finally:
-        print("状态检查线程结束")
-
-def start_status_check():
-    """启动状态检查"""
-    if st.session_state.status_thread is None or not st.session_state.status_thread.is_alive():
-        st.session_state.should_stop_check = False
-        st.session_state.status_thread = threading.Thread(target=check_status_thread)
-        st.session_state.status_thread.daemon = True
-        st.session_state.status_thread.start()
-
-def stop_status_check():
-    """停止状态检查"""
-    st.session_state.should_stop_check = True
-    if st.session_state.status_thread and st.session_state.status_thread.is_alive():
-        st.session_state.status_thread.join(timeout=1)
-    st.session_state.status_thread = None
-    st.session_state.current_request_id = None
-
-def check_generation_status(request_id: str):
-    """检查生成状态"""
-    try:
-        st.session_state.check_count += 1
-        st.session_state.last_check_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 获取状态
-        status = st.session_state.nlm_client.check_status(request_id)
-        if status:
-            st.session_state.status_queue.put({
-                "request_id": request_id,
-                "status": status,
-                "check_count": st.session_state.check_count,
-                "check_time": st.session_state.last_check_time
-            })
-    except Exception as e:
-        print(f"检查状态时出错: {str(e)}")
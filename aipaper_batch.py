@@ -0,0 +1,252 @@
+__import__('pysqlite3')
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from aipaper_worker import JobWorker, MAX_IN_FLIGHT
+from episode_index import extract_keys, get_episode_index
+from job_store import JobStore, STAGES, STAGE_PAPER_SELECTED, STATUS_DONE, STATUS_FAILED
+from paper_cache import arxiv_cache_key
+from search_cache import cached_find_papers
+
+# 批处理状态输出间隔（秒）
+REPORT_INTERVAL = 30
+
+
+def read_batch_file(path: str) -> list:
+    """读取批处理文件：每行一个 arXiv 链接或研究主题，忽略空行和 # 注释"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def arxiv_link(entry: str) -> str:
+    """条目是 arXiv 链接或 ID（包括 hep-th/9901001 这样的旧格式）时返回论文链接，否则返回 None"""
+    if arxiv_cache_key(entry):
+        return entry
+    bare_id = entry[len("arxiv:"):].strip() if entry.lower().startswith("arxiv:") else entry
+    arxiv_id = arxiv_cache_key(f"arxiv.org/abs/{bare_id}")
+    return f"https://arxiv.org/abs/{arxiv_id}" if arxiv_id == bare_id else None
+
+
+def find_papers(topic: str) -> str:
+    """用 crew 搜索主题相关的论文（优先使用搜索缓存），返回论文列表"""
+    return cached_find_papers(topic)
+
+
+def submit_batch(job_store: JobStore, entries: list, batch_id: str, concurrency: int,
+                 allow_duplicates: bool = False) -> list:
+    """
+    为每个条目创建任务
+
+    arXiv 链接和 ID 直接入队，已有节目或在本批次中重复的论文会被跳过；
+    研究主题先并发搜索论文，再把论文列表交给任务，选出的论文由 worker 在提交生成前去重。
+
+    Returns:
+        list: 创建的任务ID
+    """
+    links = [arxiv_link(entry) for entry in entries if arxiv_link(entry)]
+    topics = [entry for entry in entries if not arxiv_link(entry)]
+    episode_index = None if allow_duplicates else get_episode_index(job_store)
+    data = {"batch": batch_id, "allow_duplicate": True} if allow_duplicates else {"batch": batch_id}
+
+    job_ids = []
+    submitted = set()
+    for link in links:
+        keys = extract_keys(link)
+        if not allow_duplicates:
+            duplicate = episode_index.find([link])
+            if duplicate or keys & submitted:
+                print(f"⏭️ 跳过已有节目的论文: {link}" + (f" ({duplicate.get('title')})" if duplicate else ""))
+                continue
+        submitted |= keys
+        job_ids.append(job_store.create_job(
+            paper_link=link,
+            stage=STAGE_PAPER_SELECTED,
+            data=dict(data, source=link)
+        ))
+        print(f"✓ 已提交: {link}")
+
+    def submit_topic(topic):
+        try:
+            papers = find_papers(topic)
+        except Exception as e:
+            print(f"❌ 搜索论文失败: {topic}: {str(e)}")
+            return None
+        job_id = job_store.create_job(
+            stage=STAGE_PAPER_SELECTED,
+            data=dict(data, source=topic, papers=papers)
+        )
+        print(f"✓ 已提交: {topic}")
+        return job_id
+
+    if topics:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            job_ids.extend(job_id for job_id in executor.map(submit_topic, topics) if job_id)
+    return job_ids
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def batch_report(job_store: JobStore, batch_id: str) -> dict:
+    """
+    根据任务阶段记录统计批处理结果
+
+    每个阶段的延迟为任务到达该阶段与到达上一阶段的时间差，
+    吞吐量为该阶段完成数除以批处理开始到最后一个任务到达该阶段的时长。
+    """
+    jobs = job_store.list_jobs(batch=batch_id, limit=100000)
+    if not jobs:
+        return {"batch": batch_id, "jobs": 0}
+
+    start = min(job["created_at"] for job in jobs)
+    latencies = {stage: [] for stage in STAGES[1:]}
+    reached_at = {stage: [] for stage in STAGES[1:]}
+
+    for job in jobs:
+        previous = job["created_at"]
+        seen = set()
+        for event in job_store.events(job["id"]):
+            stage = event["stage"]
+            if stage in latencies and stage not in seen:
+                seen.add(stage)
+                latencies[stage].append(event["created_at"] - previous)
+                reached_at[stage].append(event["created_at"])
+                previous = event["created_at"]
+
+    stages = {}
+    for stage in STAGES[1:]:
+        values = latencies[stage]
+        if not values:
+            continue
+        elapsed = max(reached_at[stage]) - start
+        stages[stage] = {
+            "count": len(values),
+            "throughput_per_hour": round(len(values) / elapsed * 3600, 2) if elapsed > 0 else None,
+            "latency_mean": round(sum(values) / len(values), 2),
+            "latency_p50": round(_percentile(values, 0.5), 2),
+            "latency_p95": round(_percentile(values, 0.95), 2),
+            "latency_max": round(max(values), 2),
+        }
+
+    end = max(job["updated_at"] for job in jobs)
+    return {
+        "batch": batch_id,
+        "jobs": len(jobs),
+        "done": sum(job["status"] == STATUS_DONE for job in jobs),
+        "failed": sum(job["status"] == STATUS_FAILED for job in jobs),
+        "wall_time": round(end - start, 2),
+        "stages": stages,
+        "failures": [
+            {"job_id": job["id"], "source": job["data"].get("source"), "stage": job["stage"], "error": job["error"]}
+            for job in jobs if job["status"] == STATUS_FAILED
+        ],
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n=== 批处理 {report['batch']} ===")
+    if not report["jobs"]:
+        print("没有任务")
+        return
+    print(f"任务数: {report['jobs']}  已发布: {report['done']}  失败: {report['failed']}  "
+          f"总耗时: {report['wall_time']:.0f}秒")
+    print(f"\n{'阶段':<20}{'完成数':>8}{'吞吐/小时':>12}{'平均(秒)':>12}{'P50':>10}{'P95':>10}{'最大':>10}")
+    for stage, stats in report["stages"].items():
+        throughput = stats["throughput_per_hour"] if stats["throughput_per_hour"] is not None else "-"
+        print(f"{stage:<20}{stats['count']:>8}{throughput:>12}{stats['latency_mean']:>12}"
+              f"{stats['latency_p50']:>10}{stats['latency_p95']:>10}{stats['latency_max']:>10}")
+    for failure in report["failures"]:
+        print(f"❌ {failure['source']} ({failure['stage']}): {failure['error']}")
+
+
+def run_batch(job_store: JobStore, job_ids: list, batch_id: str, workers: int, max_in_flight: int) -> bool:
+    """
+    在当前进程中运行 worker，直到本批次所有任务都已发布或失败
+
+    Returns:
+        bool: 所有任务是否都已结束；worker 线程意外退出时返回 False
+    """
+    worker = JobWorker(job_store=job_store, max_workers=workers, max_in_flight=max_in_flight)
+    worker_thread = threading.Thread(target=worker.run, daemon=True)
+    worker_thread.start()
+
+    last_report = 0
+    try:
+        while True:
+            jobs = [job_store.get_job(job_id) for job_id in job_ids]
+            finished = sum(job["status"] in (STATUS_DONE, STATUS_FAILED) for job in jobs)
+            if finished == len(jobs):
+                return True
+            if not worker_thread.is_alive():
+                # worker 线程已经退出，剩下的任务不会再有进展
+                print(f"❌ worker 意外退出，{len(jobs) - finished} 个任务未完成，可用 aipaper_worker.py 继续处理")
+                return False
+            if time.monotonic() - last_report >= REPORT_INTERVAL:
+                last_report = time.monotonic()
+                by_stage = {}
+                for job in jobs:
+                    if job["status"] not in (STATUS_DONE, STATUS_FAILED):
+                        by_stage[job["stage"]] = by_stage.get(job["stage"], 0) + 1
+                print(f"[{time.strftime('%H:%M:%S')}] 已完成 {finished}/{len(jobs)}，进行中: {by_stage}")
+            time.sleep(2)
+    finally:
+        worker.stop()
+        worker_thread.join()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='批量将论文生成为播客节目')
+    parser.add_argument('input', nargs='?', help='每行一个 arXiv 链接或研究主题的文件')
+    parser.add_argument('--workers', type=int, default=int(os.getenv("AIPAPER_WORKERS", "4")),
+                        help='并发执行的任务数')
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT or 10,
+                        help='同时在 AutoContent 生成中的任务上限')
+    parser.add_argument('--allow-duplicates', action='store_true', help='不跳过已有节目的论文')
+    parser.add_argument('--submit-only', action='store_true', help='只提交任务，由独立的 worker 处理')
+    parser.add_argument('--report', metavar='BATCH_ID', help='只输出已有批次的统计')
+    parser.add_argument('--json', metavar='PATH', help='把统计结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    job_store = JobStore()
+    completed = True
+
+    if args.report:
+        batch_id = args.report
+    else:
+        if not args.input:
+            parser.error("需要指定输入文件或 --report")
+        entries = read_batch_file(args.input)
+        batch_id = uuid.uuid4().hex[:12]
+        print(f"批次 {batch_id}: {len(entries)} 个条目")
+        job_ids = submit_batch(job_store, entries, batch_id, concurrency=args.workers,
+                               allow_duplicates=args.allow_duplicates)
+        if args.submit_only:
+            print(f"已提交 {len(job_ids)} 个任务，可用 --report {batch_id} 查看进度")
+            sys.exit(0)
+        if job_ids:
+            completed = run_batch(job_store, job_ids, batch_id, workers=args.workers,
+                                  max_in_flight=args.max_in_flight)
+
+    report = batch_report(job_store, batch_id)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if not completed:
+        sys.exit(1)
@@ -1,9 +1,15 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+
 import yaml
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai_tools import DirectoryReadTool, FileReadTool, WebsiteSearchTool, ScrapeWebsiteTool, EXASearchTool
 
 from pydantic import BaseModel
+from podcast_schema import PodcastContent as StructuredPodcastContent
 # Define a Pydantic model for venue details
 # (demonstrating Output as Pydantic)
 class PodcastContent(BaseModel):
@@ -24,6 +30,22 @@ class ChosenPaper(BaseModel):
     paper_link:str
 
 
+# 是否在执行前运行 crewAI 的规划步骤（每次 kickoff 多一次 LLM 调用）
+SEARCH_PLANNING = os.getenv("AIPAPER_SEARCH_PLANNING", "0") == "1"
+CONTENT_PLANNING = os.getenv("AIPAPER_CONTENT_PLANNING", "1") == "1"
+
+_tools = {}
+_tools_lock = threading.Lock()
+
+
+def shared_tool(tool_class):
+    """进程内共享的工具实例，工具本身不保存执行状态"""
+    with _tools_lock:
+        if tool_class not in _tools:
+            _tools[tool_class] = tool_class()
+        return _tools[tool_class]
+
+
 @CrewBase
 class AIPaperCrew:
     """AI Paper Podcast Crew"""
@@ -59,7 +81,7 @@ class AIPaperCrew:
     def find_papers_task(self) -> Task:
         return Task(
             config=self.tasks_config["find_paper_task"],
-            tools=[EXASearchTool()],
+            tools=[shared_tool(EXASearchTool)],
             agent=self.paper_finder_agent(),
         )
     
@@ -74,14 +96,15 @@ class AIPaperCrew:
     def generate_podcast_content_task(self) -> Task:
         return Task(
             config=self.tasks_config["write_task"],
-            tools=[ScrapeWebsiteTool()],
+            tools=[shared_tool(ScrapeWebsiteTool)],
             agent=self.writer_agent(),
-            output_schema=PodcastContent,
+            # 结构化输出，结果直接校验为 PodcastContent
+            output_pydantic=StructuredPodcastContent,
             output_file="podcast_content.json"
         )
 
     @crew
-    def find_papers_crew(self) -> Crew:
+    def find_papers_crew(self, planning: bool = SEARCH_PLANNING) -> Crew:
         """Creates the AIPaper crew"""
         print("find_papers_crew method called")
         return Crew(
@@ -89,15 +112,73 @@ class AIPaperCrew:
             tasks=[self.find_papers_task()],
             process=Process.sequential,
             verbose=True,
-            planning=True
+            planning=planning
         ) 
     @crew
-    def generate_podcast_content_crew(self) -> Crew:
+    def generate_podcast_content_crew(self, planning: bool = CONTENT_PLANNING) -> Crew:
         """Creates the AIPaper crew"""
         return Crew(
             agents=[self.researcher_agent(),self.writer_agent()],
             tasks=[self.research_task(),self.generate_podcast_content_task()],
             process=Process.sequential,
             verbose=True,
-            planning=True
+            planning=planning
+        )
+
+    def cached_crew(self, name: str, planning: bool) -> Crew:
+        """按名称和是否规划缓存本实例的 crew，agents 和 tasks 由 crewAI 装饰器按实例缓存"""
+        crews = self.__dict__.setdefault("_crews", {})
+        if (name, planning) not in crews:
+            crews[(name, planning)] = getattr(self, name)(planning=planning)
+        return crews[(name, planning)]
+
+
+class CrewFactory:
+    """
+    AIPaperCrew 实例池
+
+    YAML 配置只在创建实例时解析一次，之后实例连同其中的 agents、tasks 和 crew 一直复用。
+    agents 在执行时保存状态，不能被多个线程同时使用，因此每个线程借出一个独立的实例，用完归还。
+    """
+
+    def __init__(self):
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            instance = self._idle.pop() if self._idle else None
+        if instance is None:
+            instance = AIPaperCrew()
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._idle.append(instance)
+
+
+crew_factory = CrewFactory()
+
+
+def run_find_papers(topic: str, start_date: str = None, planning: bool = SEARCH_PLANNING):
+    """
+    用复用的 crew 搜索主题相关的论文
+
+    Args:
+        topic: 研究主题
+        start_date: 只搜索该日期（YYYY-MM-DD）之后发表的论文，默认今年 1 月 1 日
+    """
+    start_date = start_date or date.today().replace(month=1, day=1).isoformat()
+    with crew_factory.acquire() as paper_crew:
+        return paper_crew.cached_crew("find_papers_crew", planning).kickoff(
+            inputs={"topic": topic, "start_date": start_date}
+        )
+
+
+def run_generate_podcast_content(papers_list: str, planning: bool = CONTENT_PLANNING):
+    """用复用的 crew 为选中的论文生成播客内容"""
+    with crew_factory.acquire() as paper_crew:
+        return paper_crew.cached_crew("generate_podcast_content_crew", planning).kickoff(
+            inputs={"papers_list": papers_list}
         ) 
\ No newline at end of file
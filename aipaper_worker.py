@@ -0,0 +1,383 @@
+__import__('pysqlite3')
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+from aipaper_crew import run_generate_podcast_content
+from arxiv_metadata import get_metadata
+from audio_handler import AudioHandler
+from content_generator import generate_podcast_content, metadata_context
+from content_templates import fast_podcast_content
+from episode_index import DuplicatePaperError, get_episode_index
+from job_store import (
+    JobStore, JOB_DB_PATH, STAGES, STAGE_PAPER_SELECTED, STAGE_CONTENT_GENERATED, STAGE_AUDIO_REQUESTED,
+    STAGE_AUDIO_READY, STAGE_TRANSCODED, STAGE_UPLOADED, STAGE_PUBLISHED, STATUS_RUNNING
+)
+from nlm_client import NotebookLMClient
+from paper_cache import arxiv_cache_key
+from podbean_uploader import get_uploader
+from podcast_schema import content_to_dict
+from publisher import default_destinations, publish_file, publish_renditions
+from workspace import WORKSPACE_JOB_ESTIMATE, WORKSPACE_SPOOL_ESTIMATE, get_workspace_manager
+
+# 设置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("JobWorker")
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "http://localhost:5000/webhook")
+# 音频尚未生成时，任务放回队列后再次检查 webhook 推送的间隔（秒）
+AUDIO_RECHECK_DELAY = 5
+# 没有收到 webhook 推送时，直接查询 AutoContent 状态接口的最短间隔（秒）
+AUDIO_STATUS_POLL_INTERVAL = 30
+# 超过这么多秒没有更新的 running 任务视为 worker 已异常退出
+STALE_JOB_TIMEOUT = int(os.getenv("AIPAPER_STALE_JOB_TIMEOUT", "1800"))
+# 同时在 AutoContent 生成中的任务上限，0 表示不限制
+MAX_IN_FLIGHT = int(os.getenv("AIPAPER_MAX_IN_FLIGHT", "0"))
+# 达到上限时，任务放回队列后再次尝试提交的间隔（秒）
+SUBMIT_RETRY_DELAY = 15
+# 直接 arXiv 链接的任务是否先用元数据模板生成内容，跳过 crew
+FAST_PATH = os.getenv("AIPAPER_FAST_PATH", "1") == "1"
+# 与主版本同时编码并镜像到 Cloudinary 的 MP3 码率（kbps，逗号分隔，例如 "24,48"），为空时不生成
+RENDITION_BITRATES = [int(bitrate) for bitrate in os.getenv("AIPAPER_RENDITIONS", "").split(",")
+                      if bitrate.strip()]
+# 估算工作区占用时假定的节目时长上限（秒）
+EPISODE_ESTIMATE_SECONDS = 2 * 3600
+
+# 保证同一进程内“检查上限 + 提交”不会并发穿插
+_submit_lock = threading.Lock()
+
+
+def generate_content(job: dict) -> dict:
+    """
+    为选中的论文生成播客内容
+
+    只有一篇论文时依次尝试元数据模板和单次结构化输出调用，都失败或需要从论文列表中挑选时运行 crew。
+    只有一篇论文时内容中的 paper_link 总是输入的链接。
+    """
+    papers = job["data"].get("papers") or job["paper_link"]
+    if not papers:
+        raise ValueError("任务缺少论文信息")
+    if not job["data"].get("papers"):
+        # 单篇论文不需要 crew 挑选：先用元数据模板，再用一次结构化输出调用
+        if job["data"].get("fast_path", FAST_PATH) and arxiv_cache_key(papers):
+            content = fast_podcast_content(papers)
+            if content:
+                logger.info(f"任务 {job['id']} 使用 arXiv 元数据快速生成内容")
+                return content.dict()
+        try:
+            metadata = get_metadata(papers) if arxiv_cache_key(papers) else None
+            return generate_podcast_content(papers, context=metadata_context(metadata) if metadata else None).dict()
+        except Exception as e:
+            logger.warning(f"结构化生成内容失败，改用 crew: {str(e)}")
+    output = run_generate_podcast_content(papers)
+    if not output:
+        raise ValueError("生成播客内容失败")
+    content = content_to_dict(output)
+    if not job["data"].get("papers"):
+        # 单篇论文时以输入的链接为准，模型改写或编造的链接不会用于提交生成和去重
+        content["paper_link"] = papers
+    return content
+
+
+def workspace_estimate() -> int:
+    """
+    每个任务的工作区预计占用的字节数
+
+    WORKSPACE_JOB_ESTIMATE 覆盖主输出和回退时下载的源文件，各码率版本按节目时长上限另外计算。
+    """
+    return WORKSPACE_JOB_ESTIMATE + sum(RENDITION_BITRATES) * 1000 // 8 * EPISODE_ESTIMATE_SECONDS
+
+
+def upload_progress(job_store: JobStore, job_id: str):
+    """返回上传进度回调，把各发布目标的整数百分比写入任务数据"""
+    progress = {}
+    lock = threading.Lock()
+
+    def callback(name, sent, total):
+        percent = int(sent * 100 / total) if total else 100
+        with lock:
+            if progress.get(name) == percent:
+                return
+            progress[name] = percent
+            job_store.update(job_id, upload_progress=dict(progress))
+    return callback
+
+
+def run_job(job_store: JobStore, job: dict, max_in_flight: int = MAX_IN_FLIGHT) -> str:
+    """
+    从任务当前阶段开始依次执行后续阶段
+
+    等待 AutoContent 生成音频时不占用线程：每次只做一次不阻塞的状态检查，
+    音频尚未生成时把任务放回队列，稍后再检查。
+
+    Args:
+        job_store: 任务表
+        job: 已领取（running）的任务
+        max_in_flight: 同时在 AutoContent 生成中的任务上限，0 表示不限制
+
+    Returns:
+        str: 任务执行后所处的阶段
+    """
+    job_id = job["id"]
+    stage = job["stage"]
+    data = job["data"]
+    content = job["content"]
+    workspaces = get_workspace_manager()
+
+    try:
+        # 在 try 内创建，索引建立或客户端初始化失败时任务同样标记为失败，而不是停留在 running
+        # data.allow_duplicate 为真时跳过已有节目检查
+        episode_index = None if data.get("allow_duplicate") else get_episode_index(job_store)
+        client = NotebookLMClient(os.getenv("NotebookLM_API_KEY"), webhook_url=WEBHOOK_URL,
+                                  episode_index=episode_index)
+
+        if stage == STAGE_PAPER_SELECTED:
+            content = generate_content(job)
+            job_store.advance(job_id, STAGE_CONTENT_GENERATED, content=content,
+                              paper_link=content.get("paper_link"))
+            stage = STAGE_CONTENT_GENERATED
+
+        if stage == STAGE_CONTENT_GENERATED:
+            with _submit_lock:
+                if max_in_flight and job_store.count_jobs(STAGE_AUDIO_REQUESTED) >= max_in_flight:
+                    # 生成中的任务已达上限，稍后再提交
+                    job_store.release(job_id, delay=SUBMIT_RETRY_DELAY)
+                    return stage
+                resources = [{"content": content["paper_link"], "type": "website"}]
+                request_id = client.send_content(resources, content["prompt_text"], title=content.get("title"))
+                if not request_id:
+                    raise ValueError("发送音频生成请求失败")
+                job_store.advance(job_id, STAGE_AUDIO_REQUESTED, request_id=request_id)
+            job["request_id"] = request_id
+            stage = STAGE_AUDIO_REQUESTED
+
+        if stage == STAGE_AUDIO_REQUESTED:
+            status = None
+            webhook_available = True
+            try:
+                status = client.get_update(job["request_id"], since=data.get("webhook_seq", 0))
+            except Exception as e:
+                webhook_available = False
+                logger.warning(f"webhook 服务器不可用，改为轮询: {str(e)}")
+            if status:
+                job_store.update(job_id, webhook_seq=status.get("seq", 0))
+            elif not webhook_available or time.time() - data.get("status_polled_at", 0) >= AUDIO_STATUS_POLL_INTERVAL:
+                # 没有推送时定期直接查询，避免错过 webhook 通知
+                job_store.update(job_id, status_polled_at=time.time())
+                status = client.check_status(job["request_id"])
+
+            if status and status.get("audio_url"):
+                data["audio_url"] = status["audio_url"]
+                job_store.advance(job_id, STAGE_AUDIO_READY, audio_url=status["audio_url"], progress=100)
+                stage = STAGE_AUDIO_READY
+            elif status and status.get("error_message"):
+                raise ValueError(f"音频生成失败: {status['error_message']}")
+            else:
+                if status:
+                    job_store.update(job_id, progress=status.get("status", 0))
+                job_store.release(job_id, delay=AUDIO_RECHECK_DELAY)
+                return stage
+
+        if stage == STAGE_TRANSCODED and not os.path.exists(data.get("output_path", "")):
+            # 转码结果丢失（例如换了机器），重新转码
+            stage = STAGE_AUDIO_READY
+
+        if stage == STAGE_AUDIO_READY:
+            # 每个任务使用独立的工作区，出错时整个工作区被删除，转码结果保留到发布完成；
+            # 边下载边转码时的响度暂存数据在磁盘上的暂存目录中，同样计入配额
+            with workspaces.workspace(job_id, keep=True, expected_size=workspace_estimate(),
+                                      spool_size=WORKSPACE_SPOOL_ESTIMATE) as workspace:
+                output_path = workspace.file(f"{job_id}.mp3")
+                # 各码率版本与主版本共用一次解码和重采样
+                renditions = AudioHandler.rendition_paths(
+                    output_path, {f"{bitrate}k": bitrate for bitrate in RENDITION_BITRATES}
+                ) if RENDITION_BITRATES else None
+                audio_handler = AudioHandler()
+                converted = audio_handler.stream_convert_url(data["audio_url"], output_path, renditions=renditions)
+                if not converted:
+                    temp_wav = workspace.file(f"{job_id}.wav")
+                    converted = (audio_handler.download_audio(data["audio_url"], temp_wav)
+                                 and audio_handler.convert_wav_to_mp3(temp_wav, output_path, renditions=renditions))
+                    if os.path.exists(temp_wav):
+                        os.remove(temp_wav)
+                if not converted:
+                    raise ValueError("音频下载或格式转换失败")
+            data["output_path"] = output_path
+            data["renditions"] = {f"{bitrate}k": path for path, bitrate in (renditions or {}).items()}
+            job_store.advance(job_id, STAGE_TRANSCODED, output_path=output_path, renditions=data["renditions"])
+            stage = STAGE_TRANSCODED
+
+        if stage == STAGE_TRANSCODED:
+            # 上传期间持有工作区的锁，其他任务腾出配额时不会删除正在上传的文件；
+            # 上传失败时不删除工作区，转码结果和分块上传进度（.upload.json）留给重试使用
+            workspace = workspaces.open(job_id, expected_size=0)
+            try:
+                # 同时上传到 Podbean 和已配置的镜像目标，重试时跳过已成功的目标
+                progress_callback = upload_progress(job_store, job_id)
+                publish_result = publish_file(
+                    data["output_path"],
+                    default_destinations(f"{job_id}.mp3"),
+                    completed=data.get("destinations"),
+                    progress_callback=progress_callback
+                )
+                job_store.update(job_id, destinations=publish_result["destinations"])
+                if not publish_result["success"]:
+                    errors = [f"{name}: {result['error']}" for name, result in publish_result["destinations"].items()
+                              if not result["success"]]
+                    raise ValueError(f"文件上传失败: {'; '.join(errors)}")
+                if data.get("renditions"):
+                    rendition_results = publish_renditions(data["renditions"],
+                                                           completed=data.get("rendition_destinations"),
+                                                           progress_callback=progress_callback)
+                    job_store.update(job_id, rendition_destinations=rendition_results)
+            finally:
+                workspace.release()
+            file_key = publish_result["destinations"]["podbean"]["result"]["file_key"]
+            data["file_key"] = file_key
+            job_store.advance(job_id, STAGE_UPLOADED, file_key=file_key)
+            stage = STAGE_UPLOADED
+
+        if stage == STAGE_UPLOADED:
+            podbean_client = get_uploader()
+            episode_data = podbean_client.publish_episode(
+                title=content["title"],
+                content=content["description"],
+                file_key=data["file_key"]
+            )
+            if not episode_data:
+                raise ValueError("播客发布失败")
+            job_store.advance(job_id, STAGE_PUBLISHED, episode_url=episode_data.get("episode_url"))
+            stage = STAGE_PUBLISHED
+
+            # 发布完成后清理工作区
+            workspaces.remove(job_id)
+
+        return stage
+
+    except DuplicatePaperError as e:
+        logger.warning(f"任务 {job_id} 跳过: {str(e)}")
+        job_store.update(job_id, duplicate_of=e.match)
+        job_store.fail(job_id, str(e))
+        return stage
+
+    except Exception as e:
+        logger.error(f"任务 {job_id} 在阶段 {stage} 出错: {str(e)}")
+        job_store.fail(job_id, str(e))
+        # 转码完成前失败时中间文件没有用处；转码之后失败时保留工作区，重试时不必重新转码，
+        # 上传从最后确认的块继续。保留的工作区空闲，超出配额时按最近最少使用清理
+        if STAGES.index(stage) < STAGES.index(STAGE_TRANSCODED):
+            workspaces.remove(job_id)
+        return stage
+
+
+def process_job(job_id: str, db_path: str = JOB_DB_PATH, max_in_flight: int = MAX_IN_FLIGHT) -> str:
+    """进程池入口：在子进程中打开任务表并执行已领取的任务"""
+    job_store = JobStore(db_path)
+    job = job_store.get_job(job_id)
+    if not job or job["status"] != STATUS_RUNNING:
+        return job["stage"] if job else None
+    return run_job(job_store, job, max_in_flight=max_in_flight)
+
+
+class JobWorker:
+    """
+    后台任务 worker
+
+    从任务表领取待处理任务，交给线程池或进程池并发执行，
+    每个任务从上次完成的阶段继续，因此重启后不会重复提交已发出的生成请求。
+    """
+
+    def __init__(self, job_store: JobStore = None, max_workers: int = 4,
+                 use_processes: bool = False, poll_interval: float = 1.0,
+                 stale_after: float = STALE_JOB_TIMEOUT, max_in_flight: int = MAX_IN_FLIGHT):
+        self.job_store = job_store or JobStore()
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_in_flight = max_in_flight
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """处理完当前任务后停止"""
+        self._stop.set()
+
+    def _submit(self, executor, job: dict):
+        if self.use_processes:
+            return executor.submit(process_job, job["id"], self.job_store.db_path, self.max_in_flight)
+        return executor.submit(run_job, self.job_store, job, max_in_flight=self.max_in_flight)
+
+    def run(self, until_idle: bool = False) -> None:
+        """
+        持续领取并执行任务
+
+        Args:
+            until_idle: 为 True 时，队列中没有任何未完成任务后退出
+        """
+        requeued = self.job_store.requeue_running(stale_after=self.stale_after)
+        if requeued:
+            logger.info(f"恢复了 {requeued} 个中断的任务")
+
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        logger.info(f"Worker {self.worker_id} 启动，并发数: {self.max_workers}")
+
+        with executor_class(max_workers=self.max_workers) as executor:
+            running = set()
+            while not self._stop.is_set():
+                # 填满空闲的执行槽位
+                while len(running) < self.max_workers:
+                    job = self.job_store.claim_job(self.worker_id)
+                    if not job:
+                        break
+                    logger.info(f"领取任务 {job['id']}，阶段: {job['stage']}")
+                    running.add(self._submit(executor, job))
+
+                if running:
+                    done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    running = set(running)
+                    for future in done:
+                        if future.exception():
+                            logger.error(f"任务执行异常: {future.exception()}")
+                elif until_idle and not self.job_store.resumable_jobs():
+                    break
+                else:
+                    self._stop.wait(self.poll_interval)
+
+        logger.info(f"Worker {self.worker_id} 已停止")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='运行播客生成任务的后台 worker')
+    parser.add_argument('--workers', type=int, default=int(os.getenv("AIPAPER_WORKERS", "4")),
+                        help='并发执行的任务数')
+    parser.add_argument('--processes', action='store_true', help='使用进程池代替线程池')
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT,
+                        help='同时在 AutoContent 生成中的任务上限，0 表示不限制')
+    parser.add_argument('--until-idle', action='store_true', help='所有任务完成后退出')
+    parser.add_argument('--recover', action='store_true',
+                        help='启动时立即恢复所有 running 任务（仅在没有其他 worker 运行时使用）')
+    args = parser.parse_args()
+
+    worker = JobWorker(
+        max_workers=args.workers,
+        use_processes=args.processes,
+        stale_after=0 if args.recover else STALE_JOB_TIMEOUT,
+        max_in_flight=args.max_in_flight
+    )
+    try:
+        worker.run(until_idle=args.until_idle)
+    except KeyboardInterrupt:
+        worker.stop()
@@ -0,0 +1,112 @@
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Optional
+
+import http_session
+from paper_cache import arxiv_cache_key
+
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+# 元数据缓存目录，也可以预先放入离线导出的元数据（每篇一个 <ID>.json）
+ARXIV_METADATA_DIR = os.getenv("AIPAPER_ARXIV_METADATA_DIR", os.path.join(".cache", "arxiv"))
+# 不带版本号的元数据可能随新版本变化，超过该秒数后重新获取
+ARXIV_METADATA_TTL = int(os.getenv("AIPAPER_ARXIV_METADATA_TTL", str(7 * 24 * 3600)))
+# arXiv API 要求连续请求之间至少间隔 3 秒
+ARXIV_API_INTERVAL = 3
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+
+_api_lock = threading.Lock()
+_last_api_call = 0
+
+
+def _clean(text: str) -> str:
+    return re.sub(r'\s+', ' ', text or "").strip()
+
+
+def parse_entry(entry) -> dict:
+    """把 arXiv API 返回的 <entry> 转换为元数据字典"""
+    entry_id = _clean(entry.findtext(f"{ATOM_NS}id"))
+    category = entry.find(f"{ARXIV_NS}primary_category")
+    return {
+        "arxiv_id": arxiv_cache_key(entry_id) or entry_id.rsplit("/", 1)[-1],
+        "title": _clean(entry.findtext(f"{ATOM_NS}title")),
+        "authors": [_clean(author.findtext(f"{ATOM_NS}name")) for author in entry.findall(f"{ATOM_NS}author")],
+        "abstract": _clean(entry.findtext(f"{ATOM_NS}summary")),
+        "published": _clean(entry.findtext(f"{ATOM_NS}published"))[:10],
+        "updated": _clean(entry.findtext(f"{ATOM_NS}updated"))[:10],
+        "doi": _clean(entry.findtext(f"{ARXIV_NS}doi")) or None,
+        "category": category.get("term") if category is not None else None,
+        "abs_url": entry_id.replace("http://", "https://", 1),
+    }
+
+
+def _fetch(arxiv_id: str) -> Optional[dict]:
+    """从 arXiv API 获取元数据，遵守请求间隔"""
+    global _last_api_call
+    with _api_lock:
+        wait = ARXIV_API_INTERVAL - (time.monotonic() - _last_api_call)
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            response = http_session.get(ARXIV_API_URL, params={"id_list": arxiv_id})
+        finally:
+            _last_api_call = time.monotonic()
+    response.raise_for_status()
+
+    entry = ET.fromstring(response.content).find(f"{ATOM_NS}entry")
+    if entry is None or not entry.findtext(f"{ATOM_NS}title") or _clean(entry.findtext(f"{ATOM_NS}title")) == "Error":
+        return None
+    return parse_entry(entry)
+
+
+def _path(arxiv_id: str) -> str:
+    return os.path.join(ARXIV_METADATA_DIR, re.sub(r'[^0-9A-Za-z._-]', '_', arxiv_id) + ".json")
+
+
+def get_metadata(url: str) -> Optional[dict]:
+    """
+    获取 arXiv 论文的元数据（标题、作者、摘要、日期）
+
+    先查本地目录，带版本号的条目永久有效，不带版本号的条目在 TTL 内有效；
+    缺失或过期时请求 arXiv API 并写入本地目录。
+
+    Args:
+        url: arXiv 链接或 ID
+
+    Returns:
+        dict: 元数据，无法识别或论文不存在时返回 None
+    """
+    arxiv_id = arxiv_cache_key(url) or arxiv_cache_key(f"arxiv.org/abs/{url.strip()}")
+    if not arxiv_id:
+        return None
+
+    path = _path(arxiv_id)
+    cached = None
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        fresh = re.search(r'v\d+$', arxiv_id) or time.time() - os.path.getmtime(path) < ARXIV_METADATA_TTL
+        if fresh:
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    try:
+        metadata = _fetch(arxiv_id)
+    except Exception as e:
+        print(f"获取 arXiv 元数据失败: {str(e)}")
+        return cached
+    if metadata is None:
+        return cached
+
+    os.makedirs(ARXIV_METADATA_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return metadata
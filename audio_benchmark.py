@@ -0,0 +1,454 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import scipy
+import soundfile as sf
+
+from audio_handler import AudioHandler
+from workspace import get_workspace_manager
+
+# 合成测试音频的存放目录，同样参数的音频只生成一次
+BENCH_FIXTURE_DIR = os.getenv("AIPAPER_BENCH_DIR", os.path.join(".cache", "bench"))
+# 默认的测试矩阵：时长（分钟）、采样率、声道数
+DEFAULT_DURATIONS = (10, 30, 60, 120)
+DEFAULT_SAMPLERATES = (24000, 44100, 48000)
+DEFAULT_CHANNELS = (1, 2)
+# 每次合成的秒数
+SYNTH_BLOCK_SECONDS = 10
+# 与上一次结果比较时允许的变化比例，超出视为退化
+DEFAULT_TOLERANCE = 0.15
+# 每个组合默认重复的次数，取最短耗时和内存增长的中位数，减少单次运行的波动
+DEFAULT_REPEAT = 3
+# 变化量不超过以下数值时不视为退化：内存增长（MB，分配器的正常波动）和耗时（秒，短音频的调度波动）
+RSS_NOISE_MB = 8.0
+WALL_NOISE_SECONDS = 0.25
+# 没有 clear_refs 时采样 RSS 的间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.01
+
+# 合成说话人的基频（Hz）和立体声声像（-1 左，1 右）
+SPEAKERS = ((115.0, -0.4), (205.0, 0.4), (160.0, 0.0))
+HARMONICS = np.arange(1, 7)
+RESULT_VERSION = 2
+
+
+def fixture_name(duration_minutes: float, samplerate: int, channels: int) -> str:
+    return f"{duration_minutes:g}min_{samplerate}hz_{'stereo' if channels == 2 else 'mono'}"
+
+
+def speaker_turns(duration: float, speakers: int, rng: np.random.Generator) -> list:
+    """
+    生成对话的时间表：[(开始秒, 结束秒, 说话人)]
+
+    说话人轮流发言，每段 3-15 秒，段间 0.2-0.8 秒的停顿，偶尔有 2-6 秒的长停顿；
+    开头和结尾各留 2 秒静音，用于检验静音裁剪。
+    """
+    turns = []
+    t, speaker = 2.0, 0
+    while t < duration - 2.0:
+        end = min(t + rng.uniform(3, 15), duration - 2.0)
+        turns.append((t, end, speaker))
+        speaker = (speaker + 1 + rng.integers(0, max(1, speakers - 1))) % speakers
+        t = end + (rng.uniform(2, 6) if rng.random() < 0.1 else rng.uniform(0.2, 0.8))
+    return turns
+
+
+def _voice(t: np.ndarray, f0: float) -> np.ndarray:
+    """类语音的合成信号：带颤音的谐波叠加，按每秒约 4 个音节调制幅度"""
+    phase = 2 * np.pi * f0 * t + 0.8 * np.sin(2 * np.pi * 5.0 * t)
+    tone = np.sin(phase[:, None] * HARMONICS[None, :]) @ (1.0 / HARMONICS)
+    syllables = (0.5 - 0.5 * np.cos(2 * np.pi * 4.0 * t)) ** 2
+    return (0.12 * tone * syllables).astype(np.float32)
+
+
+def synthesize(path: str, duration: float, samplerate: int, channels: int, speakers: int = 2,
+               seed: int = 0) -> None:
+    """
+    分块合成多人对话的测试音频（16 位 PCM WAV），内存占用与时长无关
+
+    相位按绝对时间计算，各块之间连续；同样的参数总是生成同样的音频。
+    """
+    rng = np.random.default_rng(seed)
+    turns = speaker_turns(duration, speakers, rng)
+    fade = int(0.02 * samplerate)
+    block = SYNTH_BLOCK_SECONDS * samplerate
+    total = int(duration * samplerate)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with sf.SoundFile(tmp_path, 'w', samplerate=samplerate, channels=channels,
+                      format='WAV', subtype='PCM_16') as out:
+        for start in range(0, total, block):
+            n = min(block, total - start)
+            # -60dBFS 左右的底噪
+            data = rng.standard_normal((n, channels)).astype(np.float32) * 0.001
+            for turn_start, turn_end, speaker in turns:
+                lo = max(int(turn_start * samplerate), start)
+                hi = min(int(turn_end * samplerate), start + n)
+                if lo >= hi:
+                    continue
+                index = np.arange(lo, hi)
+                voice = _voice(index / samplerate, SPEAKERS[speaker % len(SPEAKERS)][0])
+                # 发言首尾淡入淡出，避免咔哒声
+                edge = np.minimum(index - int(turn_start * samplerate), int(turn_end * samplerate) - index)
+                voice *= np.minimum(1.0, edge / fade).astype(np.float32)
+                if channels == 2:
+                    pan = SPEAKERS[speaker % len(SPEAKERS)][1]
+                    data[lo - start:hi - start, 0] += voice * np.float32((1 - pan) / 2)
+                    data[lo - start:hi - start, 1] += voice * np.float32((1 + pan) / 2)
+                else:
+                    data[lo - start:hi - start, 0] += voice
+            out.write(data)
+    os.replace(tmp_path, path)
+
+
+def ensure_fixture(duration_minutes: float, samplerate: int, channels: int,
+                   fixture_dir: str = BENCH_FIXTURE_DIR) -> str:
+    """返回测试音频路径，不存在时合成"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    path = os.path.join(fixture_dir, fixture_name(duration_minutes, samplerate, channels) + ".wav")
+    if not os.path.exists(path):
+        print(f"合成测试音频: {path}")
+        synthesize(path, duration_minutes * 60, samplerate, channels)
+    return path
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def _serve_directory(directory: str):
+    """在本地临时启动 HTTP 服务，返回服务地址"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _streaming(wav_path, out_dir):
+    output = os.path.join(out_dir, "episode.mp3")
+    return AudioHandler.convert_streaming(wav_path, output), [output]
+
+
+def _streaming_raw(wav_path, out_dir):
+    output = os.path.join(out_dir, "episode.mp3")
+    return AudioHandler.convert_streaming(wav_path, output, normalize=False, trim_silence=False), [output]
+
+
+def _ladder(wav_path, out_dir):
+    output = os.path.join(out_dir, "episode.mp3")
+    renditions = AudioHandler.rendition_paths(output)
+    return AudioHandler.convert_streaming(wav_path, output, renditions=renditions), [output, *renditions]
+
+
+def _stream_url(wav_path, out_dir):
+    output = os.path.join(out_dir, "episode.mp3")
+    with _serve_directory(os.path.dirname(os.path.abspath(wav_path))) as base_url:
+        url = f"{base_url}/{os.path.basename(wav_path)}"
+        return AudioHandler.stream_convert_url(url, output), [output]
+
+
+def _in_memory(wav_path, out_dir):
+    # 非流式路径总是写出 WAV
+    output = os.path.join(out_dir, "episode.wav")
+    return AudioHandler.convert_wav_to_mp3(wav_path, output, streaming=False), [output]
+
+
+# 转换策略：名称 -> 函数(输入 WAV, 输出目录) -> (是否成功, 输出文件列表)
+STRATEGIES = {
+    "streaming": _streaming,
+    "streaming_raw": _streaming_raw,
+    "ladder": _ladder,
+    "stream_url": _stream_url,
+    "in_memory": _in_memory,
+}
+
+
+def _status_kb(field: str):
+    """读取 /proc/self/status 中的内存字段（KB），不支持时返回 None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class PeakRss:
+    """
+    测量 with 块执行期间的峰值 RSS
+
+    spawn 出的子进程会继承父进程的 ru_maxrss，不能反映转换本身的内存占用。
+    Linux 上先向 /proc/self/clear_refs 写入 5，把内核记录的峰值（VmHWM）重置为当前 RSS，结束时读取 VmHWM；
+    不能重置时在线程中定时采样 VmRSS。
+    """
+
+    def __init__(self):
+        self.baseline_kb = None
+        self.peak_kb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.peak_kb = max(self.peak_kb, _status_kb("VmRSS") or 0)
+
+    def __enter__(self):
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+        self.baseline_kb = self.peak_kb = _status_kb("VmRSS") or 0
+        if self._thread:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        else:
+            self.peak_kb = _status_kb("VmHWM") or self.peak_kb
+        self.peak_kb = max(self.peak_kb, _status_kb("VmRSS") or 0)
+
+
+def _measure(strategy: str, wav_path: str, out_dir: str, conn) -> None:
+    """子进程入口：执行一次转换，返回耗时、CPU 时间和转换期间的峰值内存"""
+    log = io.StringIO()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with PeakRss() as rss:
+        try:
+            with contextlib.redirect_stdout(log):
+                success, outputs = STRATEGIES[strategy](wav_path, out_dir)
+            error = None if success else (log.getvalue().strip().splitlines() or ["转换失败"])[-1]
+        except Exception as e:
+            success, outputs, error = False, [], str(e)
+    wall = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    conn.send({
+        "success": success,
+        "error": error,
+        "wall_seconds": round(wall, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime - usage_before.ru_utime - usage_before.ru_stime, 3),
+        "baseline_rss_mb": round(rss.baseline_kb / 1024, 1),
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1),
+        # 转换本身增加的内存，比较结果时使用
+        "rss_growth_mb": round((rss.peak_kb - rss.baseline_kb) / 1024, 1),
+        "output_bytes": sum(os.path.getsize(path) for path in outputs if os.path.exists(path)),
+    })
+    conn.close()
+
+
+def run_strategy(strategy: str, wav_path: str) -> dict:
+    """
+    在独立的子进程中执行一次转换
+
+    每次都是全新的进程，峰值内存互不影响；子进程被杀死（例如内存不足）时记录为失败。
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    with get_workspace_manager().workspace(f"bench-{uuid.uuid4().hex[:8]}") as workspace:
+        process = context.Process(target=_measure, args=(strategy, wav_path, workspace.path, sender))
+        process.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = None
+        process.join()
+    if result is None:
+        return {"success": False, "error": f"子进程退出码 {process.exitcode}"}
+    return result
+
+
+def run_benchmark(fixtures: list, strategies: list, repeat: int = DEFAULT_REPEAT,
+                  fixture_dir: str = BENCH_FIXTURE_DIR) -> dict:
+    """
+    对每个测试音频和每种转换策略计时
+
+    重复多次时取最短耗时，内存取各次运行的中位数。
+
+    Args:
+        fixtures: [(时长分钟, 采样率, 声道数)]
+        strategies: STRATEGIES 中的策略名称
+
+    Returns:
+        dict: 可以直接写成 JSON 的结果，results 中每项对应一个（测试音频，策略）组合
+    """
+    fixture_info = {}
+    results = []
+    for duration, samplerate, channels in fixtures:
+        wav_path = ensure_fixture(duration, samplerate, channels, fixture_dir)
+        name = fixture_name(duration, samplerate, channels)
+        fixture_info[name] = {
+            "duration_seconds": duration * 60,
+            "samplerate": samplerate,
+            "channels": channels,
+            "bytes": os.path.getsize(wav_path),
+        }
+        for strategy in strategies:
+            runs = [run_strategy(strategy, wav_path) for _ in range(repeat)]
+            ok = [run for run in runs if run["success"]]
+            if ok:
+                result = dict(min(ok, key=lambda run: run["wall_seconds"]),
+                              peak_rss_mb=statistics.median(run["peak_rss_mb"] for run in ok),
+                              rss_growth_mb=statistics.median(run["rss_growth_mb"] for run in ok))
+                result["realtime_factor"] = round(duration * 60 / max(result["wall_seconds"], 1e-3), 1)
+            else:
+                result = runs[-1]
+            result = dict(result, fixture=name, strategy=strategy, runs=len(runs))
+            results.append(result)
+            print_result(result)
+
+    return {
+        "version": RESULT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "fixtures": fixture_info,
+        "results": results,
+    }
+
+
+def environment() -> dict:
+    """记录影响结果的环境信息，便于比较不同版本的结果"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "soundfile": sf.__version__,
+        "libsndfile": sf.__libsndfile_version__,
+    }
+
+
+def print_result(result: dict) -> None:
+    if not result["success"]:
+        print(f"❌ {result['fixture']:<24}{result['strategy']:<16}{result['error']}")
+        return
+    print(f"✓ {result['fixture']:<24}{result['strategy']:<16}{result['wall_seconds']:>9.2f}秒"
+          f"{result['realtime_factor']:>9}x{result['rss_growth_mb']:>+9.1f}MB"
+          f"{result['output_bytes'] / (1024 * 1024):>9.2f}MB")
+
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    与之前的结果比较耗时、转换期间的内存增长和输出大小
+
+    两次结果中只出现在一方的组合会列出；没有任何共同的组合时视为失败，而不是直接通过。
+    内存增长和耗时的变化量分别不超过 RSS_NOISE_MB、WALL_NOISE_SECONDS 时不算退化。
+
+    Returns:
+        list: 超出容差的退化描述
+    """
+    if baseline.get("version") != RESULT_VERSION:
+        return [f"基准结果的版本为 {baseline.get('version')}，当前为 {RESULT_VERSION}，请重新生成基准结果"]
+    previous = {(r["fixture"], r["strategy"]): r for r in baseline["results"]}
+    keys = {(r["fixture"], r["strategy"]) for r in current["results"]}
+    for key in sorted(previous.keys() - keys):
+        print(f"本次没有运行: {key[0]} {key[1]}")
+    for key in sorted(keys - previous.keys()):
+        print(f"基准结果中没有: {key[0]} {key[1]}")
+    if not keys & previous.keys():
+        return ["两次结果没有共同的测试音频和策略，无法比较（请使用相同的 --durations/--samplerates/--channels 或 --quick）"]
+
+    regressions = []
+    print(f"\n{'测试音频':<24}{'策略':<16}{'耗时':>10}{'内存增长':>10}{'大小':>10}")
+    for result in current["results"]:
+        key = (result["fixture"], result["strategy"])
+        old = previous.get(key)
+        if not old:
+            continue
+        if old["success"] and not result["success"]:
+            regressions.append(f"{key[0]} {key[1]}: 转换失败 ({result['error']})")
+            continue
+        if not (old["success"] and result["success"]):
+            continue
+        changes = []
+        for metric in ("wall_seconds", "rss_growth_mb", "output_bytes"):
+            delta = result[metric] - old[metric]
+            change = delta / old[metric] if old[metric] > 0 else 0.0
+            changes.append(f"{change:+.0%}")
+            if delta <= {"rss_growth_mb": RSS_NOISE_MB, "wall_seconds": WALL_NOISE_SECONDS}.get(metric, 0):
+                continue
+            if change > tolerance or (old[metric] <= 0 and delta > 0):
+                regressions.append(f"{key[0]} {key[1]}: {metric} {old[metric]} -> {result[metric]} ({change:+.0%})")
+        print(f"{key[0]:<24}{key[1]:<16}" + "".join(f"{change:>10}" for change in changes))
+    return regressions
+
+
+def _numbers(text: str, cast):
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='音频转换性能测试：合成多人对话音频并比较各转换策略')
+    parser.add_argument('--durations', default=",".join(map(str, DEFAULT_DURATIONS)),
+                        help='测试音频时长（分钟，逗号分隔）')
+    parser.add_argument('--samplerates', default=",".join(map(str, DEFAULT_SAMPLERATES)),
+                        help='测试音频采样率（逗号分隔）')
+    parser.add_argument('--channels', default=",".join(map(str, DEFAULT_CHANNELS)), help='声道数（逗号分隔）')
+    parser.add_argument('--strategies', default=",".join(STRATEGIES),
+                        help=f'转换策略（逗号分隔），可选: {", ".join(STRATEGIES)}')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='每个组合重复的次数，取最短耗时和内存增长的中位数')
+    parser.add_argument('--quick', action='store_true', help='只用 1 分钟的单声道 24kHz 和立体声 48kHz 音频快速检查')
+    parser.add_argument('--fixture-dir', default=BENCH_FIXTURE_DIR, help='测试音频存放目录')
+    parser.add_argument('--json', metavar='PATH', help='把结果写入 JSON 文件')
+    parser.add_argument('--compare', metavar='PATH', help='与之前保存的 JSON 结果比较，出现退化时返回非零退出码')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='允许的退化比例')
+    args = parser.parse_args()
+
+    strategies = [name.strip() for name in args.strategies.split(",") if name.strip()]
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        parser.error(f"未知的转换策略: {', '.join(unknown)}")
+
+    if args.quick:
+        fixtures = [(1, 24000, 1), (1, 48000, 2)]
+    else:
+        fixtures = list(itertools.product(_numbers(args.durations, float), _numbers(args.samplerates, int),
+                                          _numbers(args.channels, int)))
+    report = run_benchmark(fixtures, strategies, args.repeat, args.fixture_dir)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入: {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"⚠️ {regression}")
+        sys.exit(1 if regressions else 0)
@@ -1,16 +1,289 @@
-import requests
+import http_session
 import soundfile as sf
 import scipy.io.wavfile
 import os
+import queue
+import struct
+import tempfile
+import threading
 import numpy as np
+from contextlib import contextmanager
+from math import gcd
 from scipy import signal
 
+from loudness import LoudnessMeter, TruePeakLimiter, TARGET_LOUDNESS, loudness_gain
+from silence import SilenceCompactor
+from workspace import WORKSPACE_SPOOL_DIR
+
+# 输出文件扩展名 -> libsndfile 的 (format, subtype)
+OUTPUT_FORMATS = {
+    ".mp3": ("MP3", "MPEG_LAYER_III"),
+    ".ogg": ("OGG", "VORBIS"),
+    ".opus": ("OGG", "OPUS"),
+    ".flac": ("FLAC", "PCM_16"),
+    ".wav": ("WAV", "PCM_16"),
+}
+
+# Opus 编码器只接受以下采样率
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# 流式处理时每次读取的帧数
+DEFAULT_BLOCK_SIZE = 65536
+
+# 边下载边转码时每个网络分块的大小，以及内存中最多缓存的分块数
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_BUFFER_CHUNKS = 32
+
+# 多码率输出的默认阶梯：名称 -> MP3 恒定比特率（kbps），均为单声道。
+# 主输出是 22.05kHz 单声道 VBR 语音，通常只有 30-45kbps：低档供弱网播放，
+# 48k 给需要恒定码率（按字节精确拖动）的播放器，体积与主输出相当
+RENDITION_LADDER = {"24k": 24, "32k": 32, "48k": 48}
+# 每个编码线程的输入队列中最多缓存的数据块数
+ENCODER_QUEUE_BLOCKS = 8
+
+# WAV fmt 块中的编码类型
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class StreamingResampler:
+    """
+    分块的多相重采样器
+
+    与 scipy.signal.resample_poly 使用相同的 FIR 滤波器和延迟补偿，
+    但只保留滤波器长度的历史数据，因此内存占用与音频长度无关。
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        divisor = gcd(int(orig_sr), int(target_sr))
+        self.up = int(target_sr) // divisor
+        self.down = int(orig_sr) // divisor
+
+        # 与 resample_poly 的默认滤波器保持一致
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        h = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0)) * self.up
+        n_pre_pad = self.down - half_len % self.down
+        self._h = np.concatenate([np.zeros(n_pre_pad), h]).astype(np.float32)
+        self._skip = (half_len + n_pre_pad) // self.down
+
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._buf_start = 0   # _buf[0] 在整个输入中的位置，始终是 down 的整数倍
+        self._next_out = 0    # 下一个要输出的样本在完整滤波结果中的位置
+        self._n_in = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """输入一个单声道数据块，返回已经可以确定的重采样结果"""
+        block = np.asarray(block, dtype=np.float32)
+        self._n_in += len(block)
+        return self._emit(block, self._next_out_limit())
+
+    def flush(self) -> np.ndarray:
+        """输入结束，输出剩余的重采样结果"""
+        n_total = self._skip + -(-self._n_in * self.up // self.down)
+        tail = np.zeros(-(-len(self._h) // self.up) + self.down, dtype=np.float32)
+        return self._emit(tail, n_total)
+
+    def _next_out_limit(self) -> int:
+        return 0 if self._n_in == 0 else ((self._n_in * self.up - 1) // self.down + 1)
+
+    def _emit(self, block: np.ndarray, n_hi: int) -> np.ndarray:
+        buf = np.concatenate([self._buf, block])
+        if len(buf) == 0 or n_hi <= self._next_out:
+            self._buf = buf
+            return np.zeros(0, dtype=np.float32)
+
+        y = signal.upfirdn(self._h, buf, self.up, self.down)
+        base = self._buf_start * self.up // self.down
+        lo = max(self._next_out, self._skip)
+        out = y[lo - base:n_hi - base] if n_hi > lo else y[:0]
+        self._next_out = n_hi
+
+        # 仅保留计算后续输出所需的历史数据
+        keep_from = max(0, (n_hi * self.down - (len(self._h) - 1)) // self.up)
+        keep_from = max(self._buf_start, keep_from // self.down * self.down)
+        self._buf = buf[keep_from - self._buf_start:]
+        self._buf_start = keep_from
+        return out.astype(np.float32, copy=False)
+
+
+class WavStreamReader:
+    """
+    从字节流中逐块解码 WAV（PCM 8/16/24/32 位整数或 32/64 位浮点）
+
+    只向前读取，不需要 seek，因此可以直接消费 HTTP 响应的数据块。
+    """
+
+    def __init__(self, byte_chunks):
+        self._chunks = iter(byte_chunks)
+        self._buf = bytearray()
+        self._eof = False
+        self.samplerate = None
+        self.channels = None
+        self._format = None
+        self._sample_width = None
+        self._data_left = None
+        self._read_header()
+
+    def _fill(self, n: int) -> None:
+        while len(self._buf) < n and not self._eof:
+            try:
+                self._buf.extend(next(self._chunks))
+            except StopIteration:
+                self._eof = True
+
+    def _read_exact(self, n: int) -> bytes:
+        self._fill(n)
+        if len(self._buf) < n:
+            raise ValueError("WAV 数据不完整")
+        data = bytes(self._buf[:n])
+        del self._buf[:n]
+        return data
+
+    def _read_header(self) -> None:
+        riff, _, wave = struct.unpack('<4sI4s', self._read_exact(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError("不是 RIFF/WAVE 格式，无法流式解码")
+
+        while True:
+            chunk_id, chunk_size = struct.unpack('<4sI', self._read_exact(8))
+            if chunk_id == b'fmt ':
+                fmt = self._read_exact(chunk_size + chunk_size % 2)
+                audio_format, self.channels, self.samplerate = struct.unpack('<HHI', fmt[:8])
+                bits = struct.unpack('<H', fmt[14:16])[0]
+                if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                    audio_format = struct.unpack('<H', fmt[24:26])[0]
+                if audio_format not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+                    raise ValueError(f"不支持的 WAV 编码类型: {audio_format}")
+                self._format = audio_format
+                self._sample_width = bits // 8
+            elif chunk_id == b'data':
+                if self._format is None:
+                    raise ValueError("WAV 缺少 fmt 块")
+                # 流式生成的 WAV 可能把长度写成 0 或 0xFFFFFFFF，此时读到结尾为止
+                self._data_left = None if chunk_size in (0, 0xFFFFFFFF) else chunk_size
+                return
+            else:
+                self._read_exact(chunk_size + chunk_size % 2)
+
+    def _decode(self, raw: bytes) -> np.ndarray:
+        width = self._sample_width
+        if self._format == WAVE_FORMAT_IEEE_FLOAT:
+            data = np.frombuffer(raw, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+        elif width == 1:
+            data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif width == 2:
+            data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+        elif width == 3:
+            b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            data = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 8388608.0
+        elif width == 4:
+            data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+        else:
+            raise ValueError(f"不支持的采样位宽: {width * 8}")
+        return data.reshape(-1, self.channels)
+
+    def blocks(self, blocksize: int = DEFAULT_BLOCK_SIZE):
+        """逐块返回形状为 (frames, channels) 的 float32 数据"""
+        frame_bytes = self._sample_width * self.channels
+        want = blocksize * frame_bytes
+        while True:
+            if self._data_left is not None:
+                want = min(want, self._data_left)
+            self._fill(want)
+            n = min(len(self._buf), want) // frame_bytes * frame_bytes
+            if n == 0:
+                return
+            raw = bytes(self._buf[:n])
+            del self._buf[:n]
+            if self._data_left is not None:
+                self._data_left -= n
+            yield self._decode(raw)
+
+
+class ParallelEncoder:
+    """
+    把同一份单声道 PCM 同时写入多个编码器
+
+    每个输出文件由一个线程编码（libsndfile 的编码调用不持有 GIL，多个编码器可以并行），
+    通过有界队列接收数据块；所有编码器收到的是同一个只读数组，不复制数据。
+    任一编码器出错时停止所有编码器，close 时抛出该异常。
+    """
+
+    def __init__(self, outputs: list, samplerate: int, max_queue_blocks: int = ENCODER_QUEUE_BLOCKS):
+        """
+        Args:
+            outputs: [(输出路径, SoundFile 参数字典)]，参数为 format、subtype、compression_level、bitrate_mode
+            samplerate: 采样率
+            max_queue_blocks: 每个编码器最多缓存的数据块数
+        """
+        self._stop = threading.Event()
+        self._errors = []
+        self._queues = []
+        self._threads = []
+        for path, settings in outputs:
+            blocks = queue.Queue(maxsize=max_queue_blocks)
+            thread = threading.Thread(target=self._run, args=(path, settings, samplerate, blocks), daemon=True)
+            self._queues.append(blocks)
+            self._threads.append(thread)
+            thread.start()
+
+    def _run(self, path, settings, samplerate, blocks):
+        try:
+            with sf.SoundFile(path, 'w', samplerate=samplerate, channels=1, **settings) as out:
+                while True:
+                    block = blocks.get()
+                    if block is None:
+                        return
+                    if not self._stop.is_set():
+                        out.write(block)
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+            # 继续取出数据，避免写入方阻塞在已满的队列上
+            while blocks.get() is not None:
+                pass
+
+    def write(self, block: np.ndarray) -> None:
+        """把一个数据块交给所有编码器"""
+        if self._errors:
+            raise self._errors[0]
+        shared = block.view()
+        shared.flags.writeable = False
+        for blocks in self._queues:
+            blocks.put(shared)
+
+    def close(self) -> None:
+        """等待所有编码器写完并关闭文件"""
+        for blocks in self._queues:
+            blocks.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # 出错时尽快结束编码线程，保留原始异常
+        self._stop.set()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
 class AudioHandler:
     @staticmethod
     def download_audio(audio_url, output_path):
         """下载音频文件"""
         try:
-            response = requests.get(audio_url, stream=True)
+            response = http_session.get(audio_url, stream=True)
             if response.status_code == 200:
                 with open(output_path, 'wb') as audio_file:
                     for chunk in response.iter_content(chunk_size=1024):
@@ -25,15 +298,32 @@ class AudioHandler:
             return False
 
     @staticmethod
-    def convert_wav_to_mp3(wav_path, mp3_path, target_sr=22050):
+    def convert_wav_to_mp3(wav_path, mp3_path, target_sr=22050, streaming=True,
+                           block_size=DEFAULT_BLOCK_SIZE, compression_level=None, trim_silence=True,
+                           renditions=None):
         """
         使用 soundfile 和 scipy 将 WAV 转换为 MP3，并进行压缩
         
         Args:
             wav_path: WAV文件路径
-            mp3_path: 输出的MP3文件路径
+            mp3_path: 输出的MP3文件路径（扩展名决定编码格式，支持 .mp3/.ogg/.opus/.flac/.wav）
             target_sr: 目标采样率（默认22050Hz，可以降低文件大小）
+            streaming: 是否使用分块流式转换（内存占用恒定）；False 时整段读入内存处理
+            block_size: 流式转换时每次读取的帧数
+            compression_level: 编码压缩等级（0-1，None 使用 libsndfile 默认值）
+            trim_silence: 是否去掉首尾静音并压缩过长的停顿
+            renditions: 额外的多码率输出 {输出路径: MP3 比特率（kbps）}，需要 streaming=True
         """
+        if streaming:
+            return AudioHandler.convert_streaming(
+                wav_path, mp3_path, target_sr=target_sr,
+                block_size=block_size, compression_level=compression_level,
+                trim_silence=trim_silence, renditions=renditions
+            )
+        if renditions:
+            print("❌ 多码率输出需要流式转换")
+            return False
+
         try:
             # 读取 WAV 文件
             data, samplerate = sf.read(wav_path)
@@ -49,10 +339,21 @@ class AudioHandler:
             # 重采样到较低的采样率
             if samplerate != target_sr:
                 samples = int(len(data) * target_sr / samplerate)
-                data = signal.resample(data, samples)
+                data = signal.resample(data, samples).astype(np.float32)
+            
+            # 去掉首尾静音并压缩过长的停顿
+            removed = 0.0
+            if trim_silence:
+                compactor = SilenceCompactor(target_sr)
+                data = np.concatenate([compactor.process(data), compactor.flush()])
+                removed = compactor.removed_seconds
             
-            # 标准化音频
-            data = data / np.max(np.abs(data))
+            # 响度标准化（静音输入不放大），并限制真峰值
+            meter = LoudnessMeter(target_sr)
+            meter.process(data)
+            data = data * np.float32(loudness_gain(meter.integrated_loudness()))
+            limiter = TruePeakLimiter(target_sr)
+            data = np.clip(np.concatenate([limiter.process(data), limiter.flush()]), -1.0, 1.0)
             
             # 写入新的音频文件
             scipy.io.wavfile.write(mp3_path, target_sr, data)
@@ -60,9 +361,352 @@ class AudioHandler:
             print(f"✓ 音频转换成功: {wav_path} -> {mp3_path}")
             print(f"  原始采样率: {samplerate}Hz")
             print(f"  压缩后采样率: {target_sr}Hz")
+            if removed:
+                print(f"  去除静音: {removed:.1f} 秒")
             print(f"  文件大小: {os.path.getsize(mp3_path) / (1024*1024):.2f}MB")
             return True
                 
         except Exception as e:
             print(f"❌ 转换过程出错: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def _output_format(output_path, target_sr):
+        """根据扩展名确定编码格式，返回 (format, subtype, samplerate)"""
+        ext = os.path.splitext(output_path)[1].lower()
+        if ext not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {ext}")
+        out_format, out_subtype = OUTPUT_FORMATS[ext]
+        if out_subtype == "OPUS" and target_sr not in OPUS_SAMPLE_RATES:
+            # 取不低于目标采样率的最小可用值
+            target_sr = next((sr for sr in OPUS_SAMPLE_RATES if sr >= target_sr), 48000)
+        return out_format, out_subtype, target_sr
+
+    @staticmethod
+    def _resample_mono(blocks, samplerate, target_sr):
+        """把 (frames, channels) 数据块转为单声道并重采样，逐块返回 float32 数据"""
+        resampler = StreamingResampler(samplerate, target_sr) if samplerate != target_sr else None
+
+        for block in blocks:
+            mono = block.mean(axis=1, dtype=np.float32)
+            out = resampler.process(mono) if resampler else mono
+            if len(out):
+                yield out
+
+        if resampler:
+            tail = resampler.flush()
+            if len(tail):
+                yield tail
+
+    @staticmethod
+    def _iter_mono_blocks(wav_path, target_sr, block_size):
+        """分块读取音频文件，转为单声道并重采样"""
+        samplerate = sf.info(wav_path).samplerate
+        blocks = sf.blocks(wav_path, blocksize=block_size, dtype='float32', always_2d=True)
+        return AudioHandler._resample_mono(blocks, samplerate, target_sr)
+
+    @staticmethod
+    def _trimmed(blocks, target_sr, trim_silence):
+        """可选的静音裁剪，返回 (SilenceCompactor 或 None, 裁剪后的数据块)"""
+        if not trim_silence:
+            return None, blocks
+        compactor = SilenceCompactor(target_sr)
+        return compactor, compactor.filter(blocks)
+
+    @staticmethod
+    def _metered(blocks, meter):
+        """逐块测量响度（EBU R128 / BS.1770），原样返回数据块"""
+        for block in blocks:
+            meter.process(block)
+            yield block
+
+    @staticmethod
+    def _write_limited(blocks, write, target_sr, gain):
+        """乘以增益、经真峰值限幅后写入编码器"""
+        limiter = TruePeakLimiter(target_sr)
+        for block in blocks:
+            limited = limiter.process(block * gain)
+            if len(limited):
+                write(np.clip(limited, -1.0, 1.0))
+        tail = limiter.flush()
+        if len(tail):
+            write(np.clip(tail, -1.0, 1.0))
+
+    @staticmethod
+    @contextmanager
+    def _spooled(blocks, target_sr, block_size, spool_dir):
+        """
+        把数据块暂存为磁盘上的 24 位 FLAC 文件，返回重新逐块读取的函数
+        
+        只用于无法重新读取的输入（边下载边转码），是这条路径上唯一落地的中间文件，with 块结束时删除。
+        暂存的是增益之前的数据：用 24 位而不是 16 位量化，标准化时即使提升 20dB 以上，
+        放大后的量化噪声仍远低于 MP3 编码本身的噪声；文件比 float32 原始数据小约一半。
+        """
+        os.makedirs(spool_dir, exist_ok=True)
+        fd, spool_path = tempfile.mkstemp(suffix=".flac", dir=spool_dir)
+        os.close(fd)
+        try:
+            with sf.SoundFile(spool_path, 'w', samplerate=target_sr, channels=1,
+                              format='FLAC', subtype='PCM_24') as spool:
+                for block in blocks:
+                    spool.write(np.clip(block, -1.0, 1.0))
+            yield lambda: sf.blocks(spool_path, blocksize=block_size, dtype='float32')
+        finally:
+            os.remove(spool_path)
+
+    @staticmethod
+    def _encode(blocks, outputs, target_sr, block_size=DEFAULT_BLOCK_SIZE, normalize=True,
+                target_lufs=TARGET_LOUDNESS, trim_silence=True, reopen=None, spool_dir=WORKSPACE_SPOOL_DIR):
+        """
+        把单声道数据块编码到一个或多个输出文件，可选静音裁剪和响度标准化
+        
+        静音裁剪在测量响度之前进行，去掉首尾静音并压缩过长的停顿，见 SilenceCompactor。
+        响度标准化需要先测完整段音频：能重新读取输入时（reopen），第一遍只测量响度，
+        第二遍重新解码并写入，内存和磁盘占用都与音频长度无关；否则把数据暂存到 spool_dir 下的 FLAC 文件。
+        处理后的数据只生成一份，由 ParallelEncoder 并行写入所有输出文件。
+        
+        Args:
+            outputs: [(输出路径, SoundFile 参数字典)]，第一个为主输出
+            reopen: 重新生成同样数据块的函数，None 表示输入只能读取一次
+            spool_dir: 输入只能读取一次时暂存数据的目录
+        
+        Returns:
+            dict: 响度（LUFS）、增益（dB）、去掉的静音秒数和估计节省的字节数（按主输出计算）
+        """
+        stats = {"loudness": None, "gain_db": 0.0, "silence_removed": 0.0, "bytes_saved": 0}
+        output_path = outputs[0][0]
+
+        with ParallelEncoder(outputs, target_sr) as encoder:
+            if not normalize:
+                compactor, blocks = AudioHandler._trimmed(blocks, target_sr, trim_silence)
+                for block in blocks:
+                    encoder.write(np.clip(block, -1.0, 1.0))
+            elif reopen is not None:
+                # 第一遍：只测量响度
+                meter = LoudnessMeter(target_sr)
+                for _ in AudioHandler._metered(AudioHandler._trimmed(blocks, target_sr, trim_silence)[1], meter):
+                    pass
+                stats["loudness"] = meter.integrated_loudness()
+                gain = np.float32(loudness_gain(stats["loudness"], target_lufs))
+                # 第二遍：重新解码，增益和限幅
+                compactor, blocks = AudioHandler._trimmed(reopen(), target_sr, trim_silence)
+                AudioHandler._write_limited(blocks, encoder.write, target_sr, gain)
+            else:
+                compactor, blocks = AudioHandler._trimmed(blocks, target_sr, trim_silence)
+                meter = LoudnessMeter(target_sr)
+                with AudioHandler._spooled(AudioHandler._metered(blocks, meter), target_sr, block_size,
+                                           spool_dir) as read_spool:
+                    stats["loudness"] = meter.integrated_loudness()
+                    gain = np.float32(loudness_gain(stats["loudness"], target_lufs))
+                    AudioHandler._write_limited(read_spool(), encoder.write, target_sr, gain)
+            if normalize:
+                stats["gain_db"] = float(20 * np.log10(gain))
+
+        if compactor and compactor.removed_samples:
+            kept = compactor.input_samples - compactor.removed_samples
+            stats["silence_removed"] = compactor.removed_seconds
+            # 按输出文件的平均码率估算
+            if kept:
+                stats["bytes_saved"] = int(os.path.getsize(output_path) * compactor.removed_samples / kept)
+        return stats
+
+    @staticmethod
+    def _outputs(output_path, target_sr, compression_level=None, renditions=None):
+        """
+        确定主输出和各个多码率输出的编码参数
+        
+        Args:
+            output_path: 主输出文件路径
+            target_sr: 目标采样率
+            compression_level: 主输出的编码压缩等级
+            renditions: {输出路径: MP3 比特率（kbps）}
+        
+        Returns:
+            tuple: ([(输出路径, SoundFile 参数字典)], 实际使用的采样率)
+        """
+        out_format, out_subtype, target_sr = AudioHandler._output_format(output_path, target_sr)
+        outputs = [(output_path, {"format": out_format, "subtype": out_subtype,
+                                  "compression_level": compression_level})]
+        for path, bitrate in (renditions or {}).items():
+            rendition_format, rendition_subtype, _ = AudioHandler._output_format(path, target_sr)
+            if rendition_subtype != "MPEG_LAYER_III":
+                raise ValueError(f"多码率输出只支持 MP3: {path}")
+            outputs.append((path, {"format": rendition_format, "subtype": rendition_subtype,
+                                   "compression_level": AudioHandler._mp3_compression_level(bitrate, target_sr),
+                                   "bitrate_mode": "CONSTANT"}))
+        return outputs, target_sr
+
+    @staticmethod
+    def _mp3_compression_level(bitrate, samplerate):
+        """
+        把 MP3 恒定比特率换算为 libsndfile 的压缩等级
+        
+        libsndfile 在该采样率可用的比特率范围内按压缩等级线性取值（MPEG-1 为 32-320kbps，
+        低采样率的 MPEG-2/2.5 为 8-160kbps），再取最接近的有效比特率。
+        """
+        max_kbps, min_kbps = (320, 32) if samplerate >= 32000 else (160, 8)
+        bitrate = min(max(bitrate, min_kbps), max_kbps)
+        return min((max_kbps - bitrate) / (max_kbps - min_kbps), 0.99)
+
+    @staticmethod
+    def rendition_paths(output_path, ladder=None):
+        """按码率阶梯生成与主输出同目录的多码率输出路径，例如 episode.mp3 -> episode_24k.mp3"""
+        base = os.path.splitext(output_path)[0]
+        return {f"{base}_{name}.mp3": bitrate for name, bitrate in (ladder or RENDITION_LADDER).items()}
+
+    @staticmethod
+    def convert_streaming(wav_path, output_path, target_sr=22050,
+                          block_size=DEFAULT_BLOCK_SIZE, compression_level=None,
+                          normalize=True, target_lufs=TARGET_LOUDNESS, trim_silence=True, renditions=None):
+        """
+        分块流式转换音频：单声道、重采样、响度标准化并编码为压缩格式
+        
+        内存中只保留一个数据块；响度标准化时源文件解码两遍（先测量再写入），不暂存中间数据，见 _encode；
+        指定 renditions 时同一份数据同时编码为多个码率。
+        
+        Args:
+            wav_path: 输入音频文件路径
+            output_path: 输出文件路径，扩展名决定编码格式
+            target_sr: 目标采样率
+            block_size: 每次读取的帧数
+            compression_level: 编码压缩等级（0-1）
+            normalize: 是否把响度标准化到 target_lufs
+            target_lufs: 目标响度（LUFS）
+            trim_silence: 是否去掉首尾静音并压缩过长的停顿
+            renditions: 额外的多码率输出 {输出路径: MP3 比特率（kbps）}，见 rendition_paths
+            
+        Returns:
+            bool: 转换是否成功
+        """
+        try:
+            outputs, target_sr = AudioHandler._outputs(output_path, target_sr, compression_level, renditions)
+
+            info = sf.info(wav_path)
+            def reopen():
+                return AudioHandler._iter_mono_blocks(wav_path, target_sr, block_size)
+
+            stats = AudioHandler._encode(reopen(), outputs, target_sr, block_size, normalize, target_lufs,
+                                         trim_silence, reopen=reopen)
+
+            print(f"✓ 音频转换成功: {wav_path} -> {output_path}")
+            print(f"  原始采样率: {info.samplerate}Hz")
+            AudioHandler._print_stats(stats)
+            print(f"  压缩后采样率: {target_sr}Hz")
+            AudioHandler._print_outputs(outputs)
+            return True
+
+        except Exception as e:
+            print(f"❌ 转换过程出错: {str(e)}")
+            return False
+
+    @staticmethod
+    def _print_outputs(outputs):
+        for path, settings in outputs:
+            print(f"  输出格式: {settings['format']}/{settings['subtype']}  {path}")
+            print(f"  文件大小: {os.path.getsize(path) / (1024*1024):.2f}MB")
+
+    @staticmethod
+    def _print_stats(stats):
+        if stats["silence_removed"]:
+            print(f"  去除静音: {stats['silence_removed']:.1f} 秒，约 {stats['bytes_saved'] / (1024*1024):.2f}MB")
+        if stats["loudness"] is not None:
+            print(f"  响度: {stats['loudness']:.1f} LUFS，增益 {stats['gain_db']:+.1f}dB")
+
+    @staticmethod
+    def _stream_response(response, chunk_size, max_buffer_chunks, stop):
+        """
+        在后台线程中读取 HTTP 响应，通过有界队列把数据块交给解码线程
+        
+        队列满时下载线程阻塞，内存中最多缓存 max_buffer_chunks 个分块。
+        """
+        chunks = queue.Queue(maxsize=max_buffer_chunks)
+        errors = []
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk and not put(chunk):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(None)
+                response.close()
+
+        threading.Thread(target=producer, daemon=True).start()
+
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def stream_convert_url(audio_url, output_path, target_sr=22050, block_size=DEFAULT_BLOCK_SIZE,
+                           compression_level=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                           max_buffer_chunks=DOWNLOAD_BUFFER_CHUNKS, normalize=True,
+                           target_lufs=TARGET_LOUDNESS, trim_silence=True, renditions=None,
+                           spool_dir=WORKSPACE_SPOOL_DIR):
+        """
+        边下载边转码：HTTP 数据流直接送入解码、重采样和编码流程，不落地下载的 WAV 文件
+        
+        响度标准化需要先测完整段音频，此时会把重采样、裁剪后的单声道数据暂存为 spool_dir 下的 24 位 FLAC，
+        这是唯一的磁盘中间文件，换来的是不需要重新下载或解码，见 _spooled。关闭 normalize 时完全不落地。
+        源文件不是 WAV 时返回 False，调用方可以回退到 download_audio + convert_wav_to_mp3。
+        
+        Args:
+            audio_url: 音频文件的URL
+            output_path: 输出文件路径，扩展名决定编码格式
+            target_sr: 目标采样率
+            block_size: 每次解码的帧数
+            compression_level: 编码压缩等级（0-1）
+            chunk_size: 每个网络分块的字节数
+            max_buffer_chunks: 内存中最多缓存的网络分块数
+            normalize: 是否把响度标准化到 target_lufs
+            target_lufs: 目标响度（LUFS）
+            trim_silence: 是否去掉首尾静音并压缩过长的停顿
+            renditions: 额外的多码率输出 {输出路径: MP3 比特率（kbps）}，见 rendition_paths
+            spool_dir: 响度标准化时暂存数据的目录，应当在磁盘上而不是内存文件系统中
+            
+        Returns:
+            bool: 转换是否成功
+        """
+        stop = threading.Event()
+        try:
+            response = http_session.get(audio_url, stream=True)
+            if response.status_code != 200:
+                print(f"❌ 下载失败，状态码: {response.status_code}")
+                response.close()
+                return False
+
+            byte_chunks = AudioHandler._stream_response(response, chunk_size, max_buffer_chunks, stop)
+            reader = WavStreamReader(byte_chunks)
+            outputs, target_sr = AudioHandler._outputs(output_path, target_sr, compression_level, renditions)
+
+            blocks = AudioHandler._resample_mono(reader.blocks(block_size), reader.samplerate, target_sr)
+            stats = AudioHandler._encode(blocks, outputs, target_sr, block_size, normalize, target_lufs,
+                                         trim_silence, spool_dir=spool_dir)
+
+            print(f"✓ 音频边下载边转换成功: {audio_url} -> {output_path}")
+            print(f"  原始采样率: {reader.samplerate}Hz")
+            AudioHandler._print_stats(stats)
+            print(f"  压缩后采样率: {target_sr}Hz")
+            AudioHandler._print_outputs(outputs)
+            return True
+
+        except Exception as e:
+            print(f"❌ 流式转换过程出错: {str(e)}")
+            return False
+        finally:
+            stop.set()
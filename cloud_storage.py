@@ -1,12 +1,31 @@
 import cloudinary
+import cloudinary.api
 import cloudinary.uploader
-from cloudinary.utils import cloudinary_url
+from cloudinary.exceptions import AuthorizationRequired
+from cloudinary.utils import cloudinary_url, random_public_id
 import os
-import requests
+import threading
+import time
+import http_session
+from resumable_upload import BufferReader, UploadState, retry_delay, UPLOAD_MAX_RETRIES
+
+# 分块上传每块的大小，Cloudinary 要求至少 5MB
+CLOUDINARY_CHUNK_SIZE = int(os.getenv("CLOUDINARY_CHUNK_MB", "20")) * 1024 * 1024
+# 健康检查结果的缓存时间（秒）
+CLOUDINARY_HEALTH_TTL = int(os.getenv("CLOUDINARY_HEALTH_TTL", "300"))
+
+_cloud_storage = None
+_cloud_storage_lock = threading.Lock()
+
 
 class CloudStorage:
     def __init__(self, cloud_name: str, api_key: str, api_secret: str):
-        """初始化 Cloudinary 配置"""
+        """
+        初始化 Cloudinary 配置
+
+        构造时不访问网络：凭据在第一次上传时由实际请求验证，
+        或由 check_health / start_health_check 在后台验证，结果缓存 CLOUDINARY_HEALTH_TTL 秒。
+        """
         # 验证参数
         if not all([cloud_name, api_key, api_secret]):
             raise ValueError("Cloudinary 配置参数不完整")
@@ -14,6 +33,9 @@ class CloudStorage:
         self.cloud_name = cloud_name
         self.api_key = api_key
         self.api_secret = api_secret
+        self._health = None  # (是否可用, 错误信息, 检查时间, 是否为凭据错误)
+        self._health_lock = threading.Lock()
+        self._health_thread = None
         
         # 配置 Cloudinary
         cloudinary.config(
@@ -22,21 +44,67 @@ class CloudStorage:
             api_secret=api_secret,
             secure=True
         )
-        
-        # 验证配置
+
+    def _record_health(self, healthy: bool, error: str = None, auth_failed: bool = False) -> None:
+        with self._health_lock:
+            self._health = (healthy, error, time.monotonic(), auth_failed)
+
+    def cached_health(self):
+        """
+        返回 TTL 内缓存的健康状态，不访问网络
+
+        Returns:
+            tuple: (是否可用, 错误信息)，没有有效缓存时返回 None
+        """
+        with self._health_lock:
+            if self._health and time.monotonic() - self._health[2] < CLOUDINARY_HEALTH_TTL:
+                return self._health[:2]
+        return None
+
+    def check_health(self, force: bool = False) -> bool:
+        """用 ping 验证配置，结果在 TTL 内复用"""
+        cached = None if force else self.cached_health()
+        if cached:
+            return cached[0]
         try:
             cloudinary.api.ping()
+            self._record_health(True)
             print("✓ Cloudinary 配置验证成功")
+            return True
         except Exception as e:
-            raise ValueError(f"Cloudinary 配置验证失败: {str(e)}")
+            self._record_health(False, f"Cloudinary 配置验证失败: {str(e)}",
+                                auth_failed=isinstance(e, AuthorizationRequired))
+            return False
+
+    def start_health_check(self) -> None:
+        """在后台线程中验证配置，不阻塞调用方"""
+        with self._health_lock:
+            if self._health_thread and self._health_thread.is_alive():
+                return
+            self._health_thread = threading.Thread(target=self.check_health, daemon=True)
+            self._health_thread.start()
+
+    def _ensure_ready(self) -> None:
+        """最近一次检查确认凭据无效时直接失败，避免发出注定失败的上传；网络错误不阻止上传"""
+        with self._health_lock:
+            health = self._health
+        if health and health[3] and time.monotonic() - health[2] < CLOUDINARY_HEALTH_TTL:
+            raise ValueError(health[1])
 
-    def upload_audio(self, file_path: str) -> dict:
+    def upload_audio(self, file_path: str, chunk_size: int = CLOUDINARY_CHUNK_SIZE,
+                     progress_callback=None, buffer=None) -> dict:
         """
-        上传音频文件到 Cloudinary
-        
+        分块上传音频文件到 Cloudinary
+
+        与 upload_large 使用相同的分块协议（X-Unique-Upload-Id + Content-Range），
+        每块确认后记录进度，失败或进程重启后从最后确认的块继续。
+
         Args:
             file_path: 本地音频文件路径
-            
+            chunk_size: 每块的字节数
+            progress_callback: 进度回调，参数为（已确认字节数, 总字节数）
+            buffer: 文件内容的共享缓冲区，提供时从缓冲区读取而不再打开文件
+
         Returns:
             dict: 包含上传结果的字典
         """
@@ -44,22 +112,65 @@ class CloudStorage:
             # 验证文件
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"文件不存在: {file_path}")
+            self._ensure_ready()
                 
-            if os.path.getsize(file_path) == 0:
+            total = os.path.getsize(file_path)
+            if total == 0:
                 raise ValueError("文件大小为0")
-                
-            print(f"正在上传文件: {file_path}")
-            
-            # 使用官方的上传方法
-            result = cloudinary.uploader.upload(
-                file_path,
+
+            state = UploadState(file_path)
+            offset = state.get("offset", 0)
+            if not state.get("upload_id") or state.get("chunk_size") != chunk_size or offset >= total:
+                state.reset(upload_id=random_public_id(), chunk_size=chunk_size, offset=0)
+                offset = 0
+            elif offset:
+                print(f"从 {offset}/{total} 字节处继续上传: {file_path}")
+            else:
+                print(f"正在上传文件: {file_path}")
+
+            options = dict(
                 resource_type="auto",  # 自动检测文件类型
                 folder="aipaper_podcasts",  # 指定存储文件夹
                 use_filename=True,  # 使用原始文件名
                 unique_filename=True,  # 确保文件名唯一
                 overwrite=True  # 如果文件已存在则覆盖
             )
-            
+            if state.get("public_id"):
+                options["public_id"] = state.get("public_id")
+
+            result = None
+            with (BufferReader(buffer) if buffer is not None else open(file_path, 'rb')) as f:
+                f.seek(offset)
+                while offset < total:
+                    chunk = f.read(chunk_size)
+                    http_headers = {
+                        "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{total}",
+                        "X-Unique-Upload-Id": state.get("upload_id")
+                    }
+                    for attempt in range(UPLOAD_MAX_RETRIES + 1):
+                        try:
+                            result = cloudinary.uploader.upload_large_part(
+                                (os.path.basename(file_path), chunk), http_headers=http_headers, **options
+                            )
+                            break
+                        except AuthorizationRequired as e:
+                            # 凭据无效，重试没有意义
+                            self._record_health(False, f"Cloudinary 配置验证失败: {str(e)}", auth_failed=True)
+                            raise
+                        except Exception as e:
+                            if attempt == UPLOAD_MAX_RETRIES:
+                                raise
+                            print(f"分块上传失败（{str(e)}），{retry_delay(attempt):.1f} 秒后重试...")
+                            time.sleep(retry_delay(attempt))
+
+                    offset += len(chunk)
+                    options["public_id"] = result.get("public_id")
+                    state.save(offset=offset, public_id=result.get("public_id"))
+                    if progress_callback:
+                        progress_callback(offset, total)
+
+            state.clear()
+            self._record_health(True)
             if result and result.get('secure_url'):
                 return {
                     "success": True,
@@ -91,7 +202,7 @@ class CloudStorage:
             bool: 下载是否成功
         """
         try:
-            response = requests.get(url, stream=True)
+            response = http_session.get(url, stream=True)
             response.raise_for_status()
 
             with open(local_path, 'wb') as f:
@@ -121,8 +232,29 @@ class CloudStorage:
             bool: 删除是否成功
         """
         try:
+            self._ensure_ready()
             response = cloudinary.uploader.destroy(public_id)
             return response['result'] == 'ok'
         except Exception as e:
             print(f"删除失败: {str(e)}")
-            return False 
\ No newline at end of file
+            return False 
+
+
+def get_cloud_storage(health_check: bool = True):
+    """
+    获取进程内共享的 CloudStorage，使用 CLOUDINARY_* 环境变量配置，未配置时返回 None
+
+    Args:
+        health_check: 首次创建时在后台验证配置
+    """
+    global _cloud_storage
+    with _cloud_storage_lock:
+        if _cloud_storage is None:
+            credentials = [os.getenv("CLOUDINARY_CLOUD_NAME"), os.getenv("CLOUDINARY_API_KEY"),
+                           os.getenv("CLOUDINARY_API_SECRET")]
+            if not all(credentials):
+                return None
+            _cloud_storage = CloudStorage(*credentials)
+            if health_check:
+                _cloud_storage.start_health_check()
+        return _cloud_storage
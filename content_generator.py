@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+from paper_cache import arxiv_cache_key
+from podcast_schema import PodcastContent
+
+CONTENT_MODEL = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+# 修改提示词或输出结构时递增，旧的缓存结果随之失效
+PROMPT_VERSION = "2"
+CONTENT_CACHE_DIR = os.getenv("AIPAPER_CONTENT_CACHE_DIR", os.path.join(".cache", "content"))
+CONTENT_CACHE_ENABLED = os.getenv("AIPAPER_CONTENT_CACHE", "1") == "1"
+
+SYSTEM_PROMPT = """你是一个专业的学术播客内容生成助手，根据论文生成播客内容：
+1. title: 吸引听众的播客标题
+2. description: 播客描述，结尾附上论文标题、链接、发表日期和作者
+3. prompt_text: 不超过 100 词的主持人引导语，说明两位主持人应如何讨论这篇论文
+内容应该专业、准确且易于理解。"""
+
+# 严格模式要求列出全部字段且不允许额外字段；audio_link 由音频生成后填写，
+# paper_link 直接使用输入的链接，都不交给模型
+CONTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "prompt_text": {"type": "string"},
+    },
+    "required": ["title", "description", "prompt_text"],
+    "additionalProperties": False,
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _openai_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI()
+        return _client
+
+
+def _cache_path(paper_link: str, model: str) -> str:
+    paper_key = arxiv_cache_key(paper_link) or paper_link.strip()
+    digest = hashlib.sha1(f"{paper_key}|{PROMPT_VERSION}|{model}".encode("utf-8")).hexdigest()
+    return os.path.join(CONTENT_CACHE_DIR, digest + ".json")
+
+
+def _load_cached(path: str) -> Optional[PodcastContent]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return PodcastContent.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cached(path: str, content: PodcastContent) -> None:
+    os.makedirs(CONTENT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content.model_dump_json())
+    os.replace(tmp_path, path)
+
+
+def generate_podcast_content(paper_link: str, context: str = None, use_cache: bool = CONTENT_CACHE_ENABLED,
+                             model: str = CONTENT_MODEL) -> PodcastContent:
+    """
+    用一次结构化输出调用生成播客内容
+
+    模型按 JSON Schema 约束输出，结果一次校验为 PodcastContent，不需要剥离代码块或失败重试。
+
+    Args:
+        paper_link: 论文链接
+        context: 可选的论文信息（标题、摘要等），提供时模型据此写作
+        use_cache: 是否使用按论文链接和提示词版本缓存的结果
+        model: 使用的模型
+
+    Raises:
+        ValueError: 模型拒绝回答或输出不符合结构
+    """
+    path = _cache_path(paper_link, model)
+    if use_cache:
+        cached = _load_cached(path)
+        if cached:
+            return cached
+
+    user_prompt = f"论文链接: {paper_link}"
+    if context:
+        user_prompt += f"\n\n论文信息:\n{context}"
+
+    response = _openai_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "podcast_content", "strict": True, "schema": CONTENT_SCHEMA},
+        },
+        temperature=0.7,
+    )
+    message = response.choices[0].message
+    if getattr(message, "refusal", None):
+        raise ValueError(f"模型拒绝生成内容: {message.refusal}")
+
+    # 论文链接用于提交生成和去重，不采用模型输出的值
+    content = PodcastContent(**json.loads(message.content), paper_link=paper_link.strip())
+    if use_cache:
+        _save_cached(path, content)
+    return content
+
+
+def metadata_context(metadata: dict) -> str:
+    """把 arXiv 元数据整理为生成内容时的上下文"""
+    return json.dumps({key: metadata.get(key) for key in ("title", "authors", "published", "abstract")},
+                      ensure_ascii=False)
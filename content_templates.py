@@ -0,0 +1,106 @@
+import os
+import re
+from typing import Optional
+
+from arxiv_metadata import get_metadata
+from podcast_schema import PodcastContent
+
+# 生成开场白使用的模型
+HOOK_MODEL = os.getenv("AIPAPER_HOOK_MODEL", os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini"))
+# 描述中摘要部分的最大字符数
+DESCRIPTION_ABSTRACT_CHARS = 600
+
+DESCRIPTION_TEMPLATE = """{abstract}
+
+Paper: {title}
+Link: {paper_link}
+Published: {published}
+Authors: {authors}"""
+
+PROMPT_TEMPLATE = (
+    "Two friendly hosts discuss the paper \"{title}\" by {authors} ({year}). "
+    "Open with: \"{hook}\" Explain the problem, the key idea and the main results in plain language, "
+    "use one concrete example, and end with why it matters for listeners."
+)
+
+
+def _authors(authors: list, limit: int = 3) -> str:
+    if len(authors) > limit:
+        return ", ".join(authors[:limit]) + " et al."
+    return ", ".join(authors)
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    # 尽量在句子结束处截断
+    end = cut.rfind(". ")
+    return cut[:end + 1] if end > limit // 2 else cut.rstrip() + "…"
+
+
+def default_hook(metadata: dict) -> str:
+    """不调用模型的开场白：摘要的第一句"""
+    first_sentence = re.split(r'(?<=[.!?])\s', metadata["abstract"], maxsplit=1)[0]
+    return _truncate(first_sentence, 160)
+
+
+def generate_hook(metadata: dict) -> Optional[str]:
+    """用一次简短的模型调用生成吸引听众的一句话开场白，失败时返回 None"""
+    if not os.getenv("OPENAI_API_KEY"):
+        return None
+    try:
+        from openai import OpenAI
+
+        response = OpenAI().chat.completions.create(
+            model=HOOK_MODEL,
+            messages=[
+                {"role": "system", "content": "You write one-sentence hooks for a research podcast. "
+                                              "Reply with the sentence only, at most 20 words, no quotes."},
+                {"role": "user", "content": f"Title: {metadata['title']}\nAbstract: {metadata['abstract']}"},
+            ],
+            max_tokens=60,
+            temperature=0.7,
+        )
+        hook = response.choices[0].message.content.strip().strip('"')
+        return hook or None
+    except Exception as e:
+        print(f"生成开场白失败: {str(e)}")
+        return None
+
+
+def podcast_content_from_metadata(metadata: dict, paper_link: str, hook: str = None) -> PodcastContent:
+    """用模板把论文元数据填充为播客内容，没有开场白时用摘要第一句"""
+    description = DESCRIPTION_TEMPLATE.format(
+        abstract=_truncate(metadata["abstract"], DESCRIPTION_ABSTRACT_CHARS),
+        title=metadata["title"],
+        paper_link=paper_link,
+        published=metadata["published"],
+        authors=_authors(metadata["authors"], limit=10),
+    )
+    if hook:
+        description = f"{hook}\n\n{description}"
+    else:
+        hook = default_hook(metadata)
+    return PodcastContent(
+        title=metadata["title"],
+        description=description,
+        prompt_text=PROMPT_TEMPLATE.format(
+            title=metadata["title"], year=metadata["published"][:4], authors=_authors(metadata["authors"]), hook=hook
+        ),
+        paper_link=paper_link,
+    )
+
+
+def fast_podcast_content(paper_link: str, use_llm_hook: bool = True) -> Optional[PodcastContent]:
+    """
+    直接 arXiv 链接的快速路径：本地/缓存的元数据 + 模板，最多一次简短的模型调用生成开场白
+
+    Returns:
+        PodcastContent: 无法获取元数据时返回 None，调用方应回退到 crew
+    """
+    metadata = get_metadata(paper_link)
+    if not metadata or not metadata.get("title") or not metadata.get("abstract"):
+        return None
+    hook = generate_hook(metadata) if use_llm_hook else None
+    return podcast_content_from_metadata(metadata, paper_link, hook=hook)
@@ -0,0 +1,203 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Optional
+
+from job_store import JobStore, STAGES, STAGE_AUDIO_READY, STATUS_FAILED
+from podbean_feed import PODBEAN_FEED_URL, parse_podbean_feed
+
+# 规范化标题的相似度（difflib ratio）达到该值视为重复
+TITLE_SIMILARITY_THRESHOLD = 0.85
+# 近似匹配时只比较共享字符三元组最多的若干个候选
+TITLE_CANDIDATES = 5
+# 共享索引重新读取 feed 和任务历史的间隔（秒）
+INDEX_REFRESH_INTERVAL = 60
+
+ARXIV_ID_PATTERN = re.compile(
+    r'(?:arxiv\.org/(?:abs|pdf|html)/|arxiv[:.]\s*)(\d{4}\.\d{4,5}|[a-z-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?',
+    re.IGNORECASE
+)
+DOI_PATTERN = re.compile(r'\b10\.\d{4,9}/[^\s"<>]+', re.IGNORECASE)
+
+_episode_index = None
+_episode_index_lock = threading.Lock()
+
+
+class DuplicatePaperError(ValueError):
+    """论文已经有节目（或正在生成中）"""
+
+    def __init__(self, match: dict):
+        self.match = match
+        super().__init__(f"论文已有节目: {match.get('title') or match.get('key')} ({match.get('source')})")
+
+
+def extract_keys(text: str) -> set:
+    """从链接或文本中提取规范化的论文标识：arxiv:<ID（不含版本号）> 和 doi:<小写 DOI>"""
+    if not text:
+        return set()
+    keys = {f"arxiv:{arxiv_id.lower()}" for arxiv_id in ARXIV_ID_PATTERN.findall(text)}
+    for doi in DOI_PATTERN.findall(text):
+        doi = doi.rstrip('.,;)]').lower()
+        keys.add(f"doi:{doi}")
+        # arXiv 为每篇论文注册的 DOI 与 arXiv ID 等价
+        match = re.match(r'10\.48550/arxiv\.(\d{4}\.\d{4,5})', doi)
+        if match:
+            keys.add(f"arxiv:{match.group(1)}")
+    return keys
+
+
+def normalize_title(title: str) -> str:
+    """统一大小写和全半角，去掉标点和空白"""
+    title = unicodedata.normalize("NFKC", title or "").lower()
+    return re.sub(r'[\W_]+', '', title)
+
+
+def _shingles(normalized: str) -> set:
+    if len(normalized) < 3:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+
+class EpisodeIndex:
+    """
+    已发布（或已提交生成）节目的索引
+
+    论文标识（arXiv ID、DOI）和规范化标题用字典保存，O(1) 判断是否存在；
+    近似标题先通过字符三元组倒排索引找出少量候选，再逐个计算相似度。
+    """
+
+    def __init__(self, threshold: float = TITLE_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._keys = {}
+        self._titles = {}
+        self._postings = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._titles)
+
+    def add(self, links: list = (), title: str = None, **info) -> None:
+        """
+        记录一个节目
+
+        Args:
+            links: 论文链接或包含 arXiv ID / DOI 的文本
+            title: 节目或论文标题
+            info: 随匹配结果返回的附加信息（source、episode_url、job_id 等）
+
+        已有的记录保持不变，但 reserve 登记的占位记录会被替换。
+        """
+        entry = dict(info, title=title)
+        keys = set().union(*(extract_keys(link) for link in links)) if links else set()
+        normalized = normalize_title(title)
+        with self._lock:
+            for key in keys:
+                if key not in self._keys or self._keys[key].get("pending"):
+                    self._keys[key] = dict(entry, key=key)
+            if normalized and (normalized not in self._titles or self._titles[normalized].get("pending")):
+                self._titles[normalized] = entry
+                for shingle in _shingles(normalized):
+                    self._postings[shingle].add(normalized)
+
+    def reserve(self, links: list = (), title: str = None, **info) -> Optional[dict]:
+        """
+        查找已有节目，没有时在同一把锁内登记一个占位记录
+
+        用于提交前去重：查找和登记之间没有间隙，并发提交同一篇论文时只有一个能通过。
+        提交成功后用 add 替换占位记录，失败时调用 release 撤销。
+
+        Returns:
+            dict: 匹配到的节目信息（与 find 相同），没有时返回 None 并完成登记
+        """
+        with self._lock:
+            duplicate = self.find(links, title)
+            if duplicate is None:
+                self.add(links, title, pending=True, **info)
+            return duplicate
+
+    def release(self, links: list = (), title: str = None) -> None:
+        """撤销 reserve 登记的占位记录，已确认的记录不受影响"""
+        keys = set().union(*(extract_keys(link) for link in links)) if links else set()
+        normalized = normalize_title(title)
+        with self._lock:
+            for key in keys:
+                if self._keys.get(key, {}).get("pending"):
+                    del self._keys[key]
+            if normalized and self._titles.get(normalized, {}).get("pending"):
+                del self._titles[normalized]
+                for shingle in _shingles(normalized):
+                    self._postings[shingle].discard(normalized)
+
+    def find(self, links: list = (), title: str = None) -> Optional[dict]:
+        """
+        查找已有节目
+
+        先按论文标识精确匹配，再按标题精确或近似匹配。
+
+        Returns:
+            dict: 匹配到的节目信息（含 match 字段说明匹配方式），没有时返回 None
+        """
+        keys = set().union(*(extract_keys(link) for link in links)) if links else set()
+        normalized = normalize_title(title)
+        with self._lock:
+            for key in keys:
+                if key in self._keys:
+                    return dict(self._keys[key], match="id")
+            if not normalized:
+                return None
+            if normalized in self._titles:
+                return dict(self._titles[normalized], match="title")
+
+            shared = Counter()
+            for shingle in _shingles(normalized):
+                shared.update(self._postings.get(shingle, ()))
+            best, best_score = None, 0
+            for candidate, _ in shared.most_common(TITLE_CANDIDATES):
+                score = SequenceMatcher(None, normalized, candidate).ratio()
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best and best_score >= self.threshold:
+                return dict(self._titles[best], match="similar_title", similarity=round(best_score, 3))
+        return None
+
+    def add_feed(self, episodes: list) -> None:
+        """从 parse_podbean_feed 的结果建立索引"""
+        for episode in episodes:
+            self.add([episode.get("link", ""), episode.get("description", "")], episode.get("title"),
+                     source="feed", episode_url=episode.get("link"))
+
+    def add_jobs(self, job_store: JobStore) -> None:
+        """
+        从任务历史建立索引
+
+        只收录已经提交生成的任务（有 request_id），生成失败的任务不算在内，以便重新生成。
+        """
+        for job in job_store.list_jobs(limit=100000):
+            if not job["request_id"]:
+                continue
+            if job["status"] == STATUS_FAILED and STAGES.index(job["stage"]) < STAGES.index(STAGE_AUDIO_READY):
+                continue
+            content = job["content"] or {}
+            self.add([job["paper_link"] or "", content.get("paper_link", "")], content.get("title"),
+                     source="job", job_id=job["id"], episode_url=job["data"].get("episode_url"))
+
+
+def build_index(job_store: JobStore = None, feed_url: str = None) -> EpisodeIndex:
+    """从 Podbean feed（已配置时）和任务历史建立索引"""
+    index = EpisodeIndex()
+    if feed_url or PODBEAN_FEED_URL:
+        index.add_feed(parse_podbean_feed(feed_url))
+    index.add_jobs(job_store or JobStore())
+    return index
+
+
+def get_episode_index(job_store: JobStore = None) -> EpisodeIndex:
+    """获取进程内共享的索引，超过 INDEX_REFRESH_INTERVAL 后重新建立"""
+    global _episode_index
+    with _episode_index_lock:
+        if _episode_index is None or time.monotonic() - _episode_index[1] > INDEX_REFRESH_INTERVAL:
+            _episode_index = (build_index(job_store), time.monotonic())
+        return _episode_index[0]
@@ -0,0 +1,106 @@
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 连接池与超时配置，可通过环境变量调整
+POOL_CONNECTIONS = int(os.getenv("AIPAPER_HTTP_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("AIPAPER_HTTP_POOL_MAXSIZE", "16"))
+CONNECT_TIMEOUT = float(os.getenv("AIPAPER_HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("AIPAPER_HTTP_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("AIPAPER_HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("AIPAPER_HTTP_BACKOFF_FACTOR", "0.5"))
+
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+class _Retry(Retry):
+    """
+    指数退避重试策略
+
+    5xx 只对幂等方法重试，避免重复提交生成请求；
+    429 表示请求未被处理，任何方法都可以安全重试。
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and self.total:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class _PooledSession(requests.Session):
+    """未显式指定 timeout 时使用统一的连接/读取超时"""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        return super().request(method, url, **kwargs)
+
+
+def _new_session(retry: bool) -> requests.Session:
+    session = _PooledSession()
+    max_retries = _Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        raise_on_status=False,
+    ) if retry else 0
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=max_retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str, retry: bool = True) -> requests.Session:
+    """
+    获取目标主机对应的共享 Session（keep-alive 连接池）
+
+    Args:
+        url: 请求地址，按 scheme://host 区分连接池
+        retry: 是否启用自动重试。上传文件流等无法重放请求体的场景应传 False
+
+    Returns:
+        requests.Session: 该主机共享的 Session
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc, retry)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _new_session(retry)
+        return session
+
+
+def request(method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+    """通过共享连接池发送请求"""
+    return get_session(url, retry=retry).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def close_all() -> None:
+    """关闭所有共享 Session"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,325 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+# 任务数据库路径
+JOB_DB_PATH = os.getenv("AIPAPER_JOB_DB", "aipaper_jobs.db")
+
+# 任务阶段（按流程先后顺序）
+STAGE_PAPER_SELECTED = "paper_selected"
+STAGE_CONTENT_GENERATED = "content_generated"
+STAGE_AUDIO_REQUESTED = "audio_requested"
+STAGE_AUDIO_READY = "audio_ready"
+STAGE_TRANSCODED = "transcoded"
+STAGE_UPLOADED = "uploaded"
+STAGE_PUBLISHED = "published"
+
+STAGES = (
+    STAGE_PAPER_SELECTED,
+    STAGE_CONTENT_GENERATED,
+    STAGE_AUDIO_REQUESTED,
+    STAGE_AUDIO_READY,
+    STAGE_TRANSCODED,
+    STAGE_UPLOADED,
+    STAGE_PUBLISHED,
+)
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    paper_link TEXT,
+    request_id TEXT,
+    content TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    worker TEXT,
+    run_after REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_jobs_request_id ON jobs(request_id);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, created_at);
+"""
+
+
+class JobStore:
+    """
+    基于 SQLite 的持久化任务表
+
+    记录每个播客生成任务所处的阶段、AutoContent 的 request_id 和中间结果，
+    浏览器刷新或进程重启后可以从数据库恢复进行中的任务，而不必重新提交生成请求。
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            self._migrate(conn)
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接，WAL 模式允许读写并发"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """为旧版本数据库补充新增的列"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if not columns:
+            return
+        if "worker" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+        if "run_after" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN run_after REAL NOT NULL DEFAULT 0")
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["content"] = json.loads(job["content"]) if job["content"] else None
+        job["data"] = json.loads(job["data"])
+        return job
+
+    def create_job(self, paper_link: str = None, content: dict = None,
+                   stage: str = STAGE_PAPER_SELECTED, data: dict = None) -> str:
+        """
+        创建任务
+
+        Args:
+            paper_link: 论文链接
+            content: 已生成的播客内容（title/description/prompt_text 等）
+            stage: 初始阶段
+            data: 其他附加数据
+
+        Returns:
+            str: 任务ID
+        """
+        if stage not in STAGES:
+            raise ValueError(f"未知的任务阶段: {stage}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, stage, status, paper_link, content, data, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, stage, STATUS_PENDING, paper_link,
+                 json.dumps(content, ensure_ascii=False) if content is not None else None,
+                 json.dumps(data or {}, ensure_ascii=False), now, now)
+            )
+            conn.execute(
+                "INSERT INTO job_events (job_id, stage, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, stage, STATUS_PENDING, now)
+            )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """按任务ID获取任务"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def get_job_by_request_id(self, request_id: str) -> Optional[dict]:
+        """按 AutoContent request_id 获取任务"""
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE request_id = ? ORDER BY created_at DESC LIMIT 1", (request_id,)
+        ).fetchone()
+        return self._to_dict(row)
+
+    def advance(self, job_id: str, stage: str, status: str = None, **fields) -> None:
+        """
+        将任务推进到新阶段
+
+        Args:
+            job_id: 任务ID
+            stage: 新阶段
+            status: 新状态，默认到达 published 时为 done，否则保持不变
+            **fields: 要更新的字段，paper_link/request_id/content 直接写入对应列，
+                其余合并到 data 中
+        """
+        if stage not in STAGES:
+            raise ValueError(f"未知的任务阶段: {stage}")
+        if status is None and stage == STAGE_PUBLISHED:
+            status = STATUS_DONE
+        self._update(job_id, stage=stage, status=status, **fields)
+
+    def update(self, job_id: str, **fields) -> None:
+        """更新任务字段，不改变阶段"""
+        self._update(job_id, **fields)
+
+    def fail(self, job_id: str, error: str) -> None:
+        """将任务标记为失败，保留失败时所处的阶段以便重试"""
+        self._update(job_id, status=STATUS_FAILED, error=error)
+
+    def _update(self, job_id: str, stage: str = None, status: str = None, error: str = None, **fields) -> None:
+        columns = {}
+        for column in ("paper_link", "request_id"):
+            if column in fields:
+                columns[column] = fields.pop(column)
+        if "content" in fields:
+            columns["content"] = json.dumps(fields.pop("content"), ensure_ascii=False)
+        if stage:
+            columns["stage"] = stage
+        if status:
+            columns["status"] = status
+        if error is not None or status not in (None, STATUS_FAILED):
+            columns["error"] = error
+
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT stage, status, data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"任务不存在: {job_id}")
+            if fields:
+                data = json.loads(row["data"])
+                data.update(fields)
+                columns["data"] = json.dumps(data, ensure_ascii=False)
+            columns["updated_at"] = now
+
+            assignments = ", ".join(f"{column} = ?" for column in columns)
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+            if stage or status:
+                conn.execute(
+                    "INSERT INTO job_events (job_id, stage, status, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, stage or row["stage"], status or row["status"], now)
+                )
+
+    def claim_job(self, worker: str) -> Optional[dict]:
+        """
+        原子地领取一个到期的待处理任务并标记为 running
+
+        Args:
+            worker: 领取任务的 worker 标识
+
+        Returns:
+            dict: 领取到的任务，没有可处理的任务时返回 None
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, updated_at = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE status = ? AND run_after <= ? ORDER BY run_after, created_at LIMIT 1"
+                ") AND status = ? RETURNING *",
+                (STATUS_RUNNING, worker, now, STATUS_PENDING, now, STATUS_PENDING)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def release(self, job_id: str, delay: float = 0) -> None:
+        """把正在等待外部结果的任务放回队列，delay 秒后才能再次被领取"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, run_after = ?, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (STATUS_PENDING, now + delay, now, job_id, STATUS_RUNNING)
+            )
+
+    def retry_job(self, job_id: str) -> None:
+        """把失败的任务放回队列，从失败时所处的阶段重新执行"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT stage FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"任务不存在: {job_id}")
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = NULL, worker = NULL, run_after = 0, updated_at = ? WHERE id = ?",
+                (STATUS_PENDING, now, job_id)
+            )
+            conn.execute(
+                "INSERT INTO job_events (job_id, stage, status, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, row["stage"], STATUS_PENDING, now)
+            )
+
+    def requeue_running(self, stale_after: float = 0) -> int:
+        """
+        把异常退出的 worker 遗留的 running 任务放回队列
+
+        Args:
+            stale_after: 只处理超过这么多秒没有更新的任务，0 表示全部
+
+        Returns:
+            int: 放回队列的任务数
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, updated_at = ? WHERE status = ? AND updated_at <= ?",
+                (STATUS_PENDING, now, STATUS_RUNNING, now - stale_after)
+            )
+        return cursor.rowcount
+
+    def list_jobs(self, status: str = None, limit: int = 100, batch: str = None) -> list:
+        """
+        按更新时间倒序列出任务
+
+        Args:
+            status: 只列出该状态的任务
+            limit: 最多返回的任务数
+            batch: 只列出 data.batch 等于该值的批处理任务
+        """
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if batch:
+            conditions.append("json_extract(data, '$.batch') = ?")
+            params.append(batch)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = self._connect().execute(
+            f"SELECT * FROM jobs {where}ORDER BY updated_at DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def count_jobs(self, stage: str, statuses: tuple = (STATUS_PENDING, STATUS_RUNNING)) -> int:
+        """统计处于某阶段且状态在 statuses 中的任务数"""
+        placeholders = ", ".join("?" for _ in statuses)
+        row = self._connect().execute(
+            f"SELECT COUNT(*) FROM jobs WHERE stage = ? AND status IN ({placeholders})", (stage, *statuses)
+        ).fetchone()
+        return row[0]
+
+    def resumable_jobs(self) -> list:
+        """
+        获取可以恢复的任务（未完成也未失败），按创建时间排序
+
+        已提交到 AutoContent 的任务带有 request_id，恢复时应继续等待该请求，而不是重新提交。
+        """
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (STATUS_PENDING, STATUS_RUNNING)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def events(self, job_id: str) -> list:
+        """获取任务的阶段变化记录（从旧到新）"""
+        rows = self._connect().execute(
+            "SELECT stage, status, created_at FROM job_events WHERE job_id = ? ORDER BY created_at",
+            (job_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,184 @@
+import os
+from typing import Optional
+
+import numpy as np
+from scipy import ndimage, signal
+
+# 目标响度（LUFS），播客平台普遍采用 -16 LUFS
+TARGET_LOUDNESS = float(os.getenv("AIPAPER_TARGET_LUFS", "-16"))
+# 真峰值上限（dBTP），给有损编码留出余量
+TRUE_PEAK_CEILING = float(os.getenv("AIPAPER_TRUE_PEAK_DB", "-1.5"))
+# 最大增益（dB），避免把几乎无声的输入放大成噪声
+MAX_GAIN_DB = 20.0
+
+# ITU-R BS.1770：400ms 测量块，75% 重叠，即每 100ms 一个步长
+GATE_BLOCK_HOPS = 4
+HOP_SECONDS = 0.1
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+# 真峰值估计的过采样倍数，以及过采样滤波器需要的前后上下文（输入采样数）
+OVERSAMPLE = 4
+OVERSAMPLE_CONTEXT = 12
+# 限幅器的预读时间（秒）
+LIMITER_LOOKAHEAD = 0.005
+
+
+def k_weighting_sos(samplerate: int) -> np.ndarray:
+    """
+    BS.1770 K 计权滤波器（高架预滤波 + RLB 高通）的二阶节系数
+
+    按任意采样率由模拟原型重新计算，48kHz 时与标准给出的系数一致。
+    """
+    # 高架滤波器
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / samplerate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    # 高通滤波器
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / samplerate)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def _mean_square_to_lufs(mean_square):
+    return -0.691 + 10 * np.log10(mean_square)
+
+
+def _lufs_to_mean_square(lufs: float) -> float:
+    return 10 ** ((lufs + 0.691) / 10)
+
+
+class LoudnessMeter:
+    """
+    分块的综合响度（integrated loudness）测量
+
+    每块数据经 sosfilt 做 K 计权（滤波器状态跨块保留），只保存每 100ms 的均方值，
+    内存占用与音频长度成正比但很小（每小时 36000 个数）。
+    """
+
+    def __init__(self, samplerate: int):
+        self.sos = k_weighting_sos(samplerate)
+        self._zi = np.zeros((self.sos.shape[0], 2))
+        self._hop = max(1, int(round(samplerate * HOP_SECONDS)))
+        self._rest = np.zeros(0)
+        self._hops = []
+
+    def process(self, block: np.ndarray) -> None:
+        """输入一个单声道数据块"""
+        filtered, self._zi = signal.sosfilt(self.sos, block, zi=self._zi)
+        if len(self._rest):
+            filtered = np.concatenate([self._rest, filtered])
+        n = len(filtered) // self._hop * self._hop
+        if n:
+            self._hops.append(np.square(filtered[:n]).reshape(-1, self._hop).mean(axis=1))
+        self._rest = filtered[n:]
+
+    def integrated_loudness(self) -> Optional[float]:
+        """
+        门限后的综合响度（LUFS）
+
+        Returns:
+            float: 响度值；输入为空或全部低于绝对门限（静音）时返回 None
+        """
+        hops = np.concatenate(self._hops) if self._hops else np.zeros(0)
+        if len(self._rest):
+            hops = np.append(hops, np.mean(np.square(self._rest)))
+        if len(hops) == 0:
+            return None
+        if len(hops) < GATE_BLOCK_HOPS:
+            blocks = np.array([hops.mean()])
+        else:
+            blocks = np.convolve(hops, np.full(GATE_BLOCK_HOPS, 1.0 / GATE_BLOCK_HOPS), mode='valid')
+
+        gated = blocks[blocks > _lufs_to_mean_square(ABSOLUTE_GATE)]
+        if len(gated) == 0:
+            return None
+        relative_gate = _mean_square_to_lufs(gated.mean()) + RELATIVE_GATE
+        gated = gated[gated > _lufs_to_mean_square(relative_gate)]
+        return float(_mean_square_to_lufs(gated.mean()))
+
+
+def loudness_gain(loudness: Optional[float], target: float = TARGET_LOUDNESS,
+                  max_gain_db: float = MAX_GAIN_DB) -> float:
+    """把测得的响度调整到目标值所需的线性增益，静音输入返回 1"""
+    if loudness is None:
+        return 1.0
+    return float(10 ** (min(target - loudness, max_gain_db) / 20))
+
+
+class TruePeakLimiter:
+    """
+    带预读的真峰值限幅器
+
+    用 4 倍过采样估计每个采样附近的真峰值，得出不超过上限所需的增益，
+    再依次做预读窗口内的最小值滤波和同长度的滑动平均：增益在峰值到来前平滑降到位，
+    且不会超过该峰值所需的增益。输出相对输入延迟预读长度，调用 flush 取出剩余数据。
+    """
+
+    def __init__(self, samplerate: int, ceiling_db: float = TRUE_PEAK_CEILING,
+                 lookahead: float = LIMITER_LOOKAHEAD):
+        self.ceiling = 10 ** (ceiling_db / 20)
+        self._window = max(1, int(round(samplerate * lookahead)))
+        self._pending = np.zeros(0, dtype=np.float32)      # 尚未输出的采样
+        self._context = np.zeros(0, dtype=np.float32)      # 已输出的最后若干采样，用于过采样
+        self._min_history = None                            # 已输出采样的最小值滤波结果
+        self.limited = 0                                    # 被压低增益的采样数
+
+    def _true_peak(self, x: np.ndarray) -> np.ndarray:
+        upsampled = signal.resample_poly(x, OVERSAMPLE, 1)
+        peaks = np.abs(upsampled[:len(x) * OVERSAMPLE]).reshape(-1, OVERSAMPLE).max(axis=1)
+        return np.maximum(peaks, np.abs(x))
+
+    def _run(self, block: np.ndarray, final: bool) -> np.ndarray:
+        x = np.concatenate([self._pending, np.asarray(block, dtype=np.float32)])
+        lead = OVERSAMPLE_CONTEXT + self._window
+        if final:
+            # 结尾之后视为静音
+            padded = np.concatenate([x, np.zeros(lead, dtype=np.float32)])
+            emit = len(x)
+        else:
+            padded = x
+            emit = len(x) - lead
+        if emit <= 0:
+            self._pending = x
+            return np.zeros(0, dtype=np.float32)
+
+        full = np.concatenate([self._context, padded])
+        peaks = self._true_peak(full)[len(self._context):]
+        required = np.minimum(1.0, self.ceiling / np.maximum(peaks, self.ceiling))
+
+        # 预读窗口内的最小值：window_min[n] = min(required[n:n + window])
+        w = self._window
+        window_min = required[:emit + w - 1]
+        if w > 1:
+            window_min = ndimage.minimum_filter1d(window_min, w, mode='nearest', origin=-(w // 2))[:emit]
+        # 同长度的滑动平均，历史部分来自上一块；第一块之前的历史取第一个窗口的最小值，
+        # 开头的峰值同样被限制
+        if self._min_history is None:
+            self._min_history = np.full(w - 1, window_min[0])
+        extended = np.concatenate([self._min_history, window_min])
+        # 按 float64 累加，长数据块上 float32 的累积误差会让增益偏大
+        cumsum = np.concatenate([[0.0], np.cumsum(extended, dtype=np.float64)])
+        gain = (cumsum[w:] - cumsum[:-w]) / w
+
+        out = x[:emit] * gain.astype(np.float32)
+        self.limited += int(np.count_nonzero(gain < 1.0))
+        self._min_history = extended[len(extended) - (w - 1):]
+        self._context = x[max(0, emit - OVERSAMPLE_CONTEXT):emit]
+        self._pending = x[emit:]
+        return out
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """输入一个单声道数据块，返回已经确定增益的输出"""
+        return self._run(block, final=False)
+
+    def flush(self) -> np.ndarray:
+        """输入结束，输出剩余数据"""
+        return self._run(np.zeros(0, dtype=np.float32), final=True)
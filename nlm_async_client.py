@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import os
+import random
+
+import httpx
+
+import http_session
+from episode_index import DuplicatePaperError, EpisodeIndex
+from paper_cache import PaperCache, get_paper_cache, arxiv_cache_key
+
+# 连接池和并发配置
+ASYNC_MAX_CONNECTIONS = int(os.getenv("AIPAPER_ASYNC_MAX_CONNECTIONS", "100"))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("AIPAPER_ASYNC_MAX_KEEPALIVE", "20"))
+ASYNC_CONCURRENCY = int(os.getenv("AIPAPER_ASYNC_CONCURRENCY", "20"))
+
+# JinaReader 解析大型 PDF 可能需要较长时间
+JINA_READ_TIMEOUT = 120
+
+
+class AsyncNotebookLMClient:
+    """
+    基于 httpx.AsyncClient 的异步 NotebookLM 客户端
+
+    与 NotebookLMClient 接口一致，另外提供 send_many / check_many，
+    在一个进程中并发提交和查询大量生成请求。所有请求共享一个连接池，
+    并发数由信号量限制，429/5xx 按指数退避重试。论文缓存的磁盘读写和解压在线程中执行，不阻塞事件循环。
+
+    用法:
+        async with AsyncNotebookLMClient(api_key, webhook_url) as client:
+            statuses = await client.check_many(request_ids)
+    """
+
+    def __init__(self, api_key: str, webhook_url: str, concurrency: int = ASYNC_CONCURRENCY,
+                 paper_cache: PaperCache = None, episode_index: EpisodeIndex = None):
+        """初始化异步 NotebookLM 客户端"""
+        if not api_key:
+            raise ValueError("API key 不能为空")
+        if not webhook_url:
+            raise ValueError("Webhook URL 不能为空")
+
+        self.api_key = api_key
+        self.webhook_url = webhook_url
+        self.base_url = "https://api.autocontentapi.com"
+        self.jina_token = os.getenv("JINA_TOKEN")
+        self.paper_cache = paper_cache or get_paper_cache()
+        # 已有节目的索引，设置后拒绝重复生成同一篇论文
+        self.episode_index = episode_index
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(http_session.READ_TIMEOUT, connect=http_session.CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                                max_keepalive_connections=ASYNC_MAX_KEEPALIVE),
+        )
+
+        # 设置日志
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger("AsyncNotebookLMClient")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        await self._client.aclose()
+
+    @property
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        在并发限制内发送请求，429 以及 GET 请求的 5xx/网络错误按指数退避重试
+
+        POST 只在 429 时重试，避免重复提交生成请求。
+        """
+        for attempt in range(http_session.MAX_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, url, **kwargs)
+                retryable = response.status_code == 429 or (
+                    method == "GET" and response.status_code in http_session.RETRY_STATUSES
+                )
+                if not retryable or attempt == http_session.MAX_RETRIES:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+            except httpx.TransportError:
+                if method != "GET" or attempt == http_session.MAX_RETRIES:
+                    raise
+                delay = None
+            if delay is None:
+                delay = http_session.BACKOFF_FACTOR * (2 ** attempt) * (1 + random.random() / 2)
+            await asyncio.sleep(delay)
+
+    async def _get_paper_content(self, pdf_url: str) -> str:
+        """使用 JinaReader 获取论文内容，与同步客户端共用论文缓存"""
+        cache_key = arxiv_cache_key(pdf_url)
+        entry = await asyncio.to_thread(self.paper_cache.get, cache_key) if cache_key else None
+        if entry and self.paper_cache.is_fresh(cache_key, entry):
+            self.logger.info(f"使用缓存的论文内容: {cache_key}")
+            return entry["text"]
+
+        try:
+            headers = {
+                'Authorization': f'Bearer {self.jina_token}'
+            }
+            if entry and entry.get("etag"):
+                headers['If-None-Match'] = entry["etag"]
+            if entry and entry.get("last_modified"):
+                headers['If-Modified-Since'] = entry["last_modified"]
+
+            jina_url = f'https://r.jina.ai/{pdf_url}'
+            self.logger.info(f"从JinaReader获取内容: {jina_url}")
+
+            response = await self._request("GET", jina_url, headers=headers, timeout=httpx.Timeout(
+                JINA_READ_TIMEOUT, connect=http_session.CONNECT_TIMEOUT))
+            if response.status_code == 304 and entry:
+                await asyncio.to_thread(self.paper_cache.touch, cache_key, entry)
+                return entry["text"]
+            response.raise_for_status()
+
+            if cache_key:
+                await asyncio.to_thread(
+                    self.paper_cache.put, cache_key, response.text,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+            return response.text
+
+        except Exception as e:
+            self.logger.error(f"获取论文内容时出错: {str(e)}")
+            return entry["text"] if entry else None
+
+    async def _convert_arxiv_url(self, url: str) -> list:
+        """将arXiv URL转换为论文全文资源"""
+        arxiv_id = arxiv_cache_key(url)
+        if not arxiv_id:
+            self.logger.error(f"无法从URL中提取arXiv ID: {url}")
+            return [{"content": url, "type": "website"}]
+
+        paper_content = await self._get_paper_content(f"https://arxiv.org/pdf/{arxiv_id}")
+        if paper_content:
+            return [{"content": paper_content, "type": "text"}]
+        return []
+
+    async def _process_resources(self, resources: list) -> list:
+        """并发解析所有 arXiv 链接，保持资源原有顺序"""
+        async def process(resource):
+            if "arxiv.org/" in resource["content"]:
+                return await self._convert_arxiv_url(resource["content"])
+            return [resource]
+
+        processed = await asyncio.gather(*(process(resource) for resource in resources))
+        return [item for items in processed for item in items]
+
+    async def send_content(self, resources: list, text: str, title: str = None) -> str:
+        """
+        发送内容到 AutoContent API
+
+        Args:
+            resources: 资源列表
+            text: 提示文本
+            title: 节目标题，用于近似标题去重
+
+        Returns:
+            str: 请求ID，失败时返回 None
+
+        Raises:
+            DuplicatePaperError: 设置了 episode_index 且论文已有节目
+        """
+        links = [resource["content"] for resource in resources or [] if resource.get("type") == "website"]
+        if self.episode_index is not None:
+            # 在第一次 await 之前占位，同一批次中的重复论文不会同时通过检查
+            duplicate = self.episode_index.reserve(links, title, source="request")
+            if duplicate:
+                raise DuplicatePaperError(duplicate)
+
+        request_id = None
+        try:
+            if not resources:
+                raise ValueError("资源列表不能为空")
+            if not text:
+                raise ValueError("提示文本不能为空")
+
+            payload = {
+                "resources": await self._process_resources(resources),
+                "text": text,
+                "outputType": "audio",
+                "webhook": {
+                    "url": self.webhook_url
+                }
+            }
+
+            response = await self._request(
+                "POST",
+                f"{self.base_url}/content/create",
+                headers=self._headers,
+                content=json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            )
+            self.logger.info(f"收到响应状态码: {response.status_code}")
+            response.raise_for_status()
+
+            data = response.json()
+            request_id = data.get("request_id")
+            if not request_id:
+                self.logger.error(f"响应中没有request_id，错误信息: {data.get('error_message', '未知错误')}")
+            elif self.episode_index is not None:
+                self.episode_index.add(links, title, source="request", request_id=request_id)
+            return request_id
+
+        except Exception as e:
+            self.logger.error(f"发送请求时出错: {str(e)}")
+            return None
+        finally:
+            # 提交失败或被取消时撤销占位，以便之后重新提交
+            if self.episode_index is not None and not request_id:
+                self.episode_index.release(links, title)
+
+    async def check_status(self, request_id: str) -> dict:
+        """检查请求状态，失败时返回 None"""
+        try:
+            if not request_id:
+                raise ValueError("Request ID 不能为空")
+
+            response = await self._request(
+                "GET",
+                f"{self.base_url}/content/status/{request_id}",
+                headers=self._headers
+            )
+            response.raise_for_status()
+            status_data = response.json()
+
+            return {
+                "status": status_data.get("status", 0),  # 0-100, 0表示排队中，100表示完成
+                "updated_on": status_data.get("updated_on"),
+                "audio_url": status_data.get("audio_url"),
+                "error_message": status_data.get("error_message")
+            }
+
+        except Exception as e:
+            self.logger.error(f"状态检查错误 {request_id}: {str(e)}")
+            return None
+
+    async def send_many(self, items: list) -> list:
+        """
+        并发提交多个生成请求
+
+        Args:
+            items: (resources, text) 或 (resources, text, title) 元组列表
+
+        Returns:
+            list: 与 items 顺序一致的请求ID列表，失败或已有节目的位置为 None
+        """
+        async def send(item):
+            try:
+                return await self.send_content(*item)
+            except DuplicatePaperError as e:
+                self.logger.warning(f"跳过: {str(e)}")
+                return None
+
+        return await asyncio.gather(*(send(item) for item in items))
+
+    async def check_many(self, request_ids: list) -> dict:
+        """
+        并发查询多个请求的状态
+
+        Returns:
+            dict: request_id -> 状态（查询失败时为 None）
+        """
+        statuses = await asyncio.gather(*(self.check_status(request_id) for request_id in request_ids))
+        return dict(zip(request_ids, statuses))
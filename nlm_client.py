@@ -1,13 +1,22 @@
 import requests
+import http_session
+from paper_cache import PaperCache, get_paper_cache, arxiv_cache_key
+from episode_index import DuplicatePaperError, EpisodeIndex
 import json
 import logging
-import re
 import os
 import base64
 from typing import List, Dict
 
+# JinaReader 解析大型 PDF 可能需要较长时间
+JINA_TIMEOUT = (http_session.CONNECT_TIMEOUT, 120)
+
+# 通过 webhook 服务器订阅状态时单次等待的最长秒数
+WEBHOOK_WAIT_TIMEOUT = 25
+
 class NotebookLMClient:
-    def __init__(self, api_key: str, webhook_url: str):
+    def __init__(self, api_key: str, webhook_url: str, paper_cache: PaperCache = None,
+                 episode_index: EpisodeIndex = None):
         """初始化 NotebookLM 客户端"""
         if not api_key:
             raise ValueError("API key 不能为空")
@@ -18,6 +27,12 @@ class NotebookLMClient:
         self.webhook_url = webhook_url
         self.base_url = "https://api.autocontentapi.com"
         self.jina_token = os.getenv("JINA_TOKEN")
+        # 论文全文缓存，避免重复请求 JinaReader
+        self.paper_cache = paper_cache or get_paper_cache()
+        # webhook 服务器上的状态订阅地址，默认与 webhook 同一服务
+        self.events_base_url = os.getenv("WEBHOOK_EVENTS_URL") or webhook_url.rsplit("/webhook", 1)[0]
+        # 已有节目的索引，设置后拒绝重复生成同一篇论文
+        self.episode_index = episode_index
         
         # 设置日志
         logging.basicConfig(level=logging.INFO)
@@ -25,7 +40,10 @@ class NotebookLMClient:
         
     def _get_paper_content(self, pdf_url: str) -> str:
         """
-        使用 JinaReader 获取论文内容
+        使用 JinaReader 获取论文内容，结果按 arXiv ID 和版本号缓存
+        
+        缓存有效时直接返回；过期条目带 If-None-Match/If-Modified-Since 重新验证，
+        请求失败时退回使用过期条目。
         
         Args:
             pdf_url: PDF文件的URL
@@ -33,21 +51,44 @@ class NotebookLMClient:
         Returns:
             str: 论文内容文本
         """
+        cache_key = arxiv_cache_key(pdf_url)
+        entry = self.paper_cache.get(cache_key) if cache_key else None
+        if entry and self.paper_cache.is_fresh(cache_key, entry):
+            self.logger.info(f"使用缓存的论文内容: {cache_key}")
+            return entry["text"]
+            
         try:
             headers = {
                 'Authorization': f'Bearer {self.jina_token}'
             }
+            if entry and entry.get("etag"):
+                headers['If-None-Match'] = entry["etag"]
+            if entry and entry.get("last_modified"):
+                headers['If-Modified-Since'] = entry["last_modified"]
             
             jina_url = f'https://r.jina.ai/{pdf_url}'
             self.logger.info(f"从JinaReader获取内容: {jina_url}")
             
-            response = requests.get(jina_url, headers=headers)
+            response = http_session.get(jina_url, headers=headers, timeout=JINA_TIMEOUT)
+            if response.status_code == 304 and entry:
+                self.logger.info(f"论文内容未变化: {cache_key}")
+                self.paper_cache.touch(cache_key, entry)
+                return entry["text"]
             response.raise_for_status()
             
+            if cache_key:
+                self.paper_cache.put(
+                    cache_key, response.text,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
             return response.text
             
         except Exception as e:
             self.logger.error(f"获取论文内容时出错: {str(e)}")
+            if entry:
+                self.logger.info(f"使用过期的缓存内容: {cache_key}")
+                return entry["text"]
             return None
         
     def _convert_arxiv_url(self, url: str) -> list:
@@ -62,12 +103,10 @@ class NotebookLMClient:
         """
         try:
             # 从URL中提取arXiv ID
-            match = re.search(r'arxiv.org/(?:abs|pdf)/(\d+\.\d+)', url)
-            if not match:
+            arxiv_id = arxiv_cache_key(url)
+            if not arxiv_id:
                 self.logger.error(f"无法从URL中提取arXiv ID: {url}")
                 return [{"content": url, "type": "website"}]
-                
-            arxiv_id = match.group(1)
             
             # 构建PDF和HTML URL
             pdf_url = f"https://arxiv.org/pdf/{arxiv_id}"
@@ -87,17 +126,27 @@ class NotebookLMClient:
             self.logger.error(f"转换arXiv URL时出错: {str(e)}")
             return [{"content": url, "type": "website"}]
         
-    def send_content(self, resources: list, text: str) -> str:
+    def send_content(self, resources: list, text: str, title: str = None) -> str:
         """
         发送内容到 AutoContent API
         
         Args:
             resources: 资源列表
             text: 提示文本
+            title: 节目标题，用于近似标题去重
             
         Returns:
             str: 请求ID
+
+        Raises:
+            DuplicatePaperError: 设置了 episode_index 且论文已有节目
         """
+        links = [resource["content"] for resource in resources or [] if resource.get("type") == "website"]
+        if self.episode_index is not None:
+            duplicate = self.episode_index.find(links, title)
+            if duplicate:
+                raise DuplicatePaperError(duplicate)
+
         try:
             # 验证输入
             if not resources:
@@ -136,7 +185,7 @@ class NotebookLMClient:
             self.logger.debug(f"Headers: {headers}")
             self.logger.debug(f"Payload: {json.dumps(payload, ensure_ascii=False)}")
             
-            response = requests.post(
+            response = http_session.post(
                 f"{self.base_url}/content/create",
                 headers=headers,
                 data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
@@ -154,6 +203,8 @@ class NotebookLMClient:
                 
                 if request_id:
                     self.logger.info(f"成功获取请求ID: {request_id}")
+                    if self.episode_index is not None:
+                        self.episode_index.add(links, title, source="request", request_id=request_id)
                     return request_id
                 else:
                     error_message = data.get("error_message", "未知错误")
@@ -193,7 +244,7 @@ class NotebookLMClient:
             
             self.logger.info(f"检查状态 URL: {status_url}")
             
-            response = requests.get(
+            response = http_session.get(
                 status_url,
                 headers=headers,
                 timeout=30
@@ -215,4 +266,60 @@ class NotebookLMClient:
             
         except Exception as e:
             self.logger.error(f"状态检查错误: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def get_update(self, request_id: str, since: int = 0) -> dict:
+        """
+        不等待地从 webhook 服务器读取请求比 since 更新的状态
+        
+        Args:
+            request_id: 请求ID
+            since: 已收到的最后一个状态序号
+            
+        Returns:
+            dict: 状态更新（包含 seq 字段），没有更新时返回 None
+            
+        Raises:
+            requests.exceptions.RequestException: webhook 服务器不可用
+        """
+        response = http_session.get(
+            f"{self.events_base_url}/status/{request_id}",
+            params={"since": since},
+            timeout=(http_session.CONNECT_TIMEOUT, http_session.READ_TIMEOUT)
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_update(self, request_id: str, since: int = 0, timeout: float = WEBHOOK_WAIT_TIMEOUT) -> dict:
+        """
+        通过 webhook 服务器的 SSE 接口等待请求状态更新
+        
+        webhook 收到 AutoContent 推送后立即返回，无需轮询 check_status。
+        
+        Args:
+            request_id: 请求ID
+            since: 已收到的最后一个状态序号，只返回更新的状态
+            timeout: 最长等待秒数
+            
+        Returns:
+            dict: 状态更新（包含 seq 字段），等待超时返回 None
+            
+        Raises:
+            requests.exceptions.RequestException: webhook 服务器不可用
+        """
+        response = http_session.get(
+            f"{self.events_base_url}/events/{request_id}",
+            params={"since": since, "timeout": timeout},
+            stream=True,
+            timeout=(http_session.CONNECT_TIMEOUT, timeout + 5)
+        )
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    return json.loads(line[5:])
+        finally:
+            response.close()
+        return None
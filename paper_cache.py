@@ -0,0 +1,161 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+# 缓存目录与容量配置
+PAPER_CACHE_DIR = os.getenv("AIPAPER_PAPER_CACHE_DIR", os.path.join(".cache", "papers"))
+PAPER_CACHE_MAX_MB = int(os.getenv("AIPAPER_PAPER_CACHE_MB", "500"))
+PAPER_CACHE_MEMORY_MB = int(os.getenv("AIPAPER_PAPER_CACHE_MEMORY_MB", "64"))
+# 未指定版本号的论文内容可能更新，超过该秒数后需要向服务器重新验证
+PAPER_CACHE_TTL = int(os.getenv("AIPAPER_PAPER_CACHE_TTL", str(24 * 3600)))
+
+# 新格式 ID（2411.15645）和 2007 年以前的旧格式 ID（hep-th/9901001、math.GT/0309136）
+ARXIV_ID_PATTERN = re.compile(
+    r'arxiv\.org/(?:abs|pdf|html)/(\d+\.\d+|[a-z-]+(?:\.[a-z]{2})?/\d{7})(v\d+)?', re.IGNORECASE
+)
+
+_paper_cache = None
+_paper_cache_lock = threading.Lock()
+
+
+def arxiv_cache_key(url: str) -> Optional[str]:
+    """从 arXiv URL 中提取缓存键（ID 加版本号，例如 2411.15645v2、hep-th/9901001），无法识别时返回 None"""
+    match = ARXIV_ID_PATTERN.search(url)
+    if not match:
+        return None
+    return match.group(1) + (match.group(2) or "")
+
+
+class PaperCache:
+    """
+    论文全文缓存
+
+    内存中保留最近使用的条目，磁盘上以 zlib 压缩保存全文并记录 ETag/Last-Modified。
+    带版本号的 arXiv 论文内容不会变化，永久有效；不带版本号的条目超过 TTL 后需要条件请求重新验证。
+    磁盘和内存两级都按最近使用顺序淘汰，总大小不超过配置的上限。
+    """
+
+    def __init__(self, cache_dir: str = PAPER_CACHE_DIR, max_bytes: int = PAPER_CACHE_MAX_MB * 1024 * 1024,
+                 memory_max_bytes: int = PAPER_CACHE_MEMORY_MB * 1024 * 1024, ttl: float = PAPER_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple:
+        safe_key = re.sub(r'[^0-9A-Za-z._-]', '_', key)
+        base = os.path.join(self.cache_dir, safe_key)
+        return base + ".txt.z", base + ".json"
+
+    def _remember(self, key: str, entry: dict) -> None:
+        """放入内存层并按 LRU 淘汰（调用方持有锁）"""
+        old = self._memory.pop(key, None)
+        if old:
+            self._memory_bytes -= len(old["text"])
+        self._memory[key] = entry
+        self._memory_bytes += len(entry["text"])
+        while self._memory_bytes > self.memory_max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted["text"])
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        读取缓存条目
+
+        Returns:
+            dict: 包含 text、etag、last_modified、fetched_at 的条目，不存在时返回 None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+            # 更新访问时间，磁盘淘汰按最近使用顺序进行
+            os.utime(data_path)
+        except (OSError, ValueError, zlib.error):
+            return None
+
+        entry = dict(meta, text=text)
+        with self._lock:
+            self._remember(key, entry)
+        return entry
+
+    def is_fresh(self, key: str, entry: dict) -> bool:
+        """带版本号的条目永久有效，否则在 TTL 内有效"""
+        if re.search(r'v\d+$', key):
+            return True
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, key: str, text: str, etag: str = None, last_modified: str = None) -> dict:
+        """写入缓存条目，返回新条目"""
+        meta = {"etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        data_path, meta_path = self._paths(key)
+
+        # 先写临时文件再替换，避免并发读取到不完整的内容
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(data_path + tmp_suffix, "wb") as f:
+            f.write(zlib.compress(text.encode("utf-8"), 6))
+        with open(meta_path + tmp_suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(data_path + tmp_suffix, data_path)
+        os.replace(meta_path + tmp_suffix, meta_path)
+
+        entry = dict(meta, text=text)
+        with self._lock:
+            self._remember(key, entry)
+        self._evict_disk()
+        return entry
+
+    def touch(self, key: str, entry: dict) -> dict:
+        """服务器确认内容未变化（304）后刷新条目的验证时间"""
+        return self.put(key, entry["text"], etag=entry.get("etag"), last_modified=entry.get("last_modified"))
+
+    def _evict_disk(self) -> None:
+        """磁盘占用超过上限时，按最近访问时间删除最旧的条目"""
+        files = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".txt.z"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            for stale in (path, path[:-len(".txt.z")] + ".json"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+
+def get_paper_cache() -> PaperCache:
+    """获取进程内共享的论文缓存"""
+    global _paper_cache
+    with _paper_cache_lock:
+        if _paper_cache is None:
+            _paper_cache = PaperCache()
+        return _paper_cache
@@ -0,0 +1,194 @@
+import html
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import http_session
+
+# 播客 RSS 地址
+PODBEAN_FEED_URL = os.getenv("PODBEAN_FEED_URL")
+# 解析结果缓存文件
+PODBEAN_FEED_CACHE = os.getenv("PODBEAN_FEED_CACHE", os.path.join(".cache", "podbean_feed.json"))
+# 两次访问服务器之间的最短间隔（秒），间隔内直接返回缓存
+FEED_REFRESH_INTERVAL = int(os.getenv("PODBEAN_FEED_REFRESH_INTERVAL", "60"))
+
+ITUNES_NS = "{http://www.itunes.com/dtds/podcast-1.0.dtd}"
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+def _text(item, tag: str) -> str:
+    value = item.findtext(tag)
+    return html.unescape(value.strip()) if value else ""
+
+
+def parse_item(item) -> dict:
+    """
+    把一个 <item> 元素转换为节目字典，字段顺序不影响结果
+
+    guid 是合并缓存时的键：没有 <guid> 时依次使用链接、标题加发布时间，都没有时为空字符串。
+    """
+    pub_date = _text(item, "pubDate")
+    published = datetime.strptime(pub_date, '%a, %d %b %Y %H:%M:%S %z') if pub_date else None
+    enclosure = item.find("enclosure")
+    link = _text(item, "link")
+    title = _text(item, "title")
+    return {
+        'guid': _text(item, "guid") or link or (f"{title}|{pub_date}" if title and pub_date else ""),
+        'title': title,
+        'link': link,
+        'date': published.strftime('%Y-%m-%d') if published else "",
+        'published_at': published.timestamp() if published else 0,
+        'description': _text(item, "description"),
+        'duration': _text(item, f"{ITUNES_NS}duration"),
+        'audio_url': enclosure.get("url") if enclosure is not None else None,
+    }
+
+
+def iter_feed_items(source):
+    """
+    流式解析 RSS，逐个返回节目字典
+
+    Args:
+        source: 文件路径或二进制文件对象（例如 HTTP 响应的原始流）
+    """
+    for _, elem in ET.iterparse(source, events=("end",)):
+        if elem.tag != "item":
+            continue
+        try:
+            yield parse_item(elem)
+        except Exception as e:
+            print(f"处理单个播客条目时出错: {str(e)}")
+        finally:
+            # 释放已处理条目占用的内存
+            elem.clear()
+
+
+class PodbeanFeed:
+    """
+    Podbean RSS 缓存
+
+    使用 ETag / If-Modified-Since 条件请求，未变化的 feed 直接返回缓存的解析结果；
+    feed 变化时流式解析并按 GUID 合并，已缓存但不再出现在 feed 中的旧节目（feed 只保留最近条目时）继续保留。
+    """
+
+    def __init__(self, feed_url: str, cache_path: str = PODBEAN_FEED_CACHE,
+                 refresh_interval: float = FEED_REFRESH_INTERVAL):
+        self.feed_url = feed_url
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self._episodes = {}
+        self._sorted = []
+        self._etag = None
+        self._last_modified = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cached.get("feed_url") != self.feed_url:
+            return
+        self._etag = cached.get("etag")
+        self._last_modified = cached.get("last_modified")
+        self._episodes = {episode["guid"]: episode for episode in cached.get("episodes", [])}
+        self._sort()
+
+    def _save(self) -> None:
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "feed_url": self.feed_url,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+                "episodes": self._sorted,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def _sort(self) -> None:
+        self._sorted = sorted(self._episodes.values(), key=lambda episode: episode["published_at"], reverse=True)
+
+    def episodes(self, force: bool = False) -> list:
+        """
+        返回按发布时间倒序的节目列表
+
+        Args:
+            force: 忽略刷新间隔，立即向服务器确认
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.refresh_interval:
+                return self._sorted
+            self._refresh()
+            return self._sorted
+
+    def _refresh(self) -> None:
+        headers = {}
+        if self._episodes:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        try:
+            response = http_session.get(self.feed_url, headers=headers, stream=True)
+            with response:
+                self._checked_at = time.monotonic()
+                if response.status_code == 304:
+                    return
+                response.raise_for_status()
+                response.raw.decode_content = True
+                added = 0
+                for episode in iter_feed_items(response.raw):
+                    if not episode["guid"]:
+                        # 无法区分的条目不合并，否则会互相覆盖
+                        print(f"跳过无法识别的播客条目: {episode['title'] or '（无标题）'}")
+                        continue
+                    if episode["guid"] not in self._episodes:
+                        added += 1
+                    self._episodes[episode["guid"]] = episode
+        except Exception as e:
+            # 失败同样计入刷新间隔，服务器不可用时不会让每次调用都等到超时
+            self._checked_at = time.monotonic()
+            print(f"获取播客列表失败: {str(e)}")
+            return
+
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        self._sort()
+        self._save()
+        if added:
+            print(f"播客列表新增 {added} 个节目")
+
+
+def get_feed(feed_url: str = None) -> PodbeanFeed:
+    """获取进程内共享的 feed 缓存，默认使用 PODBEAN_FEED_URL"""
+    feed_url = feed_url or PODBEAN_FEED_URL
+    if not feed_url:
+        raise ValueError("未配置 PODBEAN_FEED_URL")
+    with _feeds_lock:
+        feed = _feeds.get(feed_url)
+        if feed is None:
+            feed = _feeds[feed_url] = PodbeanFeed(feed_url)
+        return feed
+
+
+def parse_podbean_feed(feed_url: str = None) -> list:
+    """解析 Podbean Feed 获取播客列表"""
+    try:
+        return list(get_feed(feed_url).episodes())
+    except Exception as e:
+        print(f"获取播客列表失败: {str(e)}")
+        return []
@@ -1,34 +1,168 @@
-import requests
+import http_session
+import json
 import os
+import threading
+import time
 
-class PodbeanUploader:
-    def __init__(self, client_id, client_secret):
+from resumable_upload import put_file
+
+PODBEAN_AUTH_URL = "https://api.podbean.com/v1/oauth/token"
+# 令牌缓存文件，未设置时只在进程内缓存
+PODBEAN_TOKEN_CACHE = os.getenv("PODBEAN_TOKEN_CACHE")
+# 距离过期不足这么多秒时提前刷新令牌
+TOKEN_REFRESH_MARGIN = 300
+# 响应中没有 expires_in 时假定的有效期（秒）
+DEFAULT_TOKEN_TTL = 3600
+
+_token_managers = {}
+_uploaders = {}
+_registry_lock = threading.Lock()
+
+
+class PodbeanTokenManager:
+    """
+    Podbean OAuth 令牌缓存
+
+    按 expires_in 记录过期时间，过期前 TOKEN_REFRESH_MARGIN 秒内提前刷新；
+    可选地把令牌写入磁盘，进程重启或多个 worker 进程之间可以复用同一个令牌。
+    """
+
+    def __init__(self, client_id, client_secret, cache_path=PODBEAN_TOKEN_CACHE,
+                 refresh_margin=TOKEN_REFRESH_MARGIN):
         self.client_id = client_id
         self.client_secret = client_secret
-        self.auth_url = "https://api.podbean.com/v1/oauth/token"
-        self.authorize_upload_url = "https://api.podbean.com/v1/files/uploadAuthorize"
-        self.publish_url = "https://api.podbean.com/v1/episodes"
-        self.access_token = self.get_access_token()
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0
+        self._rejected = None
+        self._lock = threading.Lock()
 
-    def get_access_token(self):
+    def _valid(self, expires_at):
+        return time.time() < expires_at - self.refresh_margin
+
+    def _load(self):
+        """从磁盘读取同一 client_id 的未过期令牌"""
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f).get(self.client_id)
+        except (OSError, ValueError):
+            return False
+        if (not cached or not self._valid(cached.get("expires_at", 0))
+                or cached.get("access_token") == self._rejected):
+            return False
+        self._token = cached["access_token"]
+        self._expires_at = cached["expires_at"]
+        return True
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                tokens = json.load(f)
+        except (OSError, ValueError):
+            tokens = {}
+        tokens[self.client_id] = {"access_token": self._token, "expires_at": self._expires_at}
+        # 先写临时文件再替换，令牌文件只对当前用户可读
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(tokens, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print("Failed to save access token cache:", str(e))
+
+    def _fetch(self):
         auth_data = {
             'grant_type': 'client_credentials',
             'client_id': self.client_id,
             'client_secret': self.client_secret
         }
-        response = requests.post(self.auth_url, data=auth_data)
-        if response.ok:
-            token_info = response.json()
-            print("Access token obtained successfully.")
-            return token_info['access_token']
-        else:
+        response = http_session.post(PODBEAN_AUTH_URL, data=auth_data)
+        if not response.ok:
             print("Failed to get access token:", response.text)
             return None
+        token_info = response.json()
+        self._token = token_info['access_token']
+        self._expires_at = time.time() + int(token_info.get('expires_in') or DEFAULT_TOKEN_TTL)
+        self._save()
+        print("Access token obtained successfully.")
+        return self._token
+
+    def get_token(self, force_refresh=False):
+        """返回有效的访问令牌，临近过期或 force_refresh 时重新获取，失败返回 None"""
+        with self._lock:
+            if not force_refresh and (self._token and self._valid(self._expires_at) or self._load()):
+                return self._token
+            return self._fetch()
+
+    def invalidate(self, token=None):
+        """令牌被服务器拒绝时丢弃缓存（包括磁盘上的同一令牌），下次使用时重新获取"""
+        with self._lock:
+            if token and token != self._token:
+                # 其他线程已经刷新过令牌
+                return
+            self._rejected = self._token
+            self._token = None
+            self._expires_at = 0
+
+
+def get_token_manager(client_id, client_secret):
+    """获取进程内按 client_id 共享的令牌管理器"""
+    with _registry_lock:
+        manager = _token_managers.get(client_id)
+        if manager is None or manager.client_secret != client_secret:
+            manager = _token_managers[client_id] = PodbeanTokenManager(client_id, client_secret)
+        return manager
+
+
+def get_uploader(client_id=None, client_secret=None):
+    """获取进程内共享的上传器，默认使用 PODBEAN_CLIENT_ID / PODBEAN_CLIENT_SECRET"""
+    client_id = client_id or os.getenv("PODBEAN_CLIENT_ID")
+    client_secret = client_secret or os.getenv("PODBEAN_CLIENT_SECRET")
+    with _registry_lock:
+        uploader = _uploaders.get(client_id)
+        if uploader is not None and uploader.client_secret == client_secret:
+            return uploader
+    uploader = PodbeanUploader(client_id, client_secret)
+    with _registry_lock:
+        return _uploaders.setdefault(client_id, uploader)
+
+
+class PodbeanUploader:
+    def __init__(self, client_id, client_secret, token_manager=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_url = PODBEAN_AUTH_URL
+        self.authorize_upload_url = "https://api.podbean.com/v1/files/uploadAuthorize"
+        self.publish_url = "https://api.podbean.com/v1/episodes"
+        # 令牌在第一次调用 API 时才获取，同一 client_id 的上传器共享缓存的令牌
+        self.token_manager = token_manager or get_token_manager(client_id, client_secret)
+
+    @property
+    def access_token(self):
+        return self.token_manager.get_token()
+
+    def get_access_token(self):
+        return self.token_manager.get_token(force_refresh=True)
+
+    def _call(self, method, url, params_key, payload, **kwargs):
+        """带令牌调用 API，令牌被拒绝（401）时刷新后重试一次"""
+        for attempt in range(2):
+            token = payload['access_token'] = self.access_token
+            response = http_session.request(method, url, **{params_key: payload}, **kwargs)
+            if response.status_code != 401 or attempt:
+                return response
+            self.token_manager.invalidate(token)
+        return response
 
     def authorize_file_upload(self, filename, file_path, content_type="audio/mpeg"):
         filesize = os.path.getsize(file_path)
         params = {
-            'access_token': self.access_token,
             'filename': filename,
             'filesize': filesize,
             'content_type': content_type
@@ -36,27 +170,24 @@ class PodbeanUploader:
         headers = {
             'User-Agent': 'MyApp/1.2.3 (Example)'
         }
-        response = requests.get(self.authorize_upload_url, headers=headers, params=params)
+        response = self._call("GET", self.authorize_upload_url, "params", params, headers=headers)
         if response.ok:
             return response.json()
         else:
             print("Failed to authorize file upload:", response.text)
             return None
 
-    def upload_file_to_presigned_url(self, presigned_url, file_path):
-        with open(file_path, 'rb') as file_data:
-            headers = {'Content-Type': 'audio/mpeg'}
-            response = requests.put(presigned_url, headers=headers, data=file_data)
-            if response.status_code == 200:
-                print("File uploaded successfully.")
-                return True
-            else:
-                print("Failed to upload file:", response.text)
-                return False
+    def upload_file_to_presigned_url(self, presigned_url, file_path, progress_callback=None, resumable=False,
+                                     buffer=None):
+        # Podbean 返回的是 S3 预签名 URL，只能一次 PUT 整个文件；中断后整体重试
+        if put_file(presigned_url, file_path, headers={'Content-Type': 'audio/mpeg'},
+                    progress_callback=progress_callback, resumable=resumable, buffer=buffer):
+            print("File uploaded successfully.")
+            return True
+        return False
 
     def publish_episode(self, title, content, file_key, season_number=1, episode_number=1):
         data = {
-            'access_token': self.access_token,
             'title': title,
             'content': content,
             'status': 'publish',
@@ -72,7 +203,7 @@ class PodbeanUploader:
             'User-Agent': 'AI Paper+/1.0 (Example)'
         }
 
-        response = requests.post(self.publish_url, headers=headers, data=data)
+        response = self._call("POST", self.publish_url, "data", data, headers=headers)
         if response.ok:
             print("Episode published successfully!")
             return response.json()
@@ -24,4 +24,23 @@ def normalize_content(content: dict) -> PodcastContent:
         'audio_link': content.get('audio_link', None)
     }
     
-    return PodcastContent(**required_fields) 
\ No newline at end of file
+    return PodcastContent(**required_fields)
+
+def content_to_dict(podcast_content) -> dict:
+    """
+    把 crew 输出（CrewOutput、PodcastContent、JSON 字符串或字典）转换为可持久化的字典
+
+    crew 的写作任务以 PodcastContent 作为结构化输出，这里只做一次校验，不再从文本中剥离代码块。
+    """
+    if getattr(podcast_content, 'pydantic', None) is not None:
+        podcast_content = podcast_content.pydantic
+    elif getattr(podcast_content, 'json_dict', None):
+        podcast_content = podcast_content.json_dict
+    elif hasattr(podcast_content, 'raw'):
+        podcast_content = podcast_content.raw
+
+    if isinstance(podcast_content, str):
+        podcast_content = PodcastContent.model_validate_json(podcast_content)
+    elif isinstance(podcast_content, dict):
+        podcast_content = normalize_content(dict(podcast_content))
+    return podcast_content.dict()
@@ -0,0 +1,157 @@
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from cloud_storage import get_cloud_storage
+from podbean_uploader import get_uploader
+from resumable_upload import retry_delay
+
+# 每个目标整体失败后的重试次数（传输层的重试在各上传器内部完成）
+PUBLISH_RETRIES = int(os.getenv("AIPAPER_PUBLISH_RETRIES", "2"))
+
+
+class Destination:
+    """
+    发布目标
+
+    upload(buffer, file_path, progress_callback) 从共享缓冲区上传文件并返回结果字典，失败时抛出异常。
+    required 为 False 的目标（例如镜像备份）失败不影响整体结果。
+    """
+
+    def __init__(self, name: str, upload: Callable, required: bool = True):
+        self.name = name
+        self.upload = upload
+        self.required = required
+
+
+def podbean_destination(filename: str, content_type: str = "audio/mpeg") -> Destination:
+    """上传到 Podbean，结果中的 file_key 用于发布节目"""
+    def upload(buffer, file_path, progress_callback):
+        uploader = get_uploader()
+        upload_auth = uploader.authorize_file_upload(filename, file_path, content_type=content_type)
+        if not upload_auth:
+            raise ValueError("获取 Podbean 上传授权失败")
+        if not uploader.upload_file_to_presigned_url(upload_auth["presigned_url"], file_path,
+                                                     progress_callback=progress_callback, buffer=buffer):
+            raise ValueError("文件上传失败")
+        return {"file_key": upload_auth["file_key"]}
+    return Destination("podbean", upload)
+
+
+def cloudinary_destination(name: str = "cloudinary") -> Optional[Destination]:
+    """镜像到 Cloudinary，未配置时返回 None"""
+    storage = get_cloud_storage()
+    if storage is None:
+        return None
+
+    def upload(buffer, file_path, progress_callback):
+        result = storage.upload_audio(file_path, progress_callback=progress_callback, buffer=buffer)
+        if not result["success"]:
+            raise ValueError(result["error"])
+        return {"url": result["url"], "public_id": result["public_id"]}
+    return Destination(name, upload, required=False)
+
+
+def default_destinations(filename: str) -> list:
+    """Podbean 加上已配置的镜像目标"""
+    destinations = [podbean_destination(filename)]
+    mirror = cloudinary_destination()
+    if mirror:
+        destinations.append(mirror)
+    return destinations
+
+
+def _upload_with_retries(destination: Destination, buffer, file_path: str, max_retries: int,
+                         progress_callback: Optional[Callable]) -> dict:
+    start = time.monotonic()
+
+    def callback(sent, total):
+        if progress_callback:
+            progress_callback(destination.name, sent, total)
+
+    for attempt in range(max_retries + 1):
+        try:
+            result = destination.upload(buffer, file_path, callback)
+            return {"success": True, "attempts": attempt + 1, "elapsed": round(time.monotonic() - start, 2),
+                    "required": destination.required, "result": result}
+        except Exception as e:
+            error = str(e)
+            if attempt < max_retries:
+                print(f"{destination.name} 上传失败（{error}），{retry_delay(attempt):.1f} 秒后重试...")
+                time.sleep(retry_delay(attempt))
+
+    return {"success": False, "attempts": max_retries + 1, "elapsed": round(time.monotonic() - start, 2),
+            "required": destination.required, "error": error}
+
+
+def publish_file(file_path: str, destinations: list, completed: dict = None,
+                 progress_callback: Optional[Callable] = None, max_retries: int = PUBLISH_RETRIES) -> dict:
+    """
+    把文件同时上传到所有发布目标
+
+    文件只以 mmap 映射一次，各目标在各自的线程中从同一块只读内存读取，
+    总耗时取决于最慢的目标而不是各目标耗时之和。
+
+    Args:
+        file_path: 本地文件路径
+        destinations: Destination 列表
+        completed: 上次发布的 destinations 结果，已成功的目标不再重复上传
+        progress_callback: 进度回调，参数为（目标名称, 已发送字节数, 总字节数）
+        max_retries: 每个目标的重试次数
+
+    Returns:
+        dict: {"success": 必需目标是否全部成功, "elapsed": 总秒数,
+               "destinations": {目标名称: {"success", "attempts", "elapsed", "required", "result" 或 "error"}}}
+    """
+    start = time.monotonic()
+    results = {name: result for name, result in (completed or {}).items() if result.get("success")}
+    pending = [destination for destination in destinations if destination.name not in results]
+
+    if pending:
+        if os.path.getsize(file_path) == 0:
+            raise ValueError("文件大小为0")
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buffer = memoryview(mapped)
+            try:
+                with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                    futures = {
+                        destination.name: executor.submit(_upload_with_retries, destination, buffer, file_path,
+                                                          max_retries, progress_callback)
+                        for destination in pending
+                    }
+                    results.update({name: future.result() for name, future in futures.items()})
+            finally:
+                buffer.release()
+
+    return {
+        "success": all(result["success"] for result in results.values() if result["required"]),
+        "elapsed": round(time.monotonic() - start, 2),
+        "destinations": results,
+    }
+
+
+def publish_renditions(renditions: dict, completed: dict = None,
+                       progress_callback: Optional[Callable] = None) -> dict:
+    """
+    把多码率版本镜像到 Cloudinary（未配置时跳过），失败不影响节目发布
+
+    Args:
+        renditions: {版本名称: 本地文件路径}
+        completed: 上次的结果，已成功的版本不再重复上传
+        progress_callback: 进度回调，目标名称为 cloudinary_<版本名称>
+
+    Returns:
+        dict: {版本名称: publish_file 中该目标的结果}
+    """
+    results = dict(completed or {})
+    for name, file_path in renditions.items():
+        if results.get(name, {}).get("success") or not os.path.exists(file_path):
+            continue
+        destination = cloudinary_destination(f"cloudinary_{name}")
+        if destination is None:
+            break
+        published = publish_file(file_path, [destination], progress_callback=progress_callback)
+        results[name] = published["destinations"][destination.name]
+    return results
@@ -0,0 +1,245 @@
+import json
+import os
+import re
+import time
+from typing import Callable, Optional
+
+import requests
+
+import http_session
+
+# 分块 PUT 每块的大小
+UPLOAD_CHUNK_SIZE = int(os.getenv("AIPAPER_UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+# 单块（或整个文件）上传失败后的重试次数
+UPLOAD_MAX_RETRIES = int(os.getenv("AIPAPER_UPLOAD_MAX_RETRIES", "5"))
+# 分块续传时，服务器连续这么多次 308 都没有确认新数据即放弃
+UPLOAD_MAX_STALLS = 3
+UPLOAD_TIMEOUT = (http_session.CONNECT_TIMEOUT, 300)
+# 上传进度文件与待上传文件放在一起
+UPLOAD_STATE_SUFFIX = ".upload.json"
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class UploadStalledError(RuntimeError):
+    """分块续传时服务器不再确认新的数据（例如 308 响应缺少 Range 头）"""
+
+
+def retry_delay(attempt: int) -> float:
+    """第 attempt 次重试前等待的秒数"""
+    return http_session.BACKOFF_FACTOR * (2 ** attempt)
+
+
+class UploadState:
+    """
+    上传进度记录
+
+    保存已确认的偏移量和续传所需的信息（上传ID、URL 等），进程重启后从这里继续。
+    文件大小或修改时间变化后记录自动失效。
+    """
+
+    def __init__(self, file_path: str, state_path: str = None):
+        self.path = state_path or file_path + UPLOAD_STATE_SUFFIX
+        stat = os.stat(file_path)
+        self.fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("fingerprint") != self.fingerprint:
+            return {}
+        return data
+
+    def get(self, key: str, default=None):
+        return self.data.get(key, default)
+
+    def save(self, **fields) -> None:
+        self.data.update(fields, fingerprint=self.fingerprint)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, **fields) -> None:
+        """丢弃已有进度，重新开始"""
+        self.data = {}
+        self.save(**fields)
+
+    def clear(self) -> None:
+        """上传完成后删除进度记录"""
+        self.data = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BufferReader:
+    """
+    在共享缓冲区（例如 mmap 的 memoryview）上按自己的位置读取的文件对象
+
+    多个上传线程各自持有一个 BufferReader，共享同一份文件内容而不互相影响读取位置。
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def seek(self, offset: int) -> None:
+        self.position = offset
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self.buffer) if size is None or size < 0 else min(len(self.buffer), self.position + size)
+        data = bytes(self.buffer[self.position:end])
+        self.position = end
+        return data
+
+    def close(self) -> None:
+        self.buffer = None
+
+
+class ProgressReader:
+    """
+    只读取文件中 [offset, offset + length) 一段的文件对象，读取时回调上传进度
+
+    requests 通过 len 属性设置 Content-Length，避免使用 chunked 编码。
+    """
+
+    def __init__(self, file, offset: int, length: int, total: int,
+                 progress_callback: Optional[ProgressCallback] = None):
+        self.file = file
+        self.offset = offset
+        self.len = length
+        self.total = total
+        self.progress_callback = progress_callback
+        self._sent = 0
+        file.seek(offset)
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.len - self._sent
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self.file.read(size)
+        self._sent += len(data)
+        if data and self.progress_callback:
+            self.progress_callback(self.offset + self._sent, self.total)
+        return data
+
+
+def _acknowledged_offset(response: requests.Response) -> int:
+    """从 308 响应的 Range 头（bytes=0-N）解析服务器已确认的字节数"""
+    match = re.match(r'bytes=0-(\d+)', response.headers.get("Range", ""))
+    return int(match.group(1)) + 1 if match else 0
+
+
+def _query_offset(url: str, total: int, headers: dict) -> int:
+    """询问服务器已经收到多少字节"""
+    response = http_session.put(url, retry=False, timeout=UPLOAD_TIMEOUT,
+                                headers=dict(headers, **{"Content-Range": f"bytes */{total}"}))
+    if response.status_code == 308:
+        return _acknowledged_offset(response)
+    if response.ok:
+        return total
+    return 0
+
+
+def _put_ranges(url: str, file, total: int, headers: dict, state: UploadState, chunk_size: int,
+                progress_callback: Optional[ProgressCallback]) -> requests.Response:
+    """
+    分块 PUT：每块带 Content-Range，服务器以 308 确认已收到的范围，最后一块返回 2xx
+
+    Raises:
+        UploadStalledError: 连续 UPLOAD_MAX_STALLS 次 308 响应确认的偏移量都没有前进
+    """
+    offset = state.get("offset", 0)
+    if offset:
+        offset = _query_offset(url, total, headers)
+        if offset >= total:
+            return None
+
+    stalls = 0
+    while True:
+        length = min(chunk_size, total - offset)
+        chunk_headers = dict(headers, **{"Content-Range": f"bytes {offset}-{offset + length - 1}/{total}"})
+        response = http_session.put(url, retry=False, timeout=UPLOAD_TIMEOUT, headers=chunk_headers,
+                                    data=ProgressReader(file, offset, length, total, progress_callback))
+        if response.status_code != 308:
+            return response
+        acknowledged = _acknowledged_offset(response)
+        if acknowledged <= offset:
+            stalls += 1
+            if stalls >= UPLOAD_MAX_STALLS:
+                raise UploadStalledError(f"服务器连续 {stalls} 次未确认新数据，停留在第 {acknowledged} 字节")
+        else:
+            stalls = 0
+        offset = acknowledged
+        state.save(offset=offset)
+
+
+def put_file(url: str, file_path: str, headers: dict = None,
+             progress_callback: Optional[ProgressCallback] = None, resumable: bool = False,
+             chunk_size: int = UPLOAD_CHUNK_SIZE, max_retries: int = UPLOAD_MAX_RETRIES,
+             buffer=None) -> bool:
+    """
+    以 PUT 上传文件，网络错误或 5xx 时重试
+
+    Args:
+        url: 上传地址
+        file_path: 本地文件路径
+        headers: 额外的请求头
+        progress_callback: 进度回调，参数为（已发送字节数, 总字节数）
+        resumable: 服务器支持分块续传（Content-Range + 308）时为 True，
+            失败后从最后确认的块继续，进程重启后同样有效；
+            为 False 时整个文件在一个请求中流式发送（S3 预签名 URL 只支持这种方式），重试需从头开始
+        chunk_size: 分块续传时每块的大小
+        max_retries: 最大重试次数
+        buffer: 文件内容的共享缓冲区，提供时从缓冲区读取而不再打开文件
+
+    Returns:
+        bool: 上传是否成功
+    """
+    headers = headers or {}
+    total = os.path.getsize(file_path)
+    resumable = resumable and total > 0
+    state = UploadState(file_path) if resumable else None
+    if state and state.get("url") != url:
+        state.reset(url=url, offset=0)
+
+    with (BufferReader(buffer) if buffer is not None else open(file_path, 'rb')) as f:
+        for attempt in range(max_retries + 1):
+            try:
+                if resumable:
+                    response = _put_ranges(url, f, total, headers, state, chunk_size, progress_callback)
+                else:
+                    response = http_session.put(url, retry=False, timeout=UPLOAD_TIMEOUT, headers=headers,
+                                                data=ProgressReader(f, 0, total, total, progress_callback))
+                if response is None or response.ok:
+                    if state:
+                        state.clear()
+                    return True
+                if response.status_code < 500:
+                    print("Failed to upload file:", response.text)
+                    return False
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except UploadStalledError as e:
+                # 重试同样不会有进展；放弃这次续传，之后重新上传时从头开始
+                print("Failed to upload file:", str(e))
+                state.clear()
+                return False
+
+            if attempt < max_retries:
+                print(f"上传中断（{error}），{retry_delay(attempt):.1f} 秒后重试...")
+                time.sleep(retry_delay(attempt))
+
+    print("Failed to upload file:", error)
+    return False
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import date, timedelta
+from typing import Optional
+
+from aipaper_crew import run_find_papers
+
+# 搜索结果缓存目录
+SEARCH_CACHE_DIR = os.getenv("AIPAPER_SEARCH_CACHE_DIR", os.path.join(".cache", "search"))
+# 结果在该秒数内视为新鲜，直接返回
+SEARCH_CACHE_TTL = int(os.getenv("AIPAPER_SEARCH_CACHE_TTL", str(6 * 3600)))
+# 过期后仍可先返回旧结果、同时在后台刷新的最长秒数，0 表示过期后必须同步刷新
+SEARCH_CACHE_STALE_TTL = int(os.getenv("AIPAPER_SEARCH_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+# 搜索的时间窗口（天），0 表示从今年 1 月 1 日开始
+SEARCH_WINDOW_DAYS = int(os.getenv("AIPAPER_SEARCH_WINDOW_DAYS", "0"))
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def normalize_topic(topic: str) -> str:
+    """统一全半角和大小写，合并空白，去掉首尾标点"""
+    topic = unicodedata.normalize("NFKC", topic or "").lower()
+    topic = re.sub(r'\s+', ' ', topic)
+    return re.sub(r'^[\W_]+|[\W_]+$', '', topic)
+
+
+def search_start_date(window_days: int = SEARCH_WINDOW_DAYS) -> str:
+    """当前搜索时间窗口的起始日期（YYYY-MM-DD）"""
+    today = date.today()
+    if window_days > 0:
+        return (today - timedelta(days=window_days)).isoformat()
+    return today.replace(month=1, day=1).isoformat()
+
+
+class SearchCache:
+    """
+    论文搜索结果缓存
+
+    按规范化主题和时间窗口起始日期缓存 crew 的搜索结果，保存在磁盘上，多个进程和重启之间共享。
+    新鲜期内直接返回；过期但在 stale_ttl 内时先返回旧结果，同时在后台刷新；
+    同一主题的并发未命中只会触发一次搜索。
+    """
+
+    def __init__(self, cache_dir: str = SEARCH_CACHE_DIR, ttl: float = SEARCH_CACHE_TTL,
+                 stale_ttl: float = SEARCH_CACHE_STALE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """读取缓存条目（result、topic、start_date、fetched_at），不存在时返回 None"""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, result: str, **info) -> dict:
+        entry = dict(info, key=key, result=result, fetched_at=time.time())
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return entry
+
+    def _search(self, key: str, topic: str, start_date: str) -> dict:
+        """执行搜索并写入缓存；同一键已有搜索在进行时等待其结果"""
+        with self._lock:
+            event = self._in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = self._in_flight[key] = threading.Event()
+        if not owner:
+            event.wait()
+            entry = self.get(key)
+            if entry is None:
+                raise ValueError(f"未找到相关论文: {topic}")
+            return entry
+
+        try:
+            result = run_find_papers(topic, start_date=start_date)
+            if not result:
+                raise ValueError(f"未找到相关论文: {topic}")
+            return self.put(key, str(result), topic=topic, start_date=start_date)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def _refresh_in_background(self, key: str, topic: str, start_date: str) -> None:
+        with self._lock:
+            if key in self._in_flight:
+                return
+
+        def refresh():
+            try:
+                self._search(key, topic, start_date)
+            except Exception as e:
+                print(f"后台刷新搜索结果失败: {topic}: {str(e)}")
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def find_papers(self, topic: str, refresh: bool = False, stale_while_revalidate: bool = True,
+                    window_days: int = SEARCH_WINDOW_DAYS) -> dict:
+        """
+        搜索主题相关的论文，优先使用缓存
+
+        Args:
+            topic: 研究主题
+            refresh: 忽略缓存，重新搜索
+            stale_while_revalidate: 过期结果是否可以先返回再在后台刷新
+            window_days: 搜索的时间窗口（天），0 表示从今年 1 月 1 日开始
+
+        Returns:
+            dict: 缓存条目，result 为论文列表，cached 表示结果来自缓存，stale 表示正在后台刷新
+        """
+        start_date = search_start_date(window_days)
+        key = f"{normalize_topic(topic)}|{start_date}"
+        entry = None if refresh else self.get(key)
+        if entry:
+            age = time.time() - entry["fetched_at"]
+            if age < self.ttl:
+                return dict(entry, cached=True, stale=False)
+            if stale_while_revalidate and age < self.ttl + self.stale_ttl:
+                self._refresh_in_background(key, topic, start_date)
+                return dict(entry, cached=True, stale=True)
+        return dict(self._search(key, topic, start_date), cached=False, stale=False)
+
+
+def get_search_cache() -> SearchCache:
+    """获取进程内共享的搜索缓存"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
+
+
+def cached_find_papers(topic: str, refresh: bool = False) -> str:
+    """搜索主题相关的论文，返回论文列表"""
+    return get_search_cache().find_papers(topic, refresh=refresh)["result"]
@@ -0,0 +1,137 @@
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# 低于该 RMS 电平（dBFS）的帧视为静音
+SILENCE_THRESHOLD_DB = float(os.getenv("AIPAPER_SILENCE_DB", "-50"))
+# 段落之间保留的最长停顿（秒），更长的停顿压缩到该长度，0 表示不压缩内部停顿
+MAX_PAUSE = float(os.getenv("AIPAPER_MAX_PAUSE", "1.0"))
+# 开头和结尾保留的静音（秒）
+EDGE_PAD = 0.25
+# RMS 帧长和帧移（秒）：每 10ms 判断一次，帧长 30ms 覆盖后面两个帧移，语音起始处不会被误判为静音
+FRAME_SECONDS = 0.03
+HOP_SECONDS = 0.01
+
+
+class SilenceCompactor:
+    """
+    分块的静音裁剪
+
+    用 stride tricks 把数据块看作重叠的帧（不复制数据），一次算出所有帧的 RMS，
+    再按静音段整体处理：去掉开头和结尾的静音（各保留 EDGE_PAD），
+    内部超过 max_pause 的停顿只保留前后各一半。一个静音段最多缓存 max_pause 秒的数据。
+    """
+
+    def __init__(self, samplerate: int, threshold_db: float = SILENCE_THRESHOLD_DB,
+                 max_pause: float = MAX_PAUSE, edge_pad: float = EDGE_PAD):
+        self.samplerate = samplerate
+        self._threshold = (10 ** (threshold_db / 20)) ** 2
+        self._hop = max(1, int(round(samplerate * HOP_SECONDS)))
+        self._frame = max(self._hop, int(round(samplerate * FRAME_SECONDS)))
+        half_pause = int(samplerate * max_pause / 2) if max_pause > 0 else None
+        edge = int(samplerate * edge_pad)
+        # 静音段开头和结尾各自最多保留的采样数，None 表示不限制（不压缩内部停顿）
+        self._head_len = max(half_pause, edge) if half_pause is not None else None
+        self._tail_len = max(half_pause, edge) if half_pause is not None else edge
+        self._edge = edge
+
+        self._pending = np.zeros(0, dtype=np.float32)   # 还缺少后续数据、无法判断的采样
+        self._head = []                                  # 当前静音段开头保留的数据
+        self._head_n = 0
+        self._tail = np.zeros(0, dtype=np.float32)       # 当前静音段最后的数据
+        self._silence_n = 0                              # 当前静音段的总采样数
+        self._started = False                            # 是否已经出现过非静音
+        self.input_samples = 0
+        self.removed_samples = 0
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.removed_samples / self.samplerate
+
+    def _silent_hops(self, x: np.ndarray, n_hops: int) -> np.ndarray:
+        frames = as_strided(x, shape=(n_hops, self._frame), strides=(self._hop * x.strides[0], x.strides[0]),
+                            writeable=False)
+        mean_square = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / self._frame
+        return mean_square < self._threshold
+
+    def _add_silence(self, x: np.ndarray) -> None:
+        self._silence_n += len(x)
+        if self._head_len is None:
+            self._head.append(x)
+            return
+        room = self._head_len - self._head_n
+        if room > 0:
+            self._head.append(x[:room])
+            self._head_n += len(x[:room])
+            x = x[room:]
+        if len(x):
+            self._tail = np.concatenate([self._tail, x])[-self._tail_len:]
+
+    def _end_silence(self, trailing: bool = False) -> list:
+        """静音段结束，返回其中保留的部分"""
+        if not self._silence_n:
+            return []
+        head = np.concatenate(self._head) if self._head else np.zeros(0, dtype=np.float32)
+        if not self._started:
+            # 开头的静音只保留紧挨着语音的一小段
+            kept = [np.concatenate([head, self._tail])[-self._edge:]] if self._edge else []
+        elif trailing:
+            kept = [head[:self._edge]]
+        else:
+            kept = [head, self._tail]
+        self.removed_samples += self._silence_n - sum(len(part) for part in kept)
+        self._head, self._head_n, self._silence_n = [], 0, 0
+        self._tail = np.zeros(0, dtype=np.float32)
+        return kept
+
+    def _run(self, block: np.ndarray, final: bool) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        self.input_samples += len(block)
+        x = np.concatenate([self._pending, block]) if len(self._pending) else block
+        lookahead = self._frame - self._hop
+        if final:
+            n_hops = -(-len(x) // self._hop)
+            n_decided = len(x)
+            padded = np.concatenate([x, np.zeros(n_hops * self._hop + lookahead - len(x), dtype=np.float32)])
+        else:
+            n_hops = max(0, (len(x) - lookahead) // self._hop)
+            n_decided = n_hops * self._hop
+            padded = np.ascontiguousarray(x)
+        self._pending = x[n_decided:]
+        if n_hops == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        silent = self._silent_hops(padded, n_hops)
+        # 按连续的静音/非静音段处理
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(silent.view(np.int8))) + 1, [n_hops]])
+        out = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            segment = x[start * self._hop:min(end * self._hop, n_decided)]
+            if silent[start]:
+                self._add_silence(segment)
+            else:
+                out.extend(self._end_silence())
+                out.append(segment)
+                self._started = True
+        if final:
+            out.extend(self._end_silence(trailing=True))
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """输入一个单声道数据块，返回已经确定保留的数据"""
+        return self._run(block, final=False)
+
+    def flush(self) -> np.ndarray:
+        """输入结束，输出剩余数据（去掉结尾的静音）"""
+        return self._run(np.zeros(0, dtype=np.float32), final=True)
+
+    def filter(self, blocks):
+        """包装数据块迭代器，逐块返回裁剪后的数据"""
+        for block in blocks:
+            out = self.process(block)
+            if len(out):
+                yield out
+        tail = self.flush()
+        if len(tail):
+            yield tail
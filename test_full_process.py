@@ -1,9 +1,11 @@
 from nlm_client import NotebookLMClient
 from audio_handler import AudioHandler
-from podbean_uploader import PodbeanUploader
+from podbean_uploader import get_uploader
+from workspace import get_workspace_manager
 from dotenv import load_dotenv
 import os
 import time
+import uuid
 import json
 import argparse
 
@@ -23,9 +25,10 @@ def test_full_process(request_id=None):
         "paper_link": "https://arxiv.org/abs/2411.15645",
         "prompt_text": "Explore the transformative MC-NEST method and its impact on AI's mathematical capabilities!"
     }
-    # 临时文件路径
-    temp_wav = "temp_audio.wav"
-    output_mp3 = "podcast_audio.mp3"
+    # 临时文件放在独立的工作区中，多个测试同时运行也不会互相覆盖
+    workspace = get_workspace_manager().open(f"test-{uuid.uuid4().hex[:8]}")
+    temp_wav = workspace.file("temp_audio.wav")
+    output_mp3 = workspace.file("podcast_audio.mp3")
     
     try:
         print("\n=== 开始测试完整流程 ===")
@@ -58,13 +61,26 @@ def test_full_process(request_id=None):
         max_checks = 20  # 最多检查10分钟 (20次 * 30秒)
         check_count = 0
         audio_url = None
+        seq = 0
+        webhook_available = True
         
         while check_count < max_checks:
             check_count += 1
             current_time = time.strftime("%H:%M:%S")
             
             print(f"\n检查 #{check_count} - {current_time}")
-            status_data = client.check_status(request_id)
+            status_data = None
+            if webhook_available:
+                # 等待 webhook 推送，最多30秒
+                try:
+                    status_data = client.wait_for_update(request_id, since=seq, timeout=30)
+                except Exception as e:
+                    print(f"webhook 服务器不可用，改为轮询: {str(e)}")
+                    webhook_available = False
+            if status_data:
+                seq = status_data.get("seq", seq)
+            else:
+                status_data = client.check_status(request_id)
             
             if status_data:
                 status = status_data.get("status", 0)
@@ -86,7 +102,8 @@ def test_full_process(request_id=None):
                     else:
                         print("继续等待状态更新...")
             
-            time.sleep(30)  # 每30秒检查一次
+            if not webhook_available:
+                time.sleep(30)  # 每30秒检查一次
         
         if not audio_url:
             if check_count >= max_checks:
@@ -94,23 +111,20 @@ def test_full_process(request_id=None):
             else:
                 raise Exception("音频生成失败")
         
-        # 4. 下载音频文件
-        print("\n4. 下载音频文件...")
+        # 4. 边下载边转换音频格式
+        print("\n4. 下载并转换音频...")
         audio_handler = AudioHandler()
-        if not audio_handler.download_audio(audio_url, temp_wav):
-            raise Exception("下载音频文件失败")
-        
-        # 5. 转换音频格式
-        print("\n5. 转换音频格式...")
-        if not audio_handler.convert_wav_to_mp3(temp_wav, output_mp3):
-            raise Exception("音频格式转换失败")
+        if not audio_handler.stream_convert_url(audio_url, output_mp3):
+            # 5. 无法流式解码时回退到先下载再转换
+            print("\n5. 回退为先下载再转换...")
+            if not audio_handler.download_audio(audio_url, temp_wav):
+                raise Exception("下载音频文件失败")
+            if not audio_handler.convert_wav_to_mp3(temp_wav, output_mp3):
+                raise Exception("音频格式转换失败")
         
         # 6. 上传到 Podbean
         print("\n6. 上传到 Podbean...")
-        podbean_client = PodbeanUploader(
-            os.getenv("PODBEAN_CLIENT_ID"),
-            os.getenv("PODBEAN_CLIENT_SECRET")
-        )
+        podbean_client = get_uploader()
         
         # 获取上传授权
         upload_auth = podbean_client.authorize_file_upload(
@@ -152,10 +166,8 @@ def test_full_process(request_id=None):
     finally:
         # 清理临时文件
         print("\n7. 清理临时文件...")
-        for temp_file in [temp_wav, output_mp3]:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-                print(f"已删除: {temp_file}")
+        workspace.cleanup()
+        print(f"已删除: {workspace.path}")
 
 if __name__ == "__main__":
     # 创建命令行参数解析器
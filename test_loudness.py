@@ -0,0 +1,23 @@
+import numpy as np
+
+from loudness import TruePeakLimiter
+
+
+def test_true_peak_limiter_ceiling():
+    """
+    限幅后的任何采样都不超过上限，包括第一个预读窗口内的采样，且结果与分块大小无关
+    """
+    samplerate = 22050
+    t = np.arange(2 * samplerate) / samplerate
+    for amplitude in (2.7, 1.2, 0.5):
+        x = (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        outputs = []
+        for block_size in (100, 1000, 65536):
+            limiter = TruePeakLimiter(samplerate)
+            blocks = [limiter.process(x[i:i + block_size]) for i in range(0, len(x), block_size)]
+            out = np.concatenate(blocks + [limiter.flush()])
+            assert len(out) == len(x)
+            assert np.abs(out).max() <= limiter.ceiling * (1 + 1e-6)
+            outputs.append(out)
+        for out in outputs[1:]:
+            np.testing.assert_allclose(out, outputs[0], atol=1e-6)
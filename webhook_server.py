@@ -1,15 +1,150 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from collections import OrderedDict, deque
 import threading
-import queue
 import logging
+import json
+import os
+import time
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("WebhookServer")
 
 app = Flask(__name__)
-# 用于存储状态更新的队列
-status_updates = queue.Queue()
+
+# 状态存储配置：过期时间（秒）、每个请求保留的历史条数、最多保存的请求数
+STATUS_TTL = int(os.getenv("WEBHOOK_STATUS_TTL", str(6 * 3600)))
+STATUS_HISTORY_SIZE = int(os.getenv("WEBHOOK_STATUS_HISTORY", "20"))
+STATUS_MAX_ENTRIES = int(os.getenv("WEBHOOK_STATUS_MAX_ENTRIES", "10000"))
+
+# SSE 连接和长轮询默认保持时长、上限和心跳间隔（秒）
+EVENTS_DEFAULT_TIMEOUT = 25
+EVENTS_MAX_TIMEOUT = 300
+EVENTS_HEARTBEAT = 15
+
+
+def _is_final(update: dict) -> bool:
+    """音频已生成或出错时不会再有后续更新"""
+    return bool(update.get("audio_url") or update.get("error_message")) or update.get("status") == 100
+
+
+class _StatusEntry:
+    """单个请求的最新状态、历史记录和等待条件"""
+    __slots__ = ("latest", "history", "seq", "updated_at", "changed")
+
+    def __init__(self, lock, history_size):
+        self.latest = None
+        self.history = deque(maxlen=history_size)
+        self.seq = 0
+        self.updated_at = time.monotonic()
+        # 所有条目共享存储的锁，各自唤醒自己的订阅者
+        self.changed = threading.Condition(lock)
+
+
+class StatusStore:
+    """
+    按 request_id 索引的状态存储
+    
+    每个请求保存最新状态和有限条历史，超过 TTL 未更新的请求被淘汰，
+    条目总数也有上限，因此大量并发生成时内存占用保持有界。
+    """
+
+    def __init__(self, ttl: float = STATUS_TTL, history_size: int = STATUS_HISTORY_SIZE,
+                 max_entries: int = STATUS_MAX_ENTRIES):
+        self.ttl = ttl
+        self.history_size = history_size
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 按最后更新时间排序，最旧的在前
+        self._entries = OrderedDict()
+        self._last_request_id = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _evict(self) -> None:
+        """淘汰过期条目和超出数量上限的最旧条目（调用方持有锁）"""
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            request_id, entry = next(iter(self._entries.items()))
+            if entry.updated_at >= cutoff and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[request_id]
+
+    def _entry(self, request_id: str) -> _StatusEntry:
+        entry = self._entries.get(request_id)
+        if entry is None:
+            entry = self._entries[request_id] = _StatusEntry(self._lock, self.history_size)
+            self._evict()
+        return entry
+
+    def put(self, update: dict) -> dict:
+        """
+        记录一次状态更新并唤醒该请求的订阅者，返回带 seq 的更新
+
+        seq 取收到更新时的微秒时间戳（同一请求内严格递增），条目被淘汰或服务器重启后
+        新的 seq 仍大于客户端保存的 since，不会被当作旧状态忽略。
+        """
+        request_id = update["request_id"]
+        with self._lock:
+            entry = self._entry(request_id)
+            entry.seq = max(entry.seq + 1, time.time_ns() // 1000)
+            entry.updated_at = time.monotonic()
+            entry.latest = dict(update, seq=entry.seq)
+            entry.history.append(entry.latest)
+            self._entries.move_to_end(request_id)
+            self._last_request_id = request_id
+            entry.changed.notify_all()
+            return entry.latest
+
+    def get(self, request_id: str) -> dict:
+        """获取请求的最新状态"""
+        with self._lock:
+            entry = self._entries.get(request_id)
+            return entry.latest if entry else None
+
+    def history(self, request_id: str) -> list:
+        """获取请求的状态历史（从旧到新）"""
+        with self._lock:
+            entry = self._entries.get(request_id)
+            return list(entry.history) if entry else []
+
+    def latest(self) -> dict:
+        """获取最近一次收到的状态更新"""
+        with self._lock:
+            entry = self._entries.get(self._last_request_id)
+            return entry.latest if entry else None
+
+    def wait(self, request_id: str, since: int = 0, timeout: float = 0) -> dict:
+        """
+        等待请求出现比 since 更新的状态
+        
+        Args:
+            request_id: 请求ID
+            since: 已收到的最后一个 seq
+            timeout: 最长等待秒数，0 表示不等待
+            
+        Returns:
+            dict: 最新状态，超时仍无更新时返回 None
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None:
+                if timeout <= 0:
+                    return None
+                # 尚未收到推送的请求也可以先订阅
+                entry = self._entry(request_id)
+            while entry.seq <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                entry.changed.wait(timeout=remaining)
+            return entry.latest
+
+
+status_store = StatusStore()
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
@@ -38,15 +173,17 @@ def webhook():
             logger.error("Webhook 数据缺少必要字段")
             return jsonify({"status": "error", "message": "Missing required fields"}), 400
             
-        # 将状态更新放入队列
-        status_updates.put({
+        update = {
             "request_id": data.get("id"),
             "status": data.get("status"),
             "updated_on": data.get("updated_on"),
             "audio_url": data.get("audio_url"),
             "error_message": data.get("error_message"),
             "response_text": data.get("response_text")
-        })
+        }
+
+        # 按 request_id 记录并唤醒订阅了该请求的客户端
+        status_store.put(update)
         
         return jsonify({"status": "success"}), 200
         
@@ -56,19 +193,72 @@ def webhook():
 
 @app.route('/status', methods=['GET'])
 def get_status():
-    """获取最新的处理状态"""
-    try:
-        status = status_updates.get_nowait()
-        logger.info(f"返回状态更新: {status}")
-        return jsonify(status), 200
-    except queue.Empty:
+    """获取最近一次收到的处理状态"""
+    status = status_store.latest()
+    if status is None:
         return jsonify({"status": "no_updates"}), 404
+    return jsonify(status), 200
+
+@app.route('/status/<request_id>', methods=['GET'])
+def get_request_status(request_id):
+    """
+    获取指定请求的最新状态
+    
+    查询参数:
+        since: 客户端已收到的最后一个 seq，只返回更新的状态
+        wait: 长轮询秒数，没有更新时最多阻塞这么久
+        history: 为 1 时附带该请求的状态历史
+    """
+    since = request.args.get("since", 0, type=int)
+    wait = min(request.args.get("wait", 0, type=float), EVENTS_MAX_TIMEOUT)
+
+    status = status_store.wait(request_id, since=since, timeout=wait)
+    if status is None:
+        return jsonify({"status": "no_updates"}), 404
+
+    if request.args.get("history") in ("1", "true"):
+        status = dict(status, history=status_store.history(request_id))
+    return jsonify(status), 200
+
+@app.route('/events/<request_id>', methods=['GET'])
+def status_events(request_id):
+    """
+    以 Server-Sent Events 推送指定请求的状态更新
+    
+    查询参数:
+        since: 客户端已收到的最后一个 seq，只推送更新的状态
+        timeout: 连接最长保持秒数，超时后服务器关闭连接，客户端可重新订阅
+    """
+    since = request.args.get("since", 0, type=int)
+    timeout = min(request.args.get("timeout", EVENTS_DEFAULT_TIMEOUT, type=float), EVENTS_MAX_TIMEOUT)
+
+    def stream():
+        last_seq = since
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            update = status_store.wait(request_id, since=last_seq, timeout=min(remaining, EVENTS_HEARTBEAT))
+            if update is None:
+                # 心跳，避免代理因空闲断开连接
+                yield ": keep-alive\n\n"
+                continue
+
+            last_seq = update["seq"]
+            yield f"id: {last_seq}\ndata: {json.dumps(update, ensure_ascii=False)}\n\n"
+            if _is_final(update):
+                return
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream(), mimetype="text/event-stream", headers=headers)
 
 def run_webhook_server():
     """运行 webhook 服务器"""
     try:
         logger.info("启动 Webhook 服务器...")
-        app.run(host='0.0.0.0', port=5000, debug=False)
+        app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
     except Exception as e:
         logger.error(f"Webhook 服务器启动失败: {str(e)}")
 
@@ -81,4 +271,4 @@ def start_webhook_server():
     return server_thread
 
 if __name__ == '__main__':
-    start_webhook_server()
\ No newline at end of file
+    run_webhook_server()
\ No newline at end of file
@@ -0,0 +1,252 @@
+import fcntl
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+# 磁盘上的工作区根目录
+WORKSPACE_DIR = os.getenv("AIPAPER_WORK_DIR", "work")
+# 内存文件系统上的工作区根目录，空间足够时优先使用，设为空字符串表示不使用
+WORKSPACE_TMPFS_DIR = os.getenv("AIPAPER_TMPFS_DIR", "/dev/shm/aipaper-work")
+# 使用内存文件系统时至少保留的剩余空间（MB），避免占满内存
+WORKSPACE_TMPFS_RESERVE = int(os.getenv("AIPAPER_TMPFS_RESERVE_MB", "512")) * 1024 * 1024
+# 所有工作区占用空间的上限（MB），超出时按最近最少使用清理空闲的工作区，0 表示不限制
+WORKSPACE_QUOTA = int(os.getenv("AIPAPER_WORKSPACE_QUOTA_MB", "0")) * 1024 * 1024
+# 未指定时，每个任务预计占用的空间（MB），用于选择位置和腾出配额
+WORKSPACE_JOB_ESTIMATE = int(os.getenv("AIPAPER_WORKSPACE_JOB_MB", "256")) * 1024 * 1024
+# 边下载边转码时暂存重采样数据的目录，始终在磁盘上（不放在内存文件系统中）
+WORKSPACE_SPOOL_DIR = os.getenv("AIPAPER_SPOOL_DIR", os.path.join(WORKSPACE_DIR, ".spool"))
+# 每个任务的暂存数据预计占用的空间（MB），默认按 2 小时、22050Hz 单声道 24 位未压缩计算
+WORKSPACE_SPOOL_ESTIMATE = int(os.getenv("AIPAPER_SPOOL_JOB_MB", "480")) * 1024 * 1024
+
+LOCK_FILE = ".lock"
+
+_workspace_manager = None
+_workspace_manager_lock = threading.Lock()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    total += _dir_size(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        pass
+    return total
+
+
+def _try_lock(path: str) -> Optional[int]:
+    """以非阻塞方式给工作区加排他锁，成功时返回文件描述符，工作区正在使用时返回 None"""
+    try:
+        fd = os.open(os.path.join(path, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except OSError:
+        os.close(fd)
+        return None
+
+
+class Workspace:
+    """
+    单个任务的工作目录
+
+    打开期间持有目录中锁文件的排他锁（进程退出时由系统释放），
+    配额清理和其他进程都不会删除正在使用的工作区。
+    """
+
+    def __init__(self, path: str, fd: int):
+        self.path = path
+        self._fd = fd
+
+    def file(self, name: str) -> str:
+        """工作区内文件的路径"""
+        return os.path.join(self.path, name)
+
+    def release(self) -> None:
+        """释放锁，保留目录内容（例如转码结果留待上传阶段使用）"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def cleanup(self) -> None:
+        """删除整个工作区"""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.release()
+
+
+class WorkspaceManager:
+    """
+    按任务分配独立工作目录
+
+    每个任务使用以任务 ID 命名的目录，并发任务之间不会互相覆盖文件；
+    内存文件系统剩余空间足够时放在 tmpfs 上，否则放在磁盘上；
+    设置配额时，分配前按最后使用时间清理空闲的旧工作区。
+    """
+
+    def __init__(self, root: str = WORKSPACE_DIR, tmpfs_root: str = WORKSPACE_TMPFS_DIR,
+                 tmpfs_reserve: int = WORKSPACE_TMPFS_RESERVE, quota: int = WORKSPACE_QUOTA,
+                 spool_dir: str = WORKSPACE_SPOOL_DIR):
+        self.root = root
+        self.tmpfs_root = tmpfs_root
+        self.tmpfs_reserve = tmpfs_reserve
+        self.quota = quota
+        self.spool_dir = spool_dir
+        self._lock = threading.Lock()
+
+    def _roots(self) -> list:
+        return [root for root in (self.tmpfs_root, self.root) if root]
+
+    def _tmpfs_has_room(self, expected_size: int) -> bool:
+        if not self.tmpfs_root:
+            return False
+        try:
+            os.makedirs(self.tmpfs_root, exist_ok=True)
+            return shutil.disk_usage(self.tmpfs_root).free - expected_size >= self.tmpfs_reserve
+        except OSError:
+            return False
+
+    def _existing(self, name: str) -> Optional[str]:
+        for root in self._roots():
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                return path
+        return None
+
+    def _workspaces(self) -> list:
+        """所有工作区的（最后使用时间，路径）"""
+        workspaces = []
+        for root in self._roots():
+            try:
+                with os.scandir(root) as entries:
+                    for entry in entries:
+                        # 以点开头的目录（例如暂存目录）不是工作区
+                        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                            workspaces.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+        return workspaces
+
+    def usage(self) -> int:
+        """所有工作区（包括暂存目录）当前占用的字节数"""
+        return sum(_dir_size(path) for _, path in self._workspaces()) + _dir_size(self.spool_dir)
+
+    def make_room(self, needed: int, keep: str = None) -> int:
+        """
+        按最近最少使用清理空闲的工作区，直到总占用加上 needed 不超过配额
+
+        暂存目录中的数据属于正在转码的任务，计入总占用但不会被清理。
+
+        Args:
+            needed: 即将写入的字节数
+            keep: 不清理的工作区路径
+
+        Returns:
+            int: 释放的字节数
+        """
+        if not self.quota:
+            return 0
+        workspaces = sorted(self._workspaces())
+        sizes = {path: _dir_size(path) for _, path in workspaces}
+        excess = sum(sizes.values()) + _dir_size(self.spool_dir) + needed - self.quota
+        freed = 0
+        for _, path in workspaces:
+            if freed >= excess:
+                break
+            if path == keep:
+                continue
+            fd = _try_lock(path)
+            if fd is None:
+                continue
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+                freed += sizes[path]
+                print(f"工作区超出配额，已清理: {path}")
+            finally:
+                os.close(fd)
+        if freed < excess:
+            print(f"工作区配额不足：需要 {excess} 字节，只能释放 {freed} 字节")
+        return freed
+
+    def open(self, name: str, expected_size: int = WORKSPACE_JOB_ESTIMATE, spool_size: int = 0) -> Workspace:
+        """
+        打开（不存在时创建）任务的工作区并加锁
+
+        同名工作区已存在时（例如任务从转码后的阶段继续）沿用原目录。
+
+        Args:
+            name: 任务名称
+            expected_size: 预计写入工作区的字节数，用于选择位置和腾出配额
+            spool_size: 预计写入暂存目录的字节数，只用于腾出配额
+
+        Raises:
+            RuntimeError: 工作区正被其他任务使用
+        """
+        name = re.sub(r'[^0-9A-Za-z._-]', '_', name)
+        with self._lock:
+            path = self._existing(name)
+            if path is None:
+                root = self.tmpfs_root if self._tmpfs_has_room(expected_size) else self.root
+                path = os.path.join(root, name)
+                os.makedirs(path, exist_ok=True)
+            fd = _try_lock(path)
+            if fd is None:
+                raise RuntimeError(f"工作区正在使用中: {path}")
+            # 目录修改时间作为最后使用时间
+            os.utime(path)
+        try:
+            self.make_room(expected_size + spool_size, keep=path)
+        except Exception:
+            os.close(fd)
+            raise
+        return Workspace(path, fd)
+
+    def remove(self, name: str) -> None:
+        """删除任务的工作区（如果存在且空闲）"""
+        path = self._existing(re.sub(r'[^0-9A-Za-z._-]', '_', name))
+        if path is None:
+            return
+        fd = _try_lock(path)
+        if fd is None:
+            return
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def workspace(self, name: str, keep: bool = False, expected_size: int = WORKSPACE_JOB_ESTIMATE,
+                  spool_size: int = 0):
+        """
+        在 with 块中使用任务的工作区
+
+        块内抛出异常时总是删除整个工作区；正常结束时 keep 为 True 则保留文件，否则删除。
+        """
+        workspace = self.open(name, expected_size=expected_size, spool_size=spool_size)
+        try:
+            yield workspace
+        except BaseException:
+            workspace.cleanup()
+            raise
+        if keep:
+            workspace.release()
+        else:
+            workspace.cleanup()
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """获取进程内共享的工作区管理器"""
+    global _workspace_manager
+    with _workspace_manager_lock:
+        if _workspace_manager is None:
+            _workspace_manager = WorkspaceManager()
+        return _workspace_manager
+